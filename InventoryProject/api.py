@@ -0,0 +1,80 @@
+# InventoryProject/api.py
+"""Small helpers shared by the JSON read endpoints of the apps (pagination, ETag handling)."""
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+def _page_params(params, default_limit):
+    try:
+        after = int(params.get('after') or 0)
+        limit = max(1, min(int(params.get('limit') or default_limit), MAX_LIMIT))
+    except ValueError:
+        raise ValueError("after and limit must be integers.")
+    return after, limit
+
+
+def _cut(rows, limit):
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        return rows[:limit], last['pk'] if isinstance(last, dict) else last.pk
+    return rows, None
+
+
+def page(qs, params, default_limit=DEFAULT_LIMIT):
+    """Keyset page by id: ?after=<id>&limit=. Rows may be instances or values() dicts with 'pk'.
+    Returns (rows, next cursor or None)."""
+    after, limit = _page_params(params, default_limit)
+    return _cut(list(qs.filter(pk__gt=after).order_by('pk')[:limit + 1]), limit)
+
+
+async def apage(qs, params, default_limit=DEFAULT_LIMIT):
+    """page() for async views (async ORM iteration)."""
+    after, limit = _page_params(params, default_limit)
+    return _cut([row async for row in qs.filter(pk__gt=after).order_by('pk')[:limit + 1]], limit)
+
+
+def not_modified(request, version):
+    """
+    Check a cheap data version (e.g. the last StockLedger id) before building the response.
+    Returns (304 response or None, etag) — the etag also covers the query string.
+    """
+    etag = quote_etag(hashlib.md5(f"{version}|{request.get_full_path()}".encode()).hexdigest())
+    return _conditional(request, etag), etag
+
+
+def table_version(*querysets):
+    """
+    Version of tables without a ledger: MAX(updated_at) (indexed) and the row count of each
+    queryset, so a save moves the first and an insert or delete the second.
+    """
+    return '|'.join(f"{row['changed']}:{row['rows']}" for row in (
+        qs.aggregate(changed=Max('updated_at'), rows=Count('pk')) for qs in querysets))
+
+
+def _conditional(request, etag):
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response['ETag'] = etag
+    return response
+
+
+def json_response(request, payload, etag=None):
+    """JsonResponse with an ETag; without a version-based etag the body itself is hashed."""
+    body = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':'))
+    if etag is None:
+        etag = quote_etag(hashlib.md5(body.encode()).hexdigest())
+        cached = _conditional(request, etag)
+        if cached is not None:
+            return cached
+    response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    return response
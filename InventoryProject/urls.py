@@ -15,8 +15,13 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/transactions/', include('inventory_transaction_module.urls')),
+    path('api/stock/', include('stock_module.urls')),
+    path('api/movements/', include('movement_module.urls')),
+    path('api/products/', include('product_module.urls')),
+    path('api/locations/', include('location_module.urls')),
 ]
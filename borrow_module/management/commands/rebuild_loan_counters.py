@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from borrow_module.services.loan_counters import LoanCounterService
+
+
+class Command(BaseCommand):
+    help = "Rebuild outstanding-loan counters (per borrower/product and product/warehouse) from borrow records."
+
+    def handle(self, *args, **options):
+        borrower_rows, warehouse_rows = LoanCounterService.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {borrower_rows} borrower counters and {warehouse_rows} warehouse counters."))
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:55
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('borrow_module', '0001_initial'),
+        ('location_module', '0002_alter_codes_and_constraints'),
+        ('product_module', '0003_alter_product_sku'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BorrowerLoanCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=4, default=Decimal('0'), help_text='Outstanding quantity in product base unit', max_digits=18)),
+                ('open_loans', models.IntegerField(default=0)),
+                ('borrower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loan_counters', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='borrower_loan_counters', to='product_module.product')),
+            ],
+            options={
+                'verbose_name': 'Borrower Loan Counter',
+                'verbose_name_plural': 'Borrower Loan Counters',
+                'constraints': [models.UniqueConstraint(fields=('borrower', 'product'), name='unique_loan_counter_per_borrower_product')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BorrowLimit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('max_quantity', models.DecimalField(blank=True, decimal_places=4, help_text='Max outstanding quantity in product base unit (empty = unlimited)', max_digits=18, null=True)),
+                ('max_open_loans', models.PositiveIntegerField(blank=True, help_text='Max number of open borrow records (empty = unlimited)', null=True)),
+                ('borrower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='borrow_limits', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='borrow_limits', to='product_module.product')),
+            ],
+            options={
+                'verbose_name': 'Borrow Limit',
+                'verbose_name_plural': 'Borrow Limits',
+                'constraints': [models.UniqueConstraint(fields=('borrower', 'product'), name='unique_borrow_limit_per_borrower_product')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WarehouseLoanCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=4, default=Decimal('0'), help_text='Outstanding quantity in product base unit', max_digits=18)),
+                ('open_loans', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='warehouse_loan_counters', to='product_module.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loan_counters', to='location_module.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Warehouse Loan Counter',
+                'verbose_name_plural': 'Warehouse Loan Counters',
+                'constraints': [models.UniqueConstraint(fields=('product', 'warehouse'), name='unique_loan_counter_per_product_warehouse')],
+            },
+        ),
+    ]
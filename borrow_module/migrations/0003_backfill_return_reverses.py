@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:00
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def link_returns_to_issues(apps, schema_editor):
+    # existing return transactions reverse the issue of their borrow record; after this,
+    # rebuild_valuation values them at the issue's cost instead of the product price
+    BorrowRecord = apps.get_model('borrow_module', 'BorrowRecord')
+    InventoryTransaction = apps.get_model('inventory_transaction_module', 'InventoryTransaction')
+    returned = BorrowRecord.objects.filter(return_tx__isnull=False, outgoing_tx__isnull=False)
+    InventoryTransaction.objects.filter(reverses__isnull=True, pk__in=returned.values('return_tx_id')).update(
+        reverses_id=Subquery(returned.filter(return_tx_id=OuterRef('pk')).values('outgoing_tx_id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('borrow_module', '0002_loan_counters'),
+        ('inventory_transaction_module', '0003_inventorytransaction_costing'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_returns_to_issues, migrations.RunPython.noop),
+    ]
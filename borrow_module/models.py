@@ -7,6 +7,7 @@ from product_module.models import Product
 from location_module.models import Warehouse, Section, Shelf
 from inventory_transaction_module.models import InventoryTransaction
 from inventory_transaction_module.services.stock_updater import StockUpdater
+from product_module.services.unit_converter import UnitConverter
 
 
 class BorrowStatus(models.TextChoices):
@@ -16,6 +17,97 @@ class BorrowStatus(models.TextChoices):
     CANCELLED = "CANCELLED", "Cancelled"
 
 
+class BorrowRecordManager(models.Manager):
+    """Batch issue/return for many borrow records (e.g. a tool-crib shift change)."""
+
+    @staticmethod
+    def _prepare(records):
+        if isinstance(records, models.QuerySet):
+            records = records.select_related('product', 'borrower', 'created_by', 'outgoing_tx')
+        return list(records)
+
+    @transaction.atomic
+    def issue_many(self, records, user=None):
+        """
+        Issue many borrow records at once: units converted in one query, all OUT
+        transactions created with bulk_create, stock deltas applied grouped per stock
+        row and outgoing_tx linked with a single bulk_update. Records that already
+        have an outgoing_tx are skipped, records that cannot be issued are reported and
+        unsaved records are created first. Returns (transactions, {record pk: error}) like
+        return_many.
+        """
+        pending, errors = [], {}
+        for record in self._prepare(records):
+            if record.outgoing_tx_id:
+                continue
+            status, record.status = record.status, BorrowStatus.OUT
+            try:
+                # OUT-specific checks run against the status being issued
+                record.clean()
+            except ValueError as exc:
+                record.status = status
+                errors[record.pk] = str(exc)
+                continue
+            record.created_by = record.created_by or user
+            pending.append(record)
+        if not pending:
+            return [], errors
+        records = pending
+        new_records = [r for r in records if r.pk is None]
+        if new_records:
+            self.bulk_create(new_records)
+
+        quantities = UnitConverter.bulk_to_base((r.product, r.quantity, r.unit) for r in records)
+        txs = [r._build_outgoing_tx(qty, user) for r, qty in zip(records, quantities)]
+        InventoryTransaction.objects.bulk_create(txs)
+        StockUpdater.apply_many(txs)
+
+        for record, tx in zip(records, txs):
+            record.outgoing_tx = tx
+        self.bulk_update(records, ['outgoing_tx', 'status', 'created_by'])
+
+        loan_counters.LoanCounterService.on_issue(zip(records, quantities))
+        return txs, errors
+
+    @transaction.atomic
+    def return_many(self, records, user=None, returned_at=None, return_warehouse=None, return_section=None,
+                    return_shelf=None):
+        """
+        Mark many borrow records as returned: IN transactions created with bulk_create,
+        stock deltas applied grouped per stock row and return_tx linked with a single
+        bulk_update. Only issued records (OUT / OVERDUE with an outgoing_tx) are returned, with
+        the quantity that went out; records already returned are skipped and any other record
+        (cancelled, never issued) is reported. Returns (transactions, {record pk: error}).
+        """
+        pending, errors = [], {}
+        for record in self._prepare(records):
+            if record.status == BorrowStatus.RETURNED and record.return_tx_id:
+                continue
+            try:
+                record.check_returnable()
+            except ValueError as exc:
+                errors[record.pk] = str(exc)
+                continue
+            pending.append(record)
+        if not pending:
+            return [], errors
+        returned_at = returned_at or timezone.now()
+
+        txs = [r._build_return_tx(r.outgoing_tx.quantity, user, return_warehouse, return_section, return_shelf)
+               for r in pending]
+        InventoryTransaction.objects.bulk_create(txs)
+        StockUpdater.apply_many(txs)
+
+        loan_counters.LoanCounterService.on_release((r, r.outgoing_tx.quantity) for r in pending)
+
+        for record, tx in zip(pending, txs):
+            record.return_tx = tx
+            record.status = BorrowStatus.RETURNED
+            record.actual_returned_at = returned_at
+        self.bulk_update(pending, ['return_tx', 'status', 'actual_returned_at'])
+        return txs, errors
+
+
 class BorrowRecord(models.Model):
     """
     رکورد امانت (قرضی) — یک رکورد نشان می‌دهد چه کسی چه کالایی را از کجا برده، چه مقدار،
@@ -63,6 +155,8 @@ class BorrowRecord(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BorrowRecordManager()
+
     class Meta:
         verbose_name = "Borrow Record"
         verbose_name_plural = "Borrow Records"
@@ -77,9 +171,53 @@ class BorrowRecord(models.Model):
 
     def clean(self):
         # ساده: اگر وضعیت OUT است باید source_warehouse داشته باشد
-        if self.status == BorrowStatus.OUT and not self.source_warehouse:
+        if self.status == BorrowStatus.OUT and not self.source_warehouse_id:
             raise ValueError("Borrow must have a source_warehouse when issued.")
 
+    def _build_outgoing_tx(self, quantity, user=None):
+        """تراکنش OUT (ذخیره نشده) برای صدور امانت، با مقدار به base_unit."""
+        return InventoryTransaction(
+            transaction_type='OUT',
+            product=self.product,
+            quantity=quantity,
+            unit=self.product.base_unit,
+            source_warehouse_id=self.source_warehouse_id,
+            source_section_id=self.source_section_id,
+            source_shelf_id=self.source_shelf_id,
+            destination_warehouse=None,
+            created_by=user or self.created_by,
+            reference_number=self.reference_no or f"BORR-{self.pk or 'TEMP'}",
+            note=f"Borrow issued to {self.borrower}",
+            # یک رکورد فقط یک بار صادر می‌شود؛ صدور همزمان دوباره روی کلید یکتا شکست می‌خورد
+            idempotency_key=f"BORR-{self.pk}-ISSUE" if self.pk else None,
+        )
+
+    def _build_return_tx(self, quantity, user=None, return_warehouse=None, return_section=None, return_shelf=None):
+        """تراکنش IN (ذخیره نشده) برای بازگشت امانت، با مقدار به base_unit."""
+        # default برگرداندن به همان انبار مبدأ اگر مشخص نشده
+        return InventoryTransaction(
+            transaction_type='IN',
+            product=self.product,
+            quantity=quantity,
+            unit=self.product.base_unit,
+            source_warehouse=None,
+            destination_warehouse_id=getattr(return_warehouse, 'pk', None) or self.return_warehouse_id or self.source_warehouse_id,
+            destination_section_id=getattr(return_section, 'pk', None) or self.return_section_id or self.source_section_id,
+            destination_shelf_id=getattr(return_shelf, 'pk', None) or self.return_shelf_id or self.source_shelf_id,
+            created_by=user or self.created_by,
+            reference_number=self.reference_no or f"BORR-{self.pk or 'TEMP'}-RET",
+            note=f"Borrow returned by {self.borrower}",
+            idempotency_key=f"BORR-{self.pk}-RETURN" if self.pk else None,
+            # ارزش‌گذاری بازگشت با بهای همان خروج (نه قیمت فعلی محصول)
+            reverses_id=self.outgoing_tx_id,
+        )
+
+    def check_returnable(self):
+        """فقط امانت صادر شده (OUT / OVERDUE با outgoing_tx) قابل بازگشت است."""
+        if not self.outgoing_tx_id or self.status not in (BorrowStatus.OUT, BorrowStatus.OVERDUE):
+            raise ValueError(f"Borrow {self.reference_no or self.pk} was not issued ({self.status}); "
+                             f"nothing to return.")
+
     @transaction.atomic
     def issue(self, user=None):
         """
@@ -92,30 +230,24 @@ class BorrowRecord(models.Model):
             # idempotency: اگر از قبل تراکنش خروجی وجود دارد از دوباره‌کاری جلوگیری کن
             return self.outgoing_tx
 
+        # بررسی‌های OUT روی وضعیتی که صادر می‌شود
+        self.status = BorrowStatus.OUT
         self.clean()
-        # تبدیل واحد به base_unit اگر لازم — استفاده از ProductConversion در StockUpdater/strategies انجام خواهد شد
-        tx = InventoryTransaction.objects.create(
-            transaction_type='OUT',
-            product=self.product,
-            quantity=self.quantity,
-            unit=self.unit,
-            source_warehouse=self.source_warehouse,
-            source_section=self.source_section,
-            source_shelf=self.source_shelf,
-            destination_warehouse=None,
-            created_by=user or self.created_by,
-            reference_number=self.reference_no or f"BORR-{self.pk or 'TEMP'}",
-            note=f"Borrow issued to {self.borrower}"
-        )
+        # تبدیل واحد به base_unit محصول قبل از ساخت تراکنش
+        qty_base = UnitConverter.to_base(self.product, self.quantity, self.unit)
+        tx = self._build_outgoing_tx(qty_base, user)
+        tx.save()
 
-        # apply stock change (StockUpdater idempotent باید باشد)
+        # apply stock change (StockUpdater.apply هر تراکنش را فقط یک بار اعمال می‌کند)
         StockUpdater.apply(tx)
 
         # لینک و ذخیره
         self.outgoing_tx = tx
-        self.status = BorrowStatus.OUT
         self.created_by = self.created_by or user
         self.save(update_fields=['outgoing_tx', 'status', 'created_by'])
+
+        # شمارنده‌های امانت باز + بررسی سقف امانت (داخل همین transaction)
+        loan_counters.LoanCounterService.on_issue([(self, qty_base)])
         return tx
 
     @transaction.atomic
@@ -129,28 +261,16 @@ class BorrowRecord(models.Model):
         """
         if self.status == BorrowStatus.RETURNED and self.return_tx:
             return self.return_tx
+        self.check_returnable()
 
-        # default برگرداندن به همان انبار مبدأ اگر مشخص نشده
-        dest_wh = return_warehouse or self.return_warehouse or self.source_warehouse
-        dest_sec = return_section or self.return_section or self.source_section
-        dest_shelf = return_shelf or self.return_shelf or self.source_shelf
-
-        tx = InventoryTransaction.objects.create(
-            transaction_type='IN',
-            product=self.product,
-            quantity=self.quantity,
-            unit=self.unit,
-            source_warehouse=None,
-            destination_warehouse=dest_wh,
-            destination_section=dest_sec,
-            destination_shelf=dest_shelf,
-            created_by=user or self.created_by,
-            reference_number=self.reference_no or f"BORR-{self.pk or 'TEMP'}-RET",
-            note=f"Borrow returned by {self.borrower}"
-        )
+        # همان مقداری که خارج شده برمی‌گردد (نه تبدیل دوباره با ضریب امروز)
+        tx = self._build_return_tx(self.outgoing_tx.quantity, user, return_warehouse, return_section, return_shelf)
+        tx.save()
 
         StockUpdater.apply(tx)
 
+        loan_counters.LoanCounterService.on_release([(self, self.outgoing_tx.quantity)])
+
         self.return_tx = tx
         self.status = BorrowStatus.RETURNED
         self.actual_returned_at = returned_at or timezone.now()
@@ -160,8 +280,74 @@ class BorrowRecord(models.Model):
     def cancel(self, user=None):
         """
         لغو رکورد امانی قبل از صدور (اگر outgoing_tx وجود نداشته باشد).
+        رکورد صادر نشده در شمارنده‌های امانت حساب نشده، پس لغو آن‌ها را تغییر نمی‌دهد.
         """
         if self.outgoing_tx:
             raise ValueError("Cannot cancel borrow that already produced outgoing transaction.")
         self.status = BorrowStatus.CANCELLED
         self.save(update_fields=['status'])
+
+
+class BorrowerLoanCounter(models.Model):
+    """
+    شمارنده‌ی امانت‌های باز هر کاربر برای هر کالا (denormalized).
+    در issue / mark_returned داخل همان transaction به‌روز می‌شود؛ بازسازی با rebuild_loan_counters.
+    """
+    borrower = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="loan_counters")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="borrower_loan_counters")
+    quantity = models.DecimalField(max_digits=18, decimal_places=4, default=Decimal('0'),
+                                   help_text="Outstanding quantity in product base unit")
+    open_loans = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Borrower Loan Counter"
+        verbose_name_plural = "Borrower Loan Counters"
+        constraints = [
+            models.UniqueConstraint(fields=['borrower', 'product'], name='unique_loan_counter_per_borrower_product')
+        ]
+
+    def __str__(self):
+        return f"Borrower {self.borrower_id} | Product {self.product_id}: {self.quantity} ({self.open_loans} open)"
+
+
+class WarehouseLoanCounter(models.Model):
+    """شمارنده‌ی مقدار امانت داده‌شده از هر کالا به تفکیک انبار مبدأ (denormalized)."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="warehouse_loan_counters")
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="loan_counters")
+    quantity = models.DecimalField(max_digits=18, decimal_places=4, default=Decimal('0'),
+                                   help_text="Outstanding quantity in product base unit")
+    open_loans = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Warehouse Loan Counter"
+        verbose_name_plural = "Warehouse Loan Counters"
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'warehouse'], name='unique_loan_counter_per_product_warehouse')
+        ]
+
+    def __str__(self):
+        return f"Product {self.product_id} | Warehouse {self.warehouse_id}: {self.quantity} ({self.open_loans} open)"
+
+
+class BorrowLimit(models.Model):
+    """سقف امانت یک کاربر برای یک کالا؛ هنگام issue با BorrowerLoanCounter مقایسه می‌شود (O(1))."""
+    borrower = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="borrow_limits")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="borrow_limits")
+    max_quantity = models.DecimalField(max_digits=18, decimal_places=4, null=True, blank=True,
+                                       help_text="Max outstanding quantity in product base unit (empty = unlimited)")
+    max_open_loans = models.PositiveIntegerField(null=True, blank=True,
+                                                 help_text="Max number of open borrow records (empty = unlimited)")
+
+    class Meta:
+        verbose_name = "Borrow Limit"
+        verbose_name_plural = "Borrow Limits"
+        constraints = [
+            models.UniqueConstraint(fields=['borrower', 'product'], name='unique_borrow_limit_per_borrower_product')
+        ]
+
+    def __str__(self):
+        return f"Limit borrower {self.borrower_id} / product {self.product_id}"
+
+
+# loan_counters imports these models; bound here, used at call time
+from .services import loan_counters  # noqa: E402
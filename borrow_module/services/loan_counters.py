@@ -0,0 +1,151 @@
+# borrow_module/services/loan_counters.py
+from collections import defaultdict
+from decimal import Decimal
+from functools import reduce
+import operator
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from ..models import BorrowRecord, BorrowStatus, BorrowerLoanCounter, WarehouseLoanCounter, BorrowLimit
+
+OUTSTANDING_STATUSES = (BorrowStatus.OUT, BorrowStatus.OVERDUE)
+
+
+class LoanCounterService:
+    """
+    Maintains BorrowerLoanCounter / WarehouseLoanCounter incrementally.
+    Callers pass (record, quantity_in_base_unit) pairs and must already be inside
+    the transaction that issues or returns the records.
+    """
+
+    BORROWER_KEY = ('borrower_id', 'product_id')
+    WAREHOUSE_KEY = ('product_id', 'warehouse_id')
+
+    @staticmethod
+    def _lock_rows(model, key_fields, keys):
+        """Lock counter rows for the given keys, creating missing ones (zeroed) first."""
+        def key_filter(key_set):
+            return reduce(operator.or_, (Q(**dict(zip(key_fields, k))) for k in key_set))
+
+        def fetch(key_set):
+            return {
+                tuple(getattr(row, f) for f in key_fields): row
+                for row in model.objects.select_for_update().filter(key_filter(key_set)).order_by('pk')
+            }
+
+        rows = fetch(keys)
+        missing = [k for k in keys if k not in rows]
+        if missing:
+            model.objects.bulk_create([model(**dict(zip(key_fields, k))) for k in missing], ignore_conflicts=True)
+            rows.update(fetch(missing))
+        return rows
+
+    @classmethod
+    def _apply(cls, model, key_fields, deltas):
+        if not deltas:
+            return {}
+        rows = cls._lock_rows(model, key_fields, list(deltas))
+        for key, (qty, count) in deltas.items():
+            rows[key].quantity += qty
+            rows[key].open_loans += count
+        model.objects.bulk_update(rows.values(), ['quantity', 'open_loans'])
+        return rows
+
+    @staticmethod
+    def _group(items, sign):
+        by_borrower = defaultdict(lambda: [Decimal('0'), 0])
+        by_warehouse = defaultdict(lambda: [Decimal('0'), 0])
+        for record, qty in items:
+            b = by_borrower[(record.borrower_id, record.product_id)]
+            b[0] += sign * qty
+            b[1] += sign
+            if record.source_warehouse_id:
+                w = by_warehouse[(record.product_id, record.source_warehouse_id)]
+                w[0] += sign * qty
+                w[1] += sign
+        return by_borrower, by_warehouse
+
+    @classmethod
+    def check_limits(cls, counters, deltas):
+        """Raise ValueError if any (borrower, product) would exceed its BorrowLimit."""
+        limits = BorrowLimit.objects.filter(
+            reduce(operator.or_, (Q(borrower_id=b, product_id=p) for b, p in deltas))
+        )
+        for limit in limits:
+            key = (limit.borrower_id, limit.product_id)
+            counter = counters[key]
+            if limit.max_quantity is not None and counter.quantity > limit.max_quantity:
+                raise ValueError(
+                    f"Borrow limit exceeded for borrower id={key[0]}, product id={key[1]}: "
+                    f"{counter.quantity} > {limit.max_quantity}.")
+            if limit.max_open_loans is not None and counter.open_loans > limit.max_open_loans:
+                raise ValueError(
+                    f"Open loan limit exceeded for borrower id={key[0]}, product id={key[1]}: "
+                    f"{counter.open_loans} > {limit.max_open_loans}.")
+
+    @classmethod
+    def on_issue(cls, items):
+        """items: iterable of (record, quantity_in_base_unit) for newly issued records."""
+        by_borrower, by_warehouse = cls._group(items, 1)
+        counters = cls._apply(BorrowerLoanCounter, cls.BORROWER_KEY, by_borrower)
+        if counters:
+            cls.check_limits(counters, by_borrower)
+        cls._apply(WarehouseLoanCounter, cls.WAREHOUSE_KEY, by_warehouse)
+
+    @classmethod
+    def on_release(cls, items):
+        """items: (record, quantity_in_base_unit) for records that stop being outstanding (returned/cancelled)."""
+        by_borrower, by_warehouse = cls._group(items, -1)
+        cls._apply(BorrowerLoanCounter, cls.BORROWER_KEY, by_borrower)
+        cls._apply(WarehouseLoanCounter, cls.WAREHOUSE_KEY, by_warehouse)
+
+    @staticmethod
+    def is_outstanding(record):
+        return bool(record.outgoing_tx_id) and record.status in OUTSTANDING_STATUSES
+
+    # --- reads -------------------------------------------------------------------------------
+
+    @staticmethod
+    def outstanding_for_borrower(borrower, product=None):
+        """(quantity, open_loans) the borrower currently holds, for one product or all."""
+        qs = BorrowerLoanCounter.objects.filter(borrower=borrower)
+        if product is not None:
+            qs = qs.filter(product=product)
+        agg = qs.aggregate(quantity=Sum('quantity'), open_loans=Sum('open_loans'))
+        return agg['quantity'] or Decimal('0'), agg['open_loans'] or 0
+
+    @staticmethod
+    def outstanding_for_product(product, warehouse=None):
+        """(quantity, open_loans) of a product currently out on loan, optionally from one warehouse."""
+        qs = WarehouseLoanCounter.objects.filter(product=product)
+        if warehouse is not None:
+            qs = qs.filter(warehouse=warehouse)
+        agg = qs.aggregate(quantity=Sum('quantity'), open_loans=Sum('open_loans'))
+        return agg['quantity'] or Decimal('0'), agg['open_loans'] or 0
+
+    # --- recovery ----------------------------------------------------------------------------
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls):
+        """Recompute both counter tables from outstanding BorrowRecords (quantities from outgoing_tx)."""
+        outstanding = BorrowRecord.objects.filter(status__in=OUTSTANDING_STATUSES, outgoing_tx__isnull=False)
+
+        BorrowerLoanCounter.objects.all().delete()
+        BorrowerLoanCounter.objects.bulk_create(
+            BorrowerLoanCounter(borrower_id=row['borrower_id'], product_id=row['product_id'],
+                                quantity=row['quantity'], open_loans=row['open_loans'])
+            for row in outstanding.values('borrower_id', 'product_id').annotate(
+                quantity=Sum('outgoing_tx__quantity'), open_loans=Count('id')).order_by()
+        )
+
+        WarehouseLoanCounter.objects.all().delete()
+        WarehouseLoanCounter.objects.bulk_create(
+            WarehouseLoanCounter(product_id=row['product_id'], warehouse_id=row['source_warehouse_id'],
+                                 quantity=row['quantity'], open_loans=row['open_loans'])
+            for row in outstanding.filter(source_warehouse__isnull=False).values(
+                'product_id', 'source_warehouse_id').annotate(
+                quantity=Sum('outgoing_tx__quantity'), open_loans=Count('id')).order_by()
+        )
+        return BorrowerLoanCounter.objects.count(), WarehouseLoanCounter.objects.count()
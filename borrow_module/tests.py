@@ -1,3 +1,105 @@
+from decimal import Decimal
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from location_module.models import Warehouse
+from product_module.models import Brand, Category, Product, ProductConversion
+from stock_module.models import Stock, ValuationEntry, ValuationKind
+from stock_module.services.valuation import ValuationEngine
+from user_module.models import User
+from inventory_transaction_module.models import InventoryTransaction
+from .models import BorrowRecord, BorrowStatus, BorrowerLoanCounter
+from .services.loan_counters import LoanCounterService
+
+
+class BorrowReturnTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='keeper')
+        cls.product = Product.objects.create(name='Drill', category=Category.objects.create(name='Tools'),
+                                             brand=Brand.objects.create(name='Acme'), base_unit='pcs', price=10)
+        cls.warehouse = Warehouse.objects.create(name='Main')
+        InventoryTransaction.objects.record('seed', transaction_type='IN', product=cls.product, quantity=10,
+                                            unit='pcs', destination_warehouse=cls.warehouse, unit_cost=10)
+
+    def borrow(self, **extra):
+        fields = {'quantity': 2, 'unit': 'pcs', **extra}
+        return BorrowRecord.objects.create(borrower=self.user, product=self.product,
+                                           source_warehouse=self.warehouse, **fields)
+
+    def on_hand(self):
+        return Stock.objects.get(product=self.product, warehouse=self.warehouse).quantity
+
+    def test_return_many_rejects_records_that_were_not_issued(self):
+        issued = self.borrow()
+        BorrowRecord.objects.issue_many([issued])
+        cancelled = self.borrow()
+        cancelled.cancel()
+        never_issued = self.borrow()
+
+        txs, errors = BorrowRecord.objects.return_many(BorrowRecord.objects.filter(
+            pk__in=[issued.pk, cancelled.pk, never_issued.pk]))
+
+        self.assertEqual(len(txs), 1)
+        self.assertEqual(set(errors), {cancelled.pk, never_issued.pk})
+        self.assertEqual(self.on_hand(), Decimal('10'))
+        cancelled.refresh_from_db()
+        self.assertEqual(cancelled.status, BorrowStatus.CANCELLED)
+        self.assertIsNone(cancelled.return_tx_id)
+
+    def test_issue_many_applies_stock_once_per_row_and_reports_unissuable_records(self):
+        records = [self.borrow(), self.borrow(quantity=3)]
+        no_source = BorrowRecord.objects.create(borrower=self.user, product=self.product, quantity=1, unit='pcs',
+                                                status=BorrowStatus.CANCELLED)
+
+        with CaptureQueriesContext(connection) as queries:
+            txs, errors = BorrowRecord.objects.issue_many([*records, no_source])
+
+        stock_updates = [q for q in queries.captured_queries
+                         if q['sql'].startswith(f'UPDATE "{Stock._meta.db_table}"')]
+        self.assertEqual(len(stock_updates), 1)
+        self.assertEqual(len(txs), 2)
+        self.assertEqual(list(errors), [no_source.pk])
+        self.assertEqual(self.on_hand(), Decimal('5'))
+        no_source.refresh_from_db()
+        self.assertEqual((no_source.status, no_source.outgoing_tx_id), (BorrowStatus.CANCELLED, None))
+        self.assertEqual(BorrowRecord.objects.issue_many(records), ([], {}))
+
+    def test_mark_returned_requires_an_issued_record(self):
+        with self.assertRaises(ValueError):
+            self.borrow().mark_returned()
+        self.assertEqual(self.on_hand(), Decimal('10'))
+
+    def test_return_releases_the_issued_quantity_when_the_conversion_changed(self):
+        conversion = ProductConversion.objects.create(product=self.product, from_unit='box', to_unit='pcs', factor=4)
+        kept, returned = self.borrow(quantity=1, unit='box'), self.borrow(quantity=1, unit='box')
+        BorrowRecord.objects.issue_many([kept, returned])
+        conversion.factor = 3
+        conversion.save()
+
+        returned.refresh_from_db()
+        returned.mark_returned()
+
+        counter = BorrowerLoanCounter.objects.get(borrower=self.user, product=self.product)
+        self.assertEqual((counter.quantity, counter.open_loans), (Decimal('4'), 1))
+        self.assertEqual(self.on_hand(), Decimal('6'))
+        LoanCounterService.rebuild()
+        counter = BorrowerLoanCounter.objects.get(borrower=self.user, product=self.product)
+        self.assertEqual((counter.quantity, counter.open_loans), (Decimal('4'), 1))
+
+    def test_return_is_valued_at_the_cost_of_its_issue(self):
+        record = self.borrow()
+        BorrowRecord.objects.issue_many([record])
+        Product.objects.filter(pk=self.product.pk).update(price=25)
+
+        record.refresh_from_db()
+        tx = record.mark_returned()
 
-# Create your tests here.
+        self.assertEqual(tx.reverses_id, record.outgoing_tx_id)
+        entry = ValuationEntry.objects.get(ledger__transaction=tx)
+        self.assertEqual((entry.kind, entry.unit_cost), (ValuationKind.REVERSAL, Decimal('10')))
+        self.assertEqual(ValuationEngine.inventory_value(product=self.product), Decimal('100'))
+        ValuationEngine.rebuild()
+        self.assertEqual(ValuationEngine.inventory_value(product=self.product), Decimal('100'))
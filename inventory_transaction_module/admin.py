@@ -1,5 +1,18 @@
 from django.contrib import admin
+
+from stock_module.paginators import KeysetPaginationMixin
 from .models import InventoryTransaction
 # Register your models here.
 
-admin.site.register(InventoryTransaction)
\ No newline at end of file
+
+@admin.register(InventoryTransaction)
+class InventoryTransactionAdmin(KeysetPaginationMixin, admin.ModelAdmin):
+    list_display = ('id', 'transaction_type', 'product', 'quantity', 'unit', 'source_warehouse',
+                    'destination_warehouse', 'processed', 'created_at')
+    list_select_related = ('product', 'source_warehouse', 'destination_warehouse')
+    list_filter = ('transaction_type', 'processed')
+    date_hierarchy = 'created_at'
+    search_fields = ('=reference_number', '=idempotency_key')
+    autocomplete_fields = ('product', 'source_warehouse', 'destination_warehouse', 'source_section',
+                           'destination_section', 'source_shelf', 'destination_shelf')
+    raw_id_fields = ('created_by', 'reverses', 'out_leg')
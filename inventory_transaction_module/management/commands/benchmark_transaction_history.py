@@ -0,0 +1,103 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from inventory_transaction_module.models import InventoryTransaction, TransactionType
+from inventory_transaction_module.services.history import TransactionHistory
+from location_module.models import Warehouse
+from product_module.models import Product
+
+BENCH_PREFIX = 'BENCH-'
+
+
+class Command(BaseCommand):
+    help = ("EXPLAIN and time keyset-paginated transaction history queries; optionally seed synthetic "
+            "transactions first (reference_number BENCH-*, removed with --cleanup).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help="Synthetic transactions to insert first")
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--pages', type=int, default=200, help="Pages to walk per query shape")
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--cleanup', action='store_true', help="Delete the synthetic rows and exit")
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            deleted, _ = InventoryTransaction.objects.filter(reference_number__startswith=BENCH_PREFIX).delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} synthetic rows."))
+            return
+
+        product_ids = list(Product.objects.values_list('pk', flat=True)[:1000])
+        warehouse_ids = list(Warehouse.objects.values_list('pk', flat=True)[:50])
+        if not product_ids or not warehouse_ids:
+            raise CommandError("Need at least one product and one warehouse.")
+        if options['seed']:
+            self._seed(options['seed'], options['batch_size'], product_ids, warehouse_ids)
+
+        product, warehouse = product_ids[0], warehouse_ids[0]
+        since = timezone.now() - timedelta(days=7)
+        shapes = [
+            ('all', {}, ['invtx_created_idx']),
+            ('product', {'product': product}, ['invtx_product_created_idx']),
+            ('warehouse (source)', {'warehouse': warehouse, 'side': 'source'}, ['invtx_src_wh_created_idx']),
+            ('warehouse (either), last week', {'warehouse': warehouse, 'since': since},
+             ['invtx_src_wh_created_idx', 'invtx_dst_wh_created_idx']),
+            ('unprocessed', {'processed': False}, ['invtx_unprocessed_idx']),
+            ('type OUT', {'transaction_type': TransactionType.OUT}, ['invtx_type_created_idx']),
+        ]
+        self.stdout.write(f"{InventoryTransaction.objects.count()} transactions, vendor {connection.vendor}")
+        for label, filters, indexes in shapes:
+            self._explain(label, filters, indexes)
+            self._walk(label, filters, options['pages'], options['page_size'])
+
+    def _seed(self, count, batch_size, product_ids, warehouse_ids):
+        rnd = random.Random(42)
+        now = timezone.now()
+        types = [TransactionType.IN, TransactionType.OUT, TransactionType.TRANSFER]
+        started, done = time.monotonic(), 0
+        while done < count:
+            batch = []
+            for i in range(done, min(done + batch_size, count)):
+                kind = rnd.choice(types)
+                batch.append(InventoryTransaction(
+                    transaction_type=kind,
+                    product_id=rnd.choice(product_ids),
+                    quantity=Decimal(rnd.randint(1, 100)),
+                    unit='pcs',
+                    source_warehouse_id=rnd.choice(warehouse_ids) if kind != TransactionType.IN else None,
+                    destination_warehouse_id=rnd.choice(warehouse_ids) if kind != TransactionType.OUT else None,
+                    reference_number=f"{BENCH_PREFIX}{i}",
+                    created_at=now - timedelta(seconds=rnd.randint(0, 365 * 86400)),
+                    processed=rnd.random() > 0.02,
+                ))
+            InventoryTransaction.objects.bulk_create(batch)
+            done += len(batch)
+            self.stdout.write(f"  seeded {done}/{count}", ending='\r')
+        self.stdout.write(f"Seeded {count} rows in {time.monotonic() - started:.1f}s")
+
+    def _explain(self, label, filters, indexes):
+        # the same querysets TransactionHistory.page runs (both scans for a warehouse without a side)
+        for qs, index in zip(TransactionHistory.key_querysets(**filters), indexes):
+            plan = qs.explain()
+            verdict = self.style.SUCCESS('index') if index in plan else self.style.WARNING('check plan')
+            self.stdout.write(f"\n[{label}] {verdict}\n{plan}")
+
+    def _walk(self, label, filters, pages, page_size):
+        cursor, timings, rows = None, [], 0
+        for _ in range(pages):
+            started = time.perf_counter()
+            page = TransactionHistory.page(cursor=cursor, page_size=page_size, **filters)
+            timings.append((time.perf_counter() - started) * 1000)
+            rows += len(page.results)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        timings.sort()
+        self.stdout.write(
+            f"[{label}] {len(timings)} pages / {rows} rows: first {timings and timings[0]:.2f} ms, "
+            f"median {timings[len(timings) // 2]:.2f} ms, max {timings[-1]:.2f} ms")
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def pair_movement_transfer_legs(apps, schema_editor):
+    # a transfer segment holds its OUT and IN transactions; after this, rebuild_valuation values
+    # the IN leg at its OUT leg's cost
+    MovementSegment = apps.get_model('movement_module', 'MovementSegment')
+    InventoryTransaction = apps.get_model('inventory_transaction_module', 'InventoryTransaction')
+    Link = MovementSegment.related_inventory_transactions.through
+    legs = {}
+    for segment_id, tx_id, tx_type in Link.objects.filter(
+            movementsegment__movement__movement_type='TRANSFER').values_list(
+            'movementsegment_id', 'inventorytransaction_id', 'inventorytransaction__transaction_type'):
+        legs.setdefault(segment_id, {}).setdefault(tx_type, []).append(tx_id)
+    in_legs = []
+    for pair in legs.values():
+        if len(pair.get('OUT', ())) == 1 and len(pair.get('IN', ())) == 1:
+            in_legs.append(InventoryTransaction(pk=pair['IN'][0], out_leg_id=pair['OUT'][0]))
+    InventoryTransaction.objects.bulk_update(in_legs, ['out_leg'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_transaction_module', '0002_inventorytransaction_processed_and_more'),
+        ('movement_module', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='landed_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True, verbose_name='Landed Cost'),
+        ),
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=18, null=True, verbose_name='Unit Cost'),
+        ),
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='reverses',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reversals', to='inventory_transaction_module.inventorytransaction', verbose_name='Reverses'),
+        ),
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='out_leg',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='in_legs', to='inventory_transaction_module.inventorytransaction', verbose_name='Outgoing leg'),
+        ),
+        migrations.RunPython(pair_movement_transfer_legs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def _location_maps(apps):
+    Section = apps.get_model('location_module', 'Section')
+    Shelf = apps.get_model('location_module', 'Shelf')
+    sections = dict(Section.objects.values_list('pk', 'warehouse_id'))
+    shelves = {pk: (sections.get(sec_id), sec_id) for pk, sec_id in Shelf.objects.values_list('pk', 'section_id')}
+    return sections, shelves
+
+
+def _path(sections, shelves, warehouse_id, section_id, shelf_id):
+    if shelf_id in shelves:
+        wh_id, sec_id = shelves[shelf_id]
+        return f"/{wh_id}/{sec_id}/{shelf_id}/"
+    if section_id in sections:
+        return f"/{sections[section_id]}/{section_id}/"
+    return f"/{warehouse_id}/" if warehouse_id else ""
+
+
+def fill_location_paths(apps, schema_editor):
+    InventoryTransaction = apps.get_model('inventory_transaction_module', 'InventoryTransaction')
+    sections, shelves = _location_maps(apps)
+    batch = []
+    for tx in InventoryTransaction.objects.only(
+            'source_warehouse_id', 'source_section_id', 'source_shelf_id',
+            'destination_warehouse_id', 'destination_section_id', 'destination_shelf_id').iterator(chunk_size=2000):
+        tx.source_path = _path(sections, shelves, tx.source_warehouse_id, tx.source_section_id, tx.source_shelf_id)
+        tx.destination_path = _path(sections, shelves, tx.destination_warehouse_id, tx.destination_section_id,
+                                    tx.destination_shelf_id)
+        batch.append(tx)
+        if len(batch) >= 2000:
+            InventoryTransaction.objects.bulk_update(batch, ['source_path', 'destination_path'])
+            batch = []
+    if batch:
+        InventoryTransaction.objects.bulk_update(batch, ['source_path', 'destination_path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_transaction_module', '0003_inventorytransaction_costing'),
+        ('location_module', '0003_location_paths'),
+        ('product_module', '0004_product_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='destination_path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='source_path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['source_path'], name='inventory_t_source__e3f3e7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['destination_path'], name='inventory_t_destina_b8d5cc_idx'),
+        ),
+        migrations.RunPython(fill_location_paths, migrations.RunPython.noop),
+    ]
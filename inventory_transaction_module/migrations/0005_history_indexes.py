@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_transaction_module', '0004_location_paths'),
+        ('location_module', '0004_shelf_capacity'),
+        ('product_module', '0005_product_dimensions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['created_at', 'id'], name='invtx_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['product', 'created_at', 'id'], name='invtx_product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['source_warehouse', 'created_at', 'id'], name='invtx_src_wh_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['destination_warehouse', 'created_at', 'id'], name='invtx_dst_wh_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['transaction_type', 'created_at', 'id'], name='invtx_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(condition=models.Q(('processed', False)), fields=['created_at', 'id'], name='invtx_unprocessed_idx'),
+        ),
+    ]
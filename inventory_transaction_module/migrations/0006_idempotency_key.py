@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:18
+
+from django.db import migrations, models
+
+
+def mark_applied_processed(apps, schema_editor):
+    # transactions that already have ledger rows were applied before the processed flag was
+    # maintained; flag them so the new idempotent apply path never books them a second time
+    InventoryTransaction = apps.get_model('inventory_transaction_module', 'InventoryTransaction')
+    StockLedger = apps.get_model('stock_module', 'StockLedger')
+    InventoryTransaction.objects.filter(
+        processed=False, pk__in=StockLedger.objects.filter(transaction__isnull=False).values('transaction_id'),
+    ).update(processed=True, processed_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_transaction_module', '0005_history_indexes'),
+        ('stock_module', '0002_stockledger_alter_stock_quantity_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True, verbose_name='Idempotency Key'),
+        ),
+        migrations.RunPython(mark_applied_processed, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,64 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction, IntegrityError
 from django.utils import timezone
 from django.conf import settings
 
 from product_module.models import Product
 from location_module.models import Warehouse, Section, Shelf
 from user_module.models import User
+from location_module.services.paths import stored_paths, subtree_q
+
+
+LOCATION_FIELDS = {f'{side}_{level}{suffix}' for side in ('source', 'destination')
+                   for level in ('warehouse', 'section', 'shelf') for suffix in ('', '_id')}
+
+
+class InventoryTransactionQuerySet(models.QuerySet):
+    def under(self, location, side=None):
+        """
+        Transactions whose source and/or destination lies at or below a Warehouse / Section / Shelf.
+        side: 'source', 'destination' or None for either.
+        """
+        prefix = location if isinstance(location, str) else location.path
+        if side == 'source':
+            return self.filter(subtree_q('source_path', prefix))
+        if side == 'destination':
+            return self.filter(subtree_q('destination_path', prefix))
+        return self.filter(subtree_q('source_path', prefix) | subtree_q('destination_path', prefix))
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        paths = iter(stored_paths(location for obj in objs for location in obj.locations()))
+        for obj in objs:
+            obj.source_path, obj.destination_path = next(paths), next(paths)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def record(self, idempotency_key, apply=True, **fields):
+        """
+        Create the transaction for a client-supplied idempotency key (or find the one created
+        earlier) and apply it to stock once. Returns (transaction, created). Re-sending a key
+        is a cheap no-op; reusing it with different values raises ValueError.
+        """
+        from .services.stock_updater import StockUpdater
+
+        if not idempotency_key:
+            raise ValueError("An idempotency key is required.")
+        tx = self.filter(idempotency_key=idempotency_key).first()
+        created = False
+        if tx is None:
+            try:
+                with transaction.atomic():
+                    tx = self.create(idempotency_key=idempotency_key, **fields)
+                created = True
+            except IntegrityError:
+                # a concurrent request with the same key won the insert
+                tx = self.get(idempotency_key=idempotency_key)
+        if not created:
+            tx.check_same_request(fields)
+        if apply:
+            StockUpdater.apply(tx)
+        return tx, created
 
 
 class TransactionType(models.TextChoices):
@@ -33,6 +87,22 @@ class InventoryTransaction(models.Model):
     destination_shelf = models.ForeignKey(Shelf, on_delete=models.SET_NULL, null=True, blank=True,
                                           related_name="incoming_shelf_transactions")
 
+    # costing (see stock_module.services.valuation): purchase cost per base unit, falls back to product.price;
+    # landed_cost is a total amount (transport, customs, ...) spread over the received quantity
+    unit_cost = models.DecimalField(max_digits=18, decimal_places=6, null=True, blank=True, verbose_name="Unit Cost")
+    landed_cost = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True,
+                                      verbose_name="Landed Cost")
+    # transaction this one undoes (e.g. a borrow return reverses its issue); valued at the reversed cost
+    reverses = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='reversals',
+                                 verbose_name="Reverses")
+    # receiving leg of a two-transaction transfer (e.g. a movement segment): its outgoing leg, whose cost it carries
+    out_leg = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='in_legs',
+                                verbose_name="Outgoing leg")
+
+    # materialized paths of the most specific source / destination location (for subtree queries)
+    source_path = models.CharField(max_length=100, blank=True, default="", editable=False)
+    destination_path = models.CharField(max_length=100, blank=True, default="", editable=False)
+
     reference_number = models.CharField(max_length=100, blank=True, null=True, verbose_name="Reference Number")
     note = models.TextField(blank=True, null=True, verbose_name="Note")
 
@@ -41,9 +111,14 @@ class InventoryTransaction(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
-    # processed flag for idempotency: true after StockUpdater successfully applied
+    # processed flag for idempotency: claimed atomically by StockUpdater, rolled back if applying fails
     processed = models.BooleanField(default=False)
     processed_at = models.DateTimeField(null=True, blank=True)
+    # client-supplied key; the same key always maps to the same transaction (see objects.record)
+    idempotency_key = models.CharField(max_length=100, unique=True, null=True, blank=True,
+                                       verbose_name="Idempotency Key")
+
+    objects = InventoryTransactionQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Inventory Transaction"
@@ -52,7 +127,48 @@ class InventoryTransaction(models.Model):
         indexes = [
             models.Index(fields=['transaction_type', 'product']),
             models.Index(fields=['reference_number']),
+            models.Index(fields=['source_path']),
+            models.Index(fields=['destination_path']),
+            # keyset (created_at, id) history scans, one per filter column (services.history)
+            models.Index(fields=['created_at', 'id'], name='invtx_created_idx'),
+            models.Index(fields=['product', 'created_at', 'id'], name='invtx_product_created_idx'),
+            models.Index(fields=['source_warehouse', 'created_at', 'id'], name='invtx_src_wh_created_idx'),
+            models.Index(fields=['destination_warehouse', 'created_at', 'id'], name='invtx_dst_wh_created_idx'),
+            models.Index(fields=['transaction_type', 'created_at', 'id'], name='invtx_type_created_idx'),
+            models.Index(fields=['created_at', 'id'], condition=models.Q(processed=False),
+                         name='invtx_unprocessed_idx'),
         ]
 
     def __str__(self):
         return f"{self.transaction_type} - {self.product.name} ({self.quantity} {self.unit})"
+
+    def locations(self):
+        """(warehouse_id, section_id, shelf_id) of the source and of the destination."""
+        return [(self.source_warehouse_id, self.source_section_id, self.source_shelf_id),
+                (self.destination_warehouse_id, self.destination_section_id, self.destination_shelf_id)]
+
+    def fill_location_paths(self):
+        # read from the stored Section / Shelf paths: the process-local cache can be stale after a move
+        self.source_path, self.destination_path = stored_paths(self.locations())
+
+    def check_same_request(self, fields):
+        """Raise ValueError if a retried request (same idempotency key) carries different values."""
+        for name, value in fields.items():
+            field = self._meta.get_field(name)
+            current = getattr(self, field.attname)
+            if isinstance(value, models.Model):
+                value = value.pk
+            if isinstance(field, models.DecimalField) and value is not None and current is not None:
+                value, current = Decimal(str(value)), Decimal(str(current))
+            if current != value:
+                raise ValueError(
+                    f"Idempotency key '{self.idempotency_key}' was already used for a different transaction "
+                    f"({name}: {current!r} != {value!r}).")
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or LOCATION_FIELDS & set(update_fields):
+            self.fill_location_paths()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'source_path', 'destination_path'}
+        super().save(*args, **kwargs)
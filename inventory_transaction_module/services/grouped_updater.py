@@ -0,0 +1,124 @@
+# inventory_transaction_module/services/grouped_updater.py
+from collections import OrderedDict
+
+from django.db import transaction
+from django.utils import timezone
+
+from stock_module.models import Stock, StockLedger
+from stock_module.signals import ledger_recorded
+from ..models import InventoryTransaction
+from .strategies import resolve_warehouse_id
+
+
+class GroupedStockUpdater:
+    """
+    Applies a batch of InventoryTransactions with grouped stock updates:
+    all affected stock rows are locked with one query, their quantities are
+    written back with one bulk_update and the ledger rows with one bulk_create.
+    Stock rows are the warehouse-level rows (no section/shelf), same as the
+    per-transaction strategies. Transactions already processed are skipped.
+    """
+
+    @staticmethod
+    def _claim(txs):
+        """Claim the processed flag of every not-yet-applied transaction; returns (those in order, claim time)."""
+        if any(tx.pk is None for tx in txs):
+            raise ValueError("Save the transactions before applying them.")
+        pending = set(InventoryTransaction.objects.select_for_update().filter(
+            pk__in={tx.pk for tx in txs}, processed=False).values_list('pk', flat=True))
+        now = timezone.now()
+        if not pending:
+            return [], now
+        InventoryTransaction.objects.filter(pk__in=pending).update(processed=True, processed_at=now)
+        claimed = []
+        for tx in txs:
+            if tx.pk in pending:
+                pending.discard(tx.pk)
+                claimed.append(tx)
+        return claimed, now
+
+    @staticmethod
+    def _legs(tx):
+        """Split a transaction into (stock key, signed change, ledger note) legs."""
+        qty = tx.quantity
+        if tx.transaction_type == 'IN':
+            legs = [((tx.product_id, resolve_warehouse_id(tx, 'destination')), qty, "Inbound Transaction")]
+        elif tx.transaction_type == 'OUT':
+            legs = [((tx.product_id, resolve_warehouse_id(tx, 'source')), -qty, "Outbound Transaction")]
+        elif tx.transaction_type == 'TRANSFER':
+            legs = [
+                ((tx.product_id, resolve_warehouse_id(tx, 'source')), -qty, "Transfer OUT"),
+                ((tx.product_id, resolve_warehouse_id(tx, 'destination')), qty, "Transfer IN"),
+            ]
+        else:
+            raise ValueError(f"Unsupported transaction type: {tx.transaction_type}")
+        for (_, warehouse_id), _, _ in legs:
+            if warehouse_id is None:
+                raise ValueError(f"Transaction {tx.pk} has no warehouse for a {tx.transaction_type} leg.")
+        return legs
+
+    @staticmethod
+    def _lock_stocks(legs):
+        """Lock (and create where receiving) every stock row touched by the legs, in pk order."""
+        keys = {key for _, key, _, _ in legs}
+        stocks = {
+            (s.product_id, s.warehouse_id): s
+            for s in Stock.objects.select_for_update().filter(
+                product_id__in={k[0] for k in keys},
+                warehouse_id__in={k[1] for k in keys},
+                section__isnull=True,
+                shelf__isnull=True,
+            ).order_by('pk')
+            if (s.product_id, s.warehouse_id) in keys
+        }
+
+        missing = OrderedDict()
+        for tx, key, change, _ in legs:
+            if key not in stocks and key not in missing:
+                missing[key] = Stock(product_id=key[0], warehouse_id=key[1], quantity=0, unit=tx.unit)
+        if missing:
+            Stock.objects.bulk_create(missing.values())
+            stocks.update(missing)
+        return stocks
+
+    @classmethod
+    def apply(cls, transactions):
+        """Apply all transactions atomically; raises ValueError if any leg would go negative."""
+        txs = list(transactions)
+        if not txs:
+            return []
+
+        with transaction.atomic():
+            txs, claimed_at = cls._claim(txs)
+            if not txs:
+                return []
+            legs = [(tx, key, change, note) for tx in txs for key, change, note in cls._legs(tx)]
+            stocks = cls._lock_stocks(legs)
+            ledger = []
+            touched = OrderedDict()
+            for tx, key, change, note in legs:
+                stock = stocks[key]
+                prev_qty = stock.quantity
+                new_qty = prev_qty + change
+                if new_qty < 0:
+                    raise ValueError(
+                        f"Not enough stock to remove (product id={key[0]}, warehouse id={key[1]}, "
+                        f"available={prev_qty}, requested={-change}).")
+                stock.quantity = new_qty
+                touched[key] = stock
+                ledger.append(StockLedger(
+                    stock=stock,
+                    transaction=tx,
+                    change=change,
+                    prev_quantity=prev_qty,
+                    new_quantity=new_qty,
+                    created_by_id=tx.created_by_id,
+                    note=note,
+                ))
+
+            Stock.objects.bulk_update(touched.values(), ['quantity'])
+            StockLedger.objects.bulk_create(ledger)
+            ledger_recorded.send(sender=cls, entries=ledger)
+        for tx in txs:
+            tx.processed, tx.processed_at = True, claimed_at
+        return ledger
@@ -0,0 +1,119 @@
+# inventory_transaction_module/services/history.py
+import base64
+import heapq
+from dataclasses import dataclass, field
+
+from django.utils.dateparse import parse_datetime
+
+from ..models import InventoryTransaction
+
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(created_at, pk):
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        when = parse_datetime(created_at)
+        if when is None:
+            raise ValueError
+        return when, int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+
+
+@dataclass
+class HistoryPage:
+    results: list = field(default_factory=list)
+    next_cursor: str = None
+
+
+class TransactionHistory:
+    """
+    Transaction history newest first, paginated by keyset on (created_at, id) instead of OFFSET,
+    so every page is an index range scan no matter how deep it is. Each filter combination has
+    a matching (filter column, created_at, id) index (see InventoryTransaction.Meta.indexes).
+    A warehouse filter without a side runs the source and destination scans separately and
+    merges them, so neither has to fall back to an OR over two indexes.
+    """
+
+    @staticmethod
+    def _after(qs, cursor):
+        if cursor is None:
+            return qs
+        created_at, pk = cursor
+        # range on created_at (index seek), then skip rows of the same instant already seen
+        return qs.filter(created_at__lte=created_at).exclude(created_at=created_at, pk__gte=pk)
+
+    @staticmethod
+    def base_queryset(product=None, transaction_type=None, processed=None, since=None, until=None):
+        qs = InventoryTransaction.objects.all()
+        if product is not None:
+            qs = qs.filter(product=product)
+        if transaction_type:
+            qs = qs.filter(transaction_type=transaction_type)
+        if processed is not None:
+            qs = qs.filter(processed=processed)
+        if since is not None:
+            qs = qs.filter(created_at__gte=since)
+        if until is not None:
+            qs = qs.filter(created_at__lt=until)
+        return qs
+
+    @classmethod
+    def key_querysets(cls, cursor=None, limit=51, warehouse=None, side=None, **filters):
+        """
+        The (created_at, pk) scans one page runs: one, or two (source and destination) for a
+        warehouse without a side. cursor is a decoded (created_at, pk) position.
+        """
+        if side not in (None, 'source', 'destination'):
+            raise ValueError(f"Invalid side: {side}")
+        qs = cls.base_queryset(**filters)
+        if warehouse is None:
+            scans = [qs]
+        elif side == 'source':
+            scans = [qs.filter(source_warehouse=warehouse)]
+        elif side == 'destination':
+            scans = [qs.filter(destination_warehouse=warehouse)]
+        else:
+            scans = [qs.filter(source_warehouse=warehouse), qs.filter(destination_warehouse=warehouse)]
+        return [cls._after(scan, cursor).order_by('-created_at', '-pk').values_list('created_at', 'pk')[:limit]
+                for scan in scans]
+
+    @classmethod
+    def page(cls, cursor=None, page_size=50, warehouse=None, side=None, **filters):
+        """
+        One page of transactions. filters: product, transaction_type, processed, since, until;
+        warehouse with side 'source' / 'destination' / None (either). cursor is the previous
+        page's next_cursor.
+        """
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        position = decode_cursor(cursor) if cursor else None
+        scans = [list(qs) for qs in cls.key_querysets(position, page_size + 1, warehouse, side, **filters)]
+
+        if len(scans) == 1:
+            keys = scans[0]
+        else:
+            # a transfer inside one warehouse shows up in both scans
+            merged = heapq.merge(*scans, reverse=True)
+            keys, seen = [], set()
+            for key in merged:
+                if key[1] not in seen:
+                    seen.add(key[1])
+                    keys.append(key)
+                if len(keys) > page_size:
+                    break
+
+        result = HistoryPage()
+        if len(keys) > page_size:
+            keys = keys[:page_size]
+            result.next_cursor = encode_cursor(*keys[-1])
+        rows = InventoryTransaction.objects.select_related(
+            'product', 'source_warehouse', 'destination_warehouse').in_bulk([pk for _, pk in keys])
+        result.results = [rows[pk] for _, pk in keys if pk in rows]
+        return result
@@ -0,0 +1,349 @@
+# inventory_transaction_module/services/ingest.py
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from location_module.models import Section, Shelf, Warehouse
+from product_module.models import Product
+from product_module.services.unit_converter import UnitConverter
+from stock_module.services.metadata_cache import MetadataCache
+from ..models import InventoryTransaction, TransactionType
+from .stock_updater import StockUpdater
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_CHUNK_SIZE = 5000
+
+# side -> location fields, most general first
+SIDES = {
+    'source': ('source_warehouse', 'source_section', 'source_shelf'),
+    'destination': ('destination_warehouse', 'destination_section', 'destination_shelf'),
+}
+REQUIRED_SIDES = {
+    TransactionType.IN: ('destination',),
+    TransactionType.OUT: ('source',),
+    TransactionType.TRANSFER: ('source', 'destination'),
+}
+
+
+def _decimal(data, name, places, required=False):
+    value = data.get(name)
+    if value is None or value == '':
+        if required:
+            raise ValueError(f"{name} is required.")
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid {name}: {value!r}")
+    try:
+        value = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"Invalid {name}: {value!r}")
+    if not value.is_finite() or value.as_tuple().exponent < -places:
+        raise ValueError(f"{name} must be a number with at most {places} decimal places.")
+    return value
+
+
+def _id(data, name):
+    value = data.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{name} must be an integer id.")
+    return value
+
+
+def _product_ref(data, by_sku):
+    """Product id of a line: its "sku" when given, else its "product" (unchecked)."""
+    if data.get('sku') is not None:
+        return by_sku.get(data['sku']) if isinstance(data['sku'], str) else None
+    return _id(data, 'product')
+
+
+def _load_locations(rows):
+    """
+    The warehouses, sections and shelves the lines of a chunk refer to, one in_bulk query per
+    kind, read from the database (not MetadataCache: a location moved or added by another
+    process must not be judged by this process' copy).
+    """
+    ids = {'warehouse': set(), 'section': set(), 'shelf': set()}
+    for _, data in rows:
+        for names in SIDES.values():
+            for name in names:
+                try:
+                    pk = _id(data, name)
+                except ValueError:
+                    continue   # reported by _fields
+                if pk is not None:
+                    ids[name.split('_')[1]].add(pk)
+    querysets = {
+        'warehouse': Warehouse.objects.order_by().only('pk'),
+        'section': Section.objects.order_by().only('pk', 'warehouse_id'),
+        'shelf': Shelf.objects.order_by().select_related('section').only('pk', 'section_id', 'section__warehouse_id'),
+    }
+    return {kind: qs.in_bulk(ids[kind]) if ids[kind] else {} for kind, qs in querysets.items()}
+
+
+def _location(side, locations, warehouse_id, section_id, shelf_id):
+    """(warehouse, section, shelf) of one side, completed from the shelf / section; they must agree."""
+    if shelf_id is not None:
+        shelf = locations['shelf'][shelf_id]
+        if section_id is not None and section_id != shelf.section_id:
+            raise ValueError(f"{side}_shelf {shelf_id} is not in {side}_section {section_id}.")
+        if warehouse_id is not None and warehouse_id != shelf.section.warehouse_id:
+            raise ValueError(f"{side}_shelf {shelf_id} is not in {side}_warehouse {warehouse_id}.")
+        return shelf.section.warehouse_id, shelf.section_id, shelf_id
+    if section_id is not None:
+        section = locations['section'][section_id]
+        if warehouse_id is not None and warehouse_id != section.warehouse_id:
+            raise ValueError(f"{side}_section {section_id} is not in {side}_warehouse {warehouse_id}.")
+        return section.warehouse_id, section_id, None
+    return warehouse_id, None, None
+
+
+class TransactionIngestor:
+    """
+    Bulk ingestion of inventory transactions from NDJSON lines (one JSON object per line, field
+    names as on InventoryTransaction; product by id or "sku"; idempotency_key required).
+
+    Lines are read and handled in chunks, so memory is bounded by the chunk size whatever the
+    upload size. Per chunk: one query resolves SKUs, products come from MetadataCache, one
+    query per location kind loads the warehouses / sections / shelves, one query converts units (stored in the product's base unit, like movements),
+    one query finds keys that already exist, new rows are inserted with one bulk_create and the
+    chunk is applied with grouped stock updates. If the grouped apply fails (e.g. not enough
+    stock) the chunk is applied again one transaction at a time, so only the offending lines
+    fail. A failed transaction stays stored but unapplied; re-sending its key retries it, and
+    re-sending an applied key is a no-op reported as "duplicate".
+    """
+
+    def __init__(self, user=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        if not 1 <= chunk_size <= MAX_CHUNK_SIZE:
+            raise ValueError(f"chunk_size must be between 1 and {MAX_CHUNK_SIZE}.")
+        self.user = user if getattr(user, 'pk', None) else None
+        self.chunk_size = chunk_size
+        self.counts = {'lines': 0, 'created': 0, 'duplicate': 0, 'failed': 0}
+        self.aborted = None
+
+    def run(self, lines):
+        """
+        Yield one result dict per non-blank input line, then {'summary': counts}. An unexpected
+        error while applying stops the upload after the current chunk: its lines are reported,
+        then the summary (with "aborted") and nothing after it is read.
+        """
+        chunk = []
+        for line_no, raw in enumerate(lines, start=1):
+            if isinstance(raw, bytes):
+                raw = raw.decode('utf-8', errors='replace')
+            if not raw.strip():
+                continue
+            chunk.append((line_no, raw))
+            if len(chunk) >= self.chunk_size:
+                yield from self._process(chunk)
+                chunk = []
+                if self.aborted:
+                    break
+        if chunk and not self.aborted:
+            yield from self._process(chunk)
+        summary = dict(self.counts)
+        if self.aborted:
+            summary['aborted'] = self.aborted
+        yield {'summary': summary}
+
+    # --- per chunk ---------------------------------------------------------------------------
+
+    def _process(self, chunk):
+        results = {}
+        rows = []
+        for line_no, raw in chunk:
+            try:
+                data = json.loads(raw, parse_float=Decimal)
+                if not isinstance(data, dict):
+                    raise ValueError("Each line must be a JSON object.")
+            except ValueError as exc:
+                results[line_no] = self._error(line_no, None, exc)
+                continue
+            rows.append((line_no, data))
+
+        valid = self._validate(rows, results)
+        stored = self._store(valid, results)
+        self._apply(stored, results)
+
+        for line_no, _ in chunk:
+            result = results[line_no]
+            self.counts['lines'] += 1
+            self.counts['failed' if result['status'] == 'error' else result['status']] += 1
+            yield result
+
+    def _error(self, line_no, key, exc):
+        message = '; '.join(exc.messages) if isinstance(exc, ValidationError) else str(exc)
+        return {'line': line_no, 'idempotency_key': key, 'status': 'error', 'error': message}
+
+    def _validate(self, rows, results):
+        """Returns [(line_no, key, fields)] for the rows that are valid; errors go into results."""
+        skus = {data['sku'] for _, data in rows if isinstance(data.get('sku'), str)}
+        by_sku = dict(Product.objects.filter(sku__in=skus).values_list('sku', 'pk')) if skus else {}
+        refs = []
+        for _, data in rows:
+            try:
+                refs.append(_product_ref(data, by_sku))
+            except ValueError:
+                pass   # reported by _fields
+        products = MetadataCache.prefetch_products(ref for ref in refs if ref is not None)
+        locations = _load_locations(rows)
+
+        checked = []
+        for line_no, data in rows:
+            key = data.get('idempotency_key')
+            try:
+                checked.append((line_no, key, self._fields(data, by_sku, products, locations)))
+            except ValueError as exc:
+                results[line_no] = self._error(line_no, key if isinstance(key, str) else None, exc)
+
+        # quantities into the base unit: one query for the chunk, per line only if a unit is unknown
+        items = [(products[f['product_id']], f['quantity'], f['unit']) for _, _, f in checked]
+        try:
+            converted = UnitConverter.bulk_to_base(items)
+        except ValueError:
+            converted = []
+            for item in items:
+                try:
+                    converted.append(UnitConverter.to_base(*item))
+                except ValueError as exc:
+                    converted.append(exc)
+
+        valid = []
+        for (line_no, key, fields), quantity in zip(checked, converted):
+            if isinstance(quantity, ValueError):
+                results[line_no] = self._error(line_no, key, quantity)
+                continue
+            fields['quantity'] = quantity
+            fields['unit'] = products[fields['product_id']].base_unit
+            valid.append((line_no, key, fields))
+        return valid
+
+    @staticmethod
+    def _fields(data, by_sku, products, locations):
+        key = data.get('idempotency_key')
+        if not isinstance(key, str) or not key.strip():
+            raise ValueError("idempotency_key is required.")
+        if len(key) > 100:
+            raise ValueError("idempotency_key is longer than 100 characters.")
+
+        transaction_type = data.get('transaction_type')
+        if transaction_type not in TransactionType.values:
+            raise ValueError(f"Invalid transaction_type: {transaction_type!r}")
+
+        product_id = _product_ref(data, by_sku)
+        if data.get('sku') is not None and product_id is None:
+            raise ValueError(f"Unknown sku: {data['sku']!r}")
+        if product_id is None or product_id not in products:
+            raise ValueError(f"Unknown product: {data.get('product')!r}")
+        if not products[product_id].is_active:
+            raise ValueError(f"Product id={product_id} is not active.")
+
+        quantity = _decimal(data, 'quantity', 4, required=True)
+        if quantity <= 0:
+            raise ValueError("quantity must be positive.")
+        unit = data.get('unit') or products[product_id].base_unit
+        if not isinstance(unit, str):
+            raise ValueError("unit must be a string.")
+
+        fields = {'transaction_type': transaction_type, 'product_id': product_id, 'quantity': quantity, 'unit': unit}
+        resolved = {}
+        for side, names in SIDES.items():
+            given = False
+            for name in names:
+                pk = _id(data, name)
+                if pk is not None:
+                    if pk not in locations[name.split('_')[1]]:
+                        raise ValueError(f"Unknown {name}: {pk}")
+                    given = True
+                fields[f'{name}_id'] = pk
+            if side in REQUIRED_SIDES[transaction_type] and not given:
+                raise ValueError(f"A {side} location is required for {transaction_type}.")
+            resolved[side] = _location(side, locations, *(fields[f'{name}_id'] for name in names))
+        if transaction_type == TransactionType.TRANSFER and resolved['source'] == resolved['destination']:
+            raise ValueError("Source and destination of a transfer must differ.")
+
+        fields['unit_cost'] = _decimal(data, 'unit_cost', 6)
+        fields['landed_cost'] = _decimal(data, 'landed_cost', 2)
+        for name in ('reference_number', 'note'):
+            value = data.get(name)
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"{name} must be a string.")
+            fields[name] = value
+        if fields['reference_number'] and len(fields['reference_number']) > 100:
+            raise ValueError("reference_number is longer than 100 characters.")
+        return fields
+
+    def _store(self, valid, results):
+        """Insert the new keys, match the known ones; returns [(line_no, key, tx, created)]."""
+        existing = {tx.idempotency_key: tx for tx in InventoryTransaction.objects.filter(
+            idempotency_key__in={key for _, key, _ in valid})}
+        new = {}
+        for line_no, key, fields in valid:
+            if key not in existing and key not in new:
+                new[key] = InventoryTransaction(idempotency_key=key, created_by=self.user, **fields)
+        try:
+            with transaction.atomic():
+                InventoryTransaction.objects.bulk_create(new.values())
+        except IntegrityError:
+            # a concurrent upload inserted some of these keys: fall back to one insert per key
+            for key, tx in new.items():
+                try:
+                    with transaction.atomic():
+                        tx.save()
+                except IntegrityError:
+                    tx.pk = None
+                    existing[key] = InventoryTransaction.objects.get(idempotency_key=key)
+            new = {key: tx for key, tx in new.items() if tx.pk is not None}
+
+        stored, seen = [], set()
+        for line_no, key, fields in valid:
+            created = key in new and key not in seen
+            seen.add(key)
+            tx = new.get(key) or existing[key]
+            if not created:
+                try:
+                    tx.check_same_request(fields)
+                except ValueError as exc:
+                    results[line_no] = self._error(line_no, key, exc)
+                    continue
+            stored.append((line_no, key, tx, created))
+        return stored
+
+    def _abort(self, exc, unapplied, failed):
+        """Unexpected error (not a business rule): the transactions stay stored but unapplied, run() stops."""
+        self.aborted = f"{type(exc).__name__}: {exc}"
+        for tx in unapplied:
+            failed[tx.pk] = ValueError(f"Not applied, ingestion stopped ({self.aborted}).")
+
+    def _apply(self, stored, results):
+        pending, seen = [], set()
+        for _, _, tx, _ in stored:
+            if not tx.processed and tx.pk not in seen:
+                seen.add(tx.pk)
+                pending.append(tx)
+        failed = {}
+        try:
+            StockUpdater.apply_many(pending)
+        except ValueError:
+            # isolate the failing lines; the others are applied in their original order
+            for n, tx in enumerate(pending):
+                try:
+                    StockUpdater.apply_many([tx])
+                except ValueError as exc:
+                    failed[tx.pk] = exc
+                except Exception as exc:
+                    self._abort(exc, pending[n:], failed)
+                    break
+        except Exception as exc:
+            self._abort(exc, pending, failed)
+
+        for line_no, key, tx, created in stored:
+            if tx.pk in failed:
+                results[line_no] = self._error(line_no, key, failed[tx.pk])
+                results[line_no]['id'] = tx.pk
+            else:
+                results[line_no] = {'line': line_no, 'idempotency_key': key,
+                                    'status': 'created' if created else 'duplicate', 'id': tx.pk}
@@ -1,3 +1,8 @@
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import InventoryTransaction
+from .grouped_updater import GroupedStockUpdater
 from .strategies import InboundStrategy, OutboundStrategy, TransferStrategy
 
 
@@ -12,9 +17,30 @@ class StockUpdater:
 
     @classmethod
     def apply(cls, transaction_obj):
-        """Apply the right stock update strategy based on transaction type."""
+        """
+        Apply the right stock update strategy based on transaction type, at most once per
+        transaction: the processed flag is claimed with a conditional UPDATE in the same
+        database transaction as the stock change, so a retry (or a concurrent second call)
+        finds it claimed and does nothing. Returns True if stock was updated by this call.
+        """
         strategy_class = cls.STRATEGY_MAP.get(transaction_obj.transaction_type)
         if not strategy_class:
             raise ValueError(f"Unsupported transaction type: {transaction_obj.transaction_type}")
-        strategy = strategy_class(transaction_obj)
-        strategy.execute()
+        if transaction_obj.pk is None:
+            raise ValueError("Save the transaction before applying it.")
+
+        now = timezone.now()
+        with transaction.atomic():
+            claimed = InventoryTransaction.objects.filter(pk=transaction_obj.pk, processed=False).update(
+                processed=True, processed_at=now)
+            if not claimed:
+                return False
+            strategy = strategy_class(transaction_obj)
+            strategy.execute()
+        transaction_obj.processed, transaction_obj.processed_at = True, now
+        return True
+
+    @classmethod
+    def apply_many(cls, transactions):
+        """Apply a batch of transactions with one grouped stock update per affected stock row (skips applied ones)."""
+        return GroupedStockUpdater.apply(transactions)
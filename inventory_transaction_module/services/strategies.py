@@ -1,5 +1,15 @@
 from django.db import transaction
 from stock_module.models import Stock, StockLedger
+from stock_module.services.metadata_cache import MetadataCache
+from stock_module.signals import ledger_recorded
+
+
+def resolve_warehouse_id(tx, side):
+    """Warehouse id of the 'source' or 'destination' side, derived from the shelf/section if not set."""
+    warehouse_id = getattr(tx, f'{side}_warehouse_id')
+    if warehouse_id:
+        return warehouse_id
+    return MetadataCache.warehouse_id_for(getattr(tx, f'{side}_section_id'), getattr(tx, f'{side}_shelf_id'))
 
 
 class BaseStrategy:
@@ -12,16 +22,18 @@ class BaseStrategy:
         raise NotImplementedError("Each strategy must implement execute().")
 
     def _record_ledger(self, stock, change, user=None, note=None):
-        """Create ledger entry for stock movement."""
-        StockLedger.objects.create(
+        """Create ledger entry for stock movement (called after stock.quantity was updated)."""
+        entry = StockLedger.objects.create(
             stock=stock,
             transaction=self.tx,
             change=change,
-            prev_quantity=stock.quantity,
-            new_quantity=stock.quantity + change,
-            created_by=user,
+            prev_quantity=stock.quantity - change,
+            new_quantity=stock.quantity,
+            created_by_id=user.pk if user else self.tx.created_by_id,
             note=note
         )
+        ledger_recorded.send(sender=self.__class__, entries=[entry])
+        return entry
 
 
 class InboundStrategy(BaseStrategy):
@@ -30,14 +42,14 @@ class InboundStrategy(BaseStrategy):
     def execute(self):
         with transaction.atomic():
             stock, _ = Stock.objects.select_for_update().get_or_create(
-                product=self.tx.product,
-                warehouse=self.tx.destination_warehouse,
+                product_id=self.tx.product_id,
+                warehouse_id=resolve_warehouse_id(self.tx, 'destination'),
                 defaults={'quantity': 0, 'unit': self.tx.unit}
             )
             prev_qty = stock.quantity
             stock.quantity += self.tx.quantity
             stock.save(update_fields=['quantity'])
-            self._record_ledger(stock, self.tx.quantity, self.tx.created_by, "Inbound Transaction")
+            self._record_ledger(stock, self.tx.quantity, note="Inbound Transaction")
 
 
 class OutboundStrategy(BaseStrategy):
@@ -46,15 +58,15 @@ class OutboundStrategy(BaseStrategy):
     def execute(self):
         with transaction.atomic():
             stock = Stock.objects.select_for_update().get(
-                product=self.tx.product,
-                warehouse=self.tx.source_warehouse
+                product_id=self.tx.product_id,
+                warehouse_id=resolve_warehouse_id(self.tx, 'source')
             )
             if stock.quantity < self.tx.quantity:
                 raise ValueError("Not enough stock to remove.")
             prev_qty = stock.quantity
             stock.quantity -= self.tx.quantity
             stock.save(update_fields=['quantity'])
-            self._record_ledger(stock, -self.tx.quantity, self.tx.created_by, "Outbound Transaction")
+            self._record_ledger(stock, -self.tx.quantity, note="Outbound Transaction")
 
 
 class TransferStrategy(BaseStrategy):
@@ -64,8 +76,8 @@ class TransferStrategy(BaseStrategy):
         with transaction.atomic():
             # Outbound (source)
             source_stock = Stock.objects.select_for_update().get_or_create(
-                product=self.tx.product,
-                warehouse=self.tx.source_warehouse,
+                product_id=self.tx.product_id,
+                warehouse_id=resolve_warehouse_id(self.tx, 'source'),
                 defaults={'quantity': 0, 'unit': self.tx.unit}
             )[0]
             if source_stock.quantity < self.tx.quantity:
@@ -73,8 +85,8 @@ class TransferStrategy(BaseStrategy):
 
             # Inbound (destination)
             dest_stock, _ = Stock.objects.select_for_update().get_or_create(
-                product=self.tx.product,
-                warehouse=self.tx.destination_warehouse,
+                product_id=self.tx.product_id,
+                warehouse_id=resolve_warehouse_id(self.tx, 'destination'),
                 defaults={'quantity': 0, 'unit': self.tx.unit}
             )
 
@@ -86,5 +98,5 @@ class TransferStrategy(BaseStrategy):
             dest_stock.save(update_fields=['quantity'])
 
             # Ledger entries
-            self._record_ledger(source_stock, -self.tx.quantity, self.tx.created_by, "Transfer OUT")
-            self._record_ledger(dest_stock, self.tx.quantity, self.tx.created_by, "Transfer IN")
+            self._record_ledger(source_stock, -self.tx.quantity, note="Transfer OUT")
+            self._record_ledger(dest_stock, self.tx.quantity, note="Transfer IN")
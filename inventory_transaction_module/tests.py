@@ -1,3 +1,233 @@
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from location_module.models import Section, Shelf, Warehouse
+from product_module.models import Brand, Category, Product
+from stock_module.models import Stock, StockLedger
+from stock_module.services.metadata_cache import MetadataCache
+from user_module.models import User
+from .models import InventoryTransaction
+from .services.history import TransactionHistory
+from .services.ingest import TransactionIngestor
+from .services.stock_updater import StockUpdater
+
+
+class InventoryTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Drill', sku='DRL-1', category=Category.objects.create(name='Tools'),
+                                             brand=Brand.objects.create(name='Acme'), base_unit='pcs', price=10)
+        cls.warehouse = Warehouse.objects.create(name='Main')
+
+    def on_hand(self):
+        stock = Stock.objects.filter(product=self.product, warehouse=self.warehouse).first()
+        return stock.quantity if stock else Decimal('0')
+
+
+class IdempotentApplyTests(InventoryTestCase):
+    def fields(self, **extra):
+        return {'transaction_type': 'IN', 'product': self.product, 'quantity': 5, 'unit': 'pcs',
+                'destination_warehouse': self.warehouse, **extra}
+
+    def test_a_key_is_booked_once_however_often_it_is_applied(self):
+        tx, created = InventoryTransaction.objects.record('k-1', **self.fields())
+        again, created_again = InventoryTransaction.objects.record('k-1', **self.fields())
+        self.assertEqual((created, created_again, again.pk), (True, False, tx.pk))
+
+        self.assertFalse(StockUpdater.apply(tx))
+        StockUpdater.apply_many([tx, InventoryTransaction.objects.get(pk=tx.pk)])
+
+        self.assertEqual(self.on_hand(), Decimal('5'))
+        self.assertEqual(StockLedger.objects.filter(transaction=tx).count(), 1)
+
+    def test_reusing_a_key_for_other_values_is_rejected(self):
+        InventoryTransaction.objects.record('k-1', **self.fields())
+        with self.assertRaises(ValueError):
+            InventoryTransaction.objects.record('k-1', **self.fields(quantity=6))
+        self.assertEqual(self.on_hand(), Decimal('5'))
+
+    def test_a_failed_apply_releases_the_claim_for_a_retry(self):
+        InventoryTransaction.objects.record('in-1', **self.fields(quantity=3))
+        out = self.fields(transaction_type='OUT', destination_warehouse=None, source_warehouse=self.warehouse)
+        with self.assertRaises(ValueError):
+            InventoryTransaction.objects.record('out-1', **out)
+        tx = InventoryTransaction.objects.get(idempotency_key='out-1')
+        self.assertFalse(tx.processed)
+
+        InventoryTransaction.objects.record('in-2', **self.fields(quantity=2))
+        InventoryTransaction.objects.record('out-1', **out)
+        self.assertEqual(self.on_hand(), Decimal('0'))
+        self.assertEqual(StockLedger.objects.filter(transaction=tx).count(), 1)
+
+
+class IngestTests(InventoryTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_superuser(username='admin', password='x')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        MetadataCache.clear()
+        self.addCleanup(MetadataCache.clear)
+
+    def line(self, key, transaction_type='IN', quantity=5, **extra):
+        side = 'destination_warehouse' if transaction_type == 'IN' else 'source_warehouse'
+        return {'idempotency_key': key, 'transaction_type': transaction_type, 'sku': 'DRL-1', 'quantity': quantity,
+                side: self.warehouse.pk, **extra}
+
+    def ingest(self, *lines):
+        response = self.client.post(reverse('inventory_transaction:ingest'),
+                                    data=''.join(json.dumps(line) + '\n' for line in lines),
+                                    content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        results = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        return results[:-1], results[-1]['summary']
+
+    def test_resent_lines_are_duplicates_and_book_nothing(self):
+        results, summary = self.ingest(self.line('a'), self.line('b', quantity=2))
+        self.assertEqual([r['status'] for r in results], ['created', 'created'])
+
+        results, summary = self.ingest(self.line('a'), self.line('b', quantity=2), self.line('c', quantity=1))
+
+        self.assertEqual([r['status'] for r in results], ['duplicate', 'duplicate', 'created'])
+        self.assertEqual(summary, {'lines': 3, 'created': 1, 'duplicate': 2, 'failed': 0})
+        self.assertEqual(self.on_hand(), Decimal('8'))
+
+    def test_failed_line_is_applied_when_resent_and_changed_values_are_rejected(self):
+        results, _ = self.ingest(self.line('out', 'OUT', quantity=3), self.line('in', quantity=2))
+        self.assertEqual([r['status'] for r in results], ['error', 'created'])
+        self.assertEqual(self.on_hand(), Decimal('2'))
+
+        results, summary = self.ingest(self.line('in-2', quantity=4), self.line('out', 'OUT', quantity=3),
+                                       self.line('in', quantity=9))
+
+        self.assertEqual([r['status'] for r in results], ['created', 'duplicate', 'error'])
+        self.assertIn('already used', results[2]['error'])
+        self.assertEqual(self.on_hand(), Decimal('3'))
+        self.assertTrue(InventoryTransaction.objects.get(idempotency_key='out').processed)
+
+    def test_locations_must_belong_together_and_transfers_must_move(self):
+        other = Warehouse.objects.create(name='Other')
+        section = Section.objects.create(warehouse=other, name='A')
+        shelf = Shelf.objects.create(section=section, name='1')
+
+        results, summary = self.ingest(
+            self.line('shelf', destination_shelf=shelf.pk),
+            self.line('section', destination_section=section.pk),
+            self.line('same', 'TRANSFER', destination_warehouse=self.warehouse.pk),
+            self.line('fine', destination_warehouse=other.pk, destination_section=section.pk,
+                      destination_shelf=shelf.pk))
+
+        self.assertEqual([r['status'] for r in results], ['error', 'error', 'error', 'created'])
+        self.assertIn('is not in destination_warehouse', results[0]['error'])
+        self.assertIn('is not in destination_warehouse', results[1]['error'])
+        self.assertIn('must differ', results[2]['error'])
+        self.assertEqual(self.on_hand(), Decimal('0'))
+
+    def test_an_unexpected_error_stops_the_stream_with_a_summary(self):
+        apply_many = StockUpdater.apply_many
+
+        def flaky(txs):
+            if any(tx.idempotency_key == 'b' for tx in txs):
+                raise RuntimeError("connection lost")
+            return apply_many(txs)
+
+        lines = [json.dumps(self.line(key)) for key in 'abc']
+        with mock.patch('inventory_transaction_module.services.ingest.StockUpdater.apply_many', side_effect=flaky):
+            *results, last = TransactionIngestor(chunk_size=1).run(lines)
+
+        self.assertEqual([r['status'] for r in results], ['created', 'error'])
+        self.assertIn('connection lost', results[1]['error'])
+        self.assertEqual(last['summary']['aborted'], "RuntimeError: connection lost")
+        self.assertEqual((last['summary']['lines'], last['summary']['failed']), (2, 1))
+        self.assertFalse(InventoryTransaction.objects.get(idempotency_key='b').processed)
+        self.assertEqual(self.on_hand(), Decimal('5'))
+
+
+    def test_locations_are_read_per_chunk_not_from_a_stale_cache(self):
+        other = Warehouse.objects.create(name='Other')
+        section = Section.objects.create(warehouse=self.warehouse, name='A')
+        shelves = [Shelf.objects.create(section=section, name=str(n)) for n in range(3)]
+        MetadataCache.shelf(shelves[0].pk)
+        # moved by another process: this process' cache still has the shelf in Main
+        Section.objects.filter(pk=section.pk).update(warehouse=other)
+
+        with CaptureQueriesContext(connection) as queries:
+            results, summary = self.ingest(*[self.line(f'k-{shelf.pk}', destination_warehouse=other.pk,
+                                                       destination_shelf=shelf.pk) for shelf in shelves],
+                                           self.line('unknown', destination_shelf=0))
+
+        self.assertEqual([r['status'] for r in results], ['created', 'created', 'created', 'error'])
+        self.assertIn('Unknown destination_shelf', results[3]['error'])
+        # one read of the shelves' sections for the whole chunk (the other shelf query is the path lookup)
+        self.assertEqual(sum(q['sql'].startswith('SELECT "location_module_shelf"."id", "location_module_shelf"."section_id"')
+                             for q in queries), 1)
+
+
+class HistoryTests(InventoryTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_superuser(username='admin', password='x')
+        cls.other = Warehouse.objects.create(name='Other')
+        rows = [InventoryTransaction(transaction_type='IN', product=cls.product, quantity=1, unit='pcs',
+                                     destination_warehouse=cls.warehouse, reference_number=f"in-{i}")
+                for i in range(5)]
+        rows += [InventoryTransaction(transaction_type='TRANSFER', product=cls.product, quantity=1, unit='pcs',
+                                      source_warehouse=cls.warehouse, destination_warehouse=cls.other,
+                                      reference_number=f"tr-{i}") for i in range(2)]
+        rows.append(InventoryTransaction(transaction_type='OUT', product=cls.product, quantity=1, unit='pcs',
+                                         source_warehouse=cls.other, reference_number='out-0'))
+        InventoryTransaction.objects.bulk_create(rows)
+        # همه در یک لحظه، تا ترتیب فقط به id بستگی داشته باشد
+        InventoryTransaction.objects.update(created_at=timezone.now())
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def walk(self, page_size, **filters):
+        cursor, seen = None, []
+        while True:
+            page = TransactionHistory.page(cursor=cursor, page_size=page_size, **filters)
+            seen += [tx.pk for tx in page.results]
+            cursor = page.next_cursor
+            if cursor is None:
+                return seen
+
+    def test_keyset_pages_are_stable_across_equal_timestamps(self):
+        expected = list(InventoryTransaction.objects.order_by('-pk').values_list('pk', flat=True))
+        for page_size in (1, 2, 3, 8):
+            self.assertEqual(self.walk(page_size), expected)
+
+    def test_filters_and_either_side_warehouse_scan(self):
+        def refs(**filters):
+            return sorted(InventoryTransaction.objects.filter(pk__in=self.walk(2, **filters))
+                          .values_list('reference_number', flat=True))
+
+        self.assertEqual(refs(warehouse=self.other, side='destination'), ['tr-0', 'tr-1'])
+        self.assertEqual(refs(warehouse=self.other, side='source'), ['out-0'])
+        self.assertEqual(refs(warehouse=self.other), ['out-0', 'tr-0', 'tr-1'])
+        self.assertEqual(len(self.walk(2, warehouse=self.warehouse)), 7)
+        self.assertEqual(refs(transaction_type='OUT'), ['out-0'])
+        self.assertEqual(refs(processed=True), [])
+
+    def test_api_pages_and_rejects_a_bad_cursor(self):
+        url = reverse('inventory_transaction:history')
+        first = self.client.get(url, {'page_size': 5}).json()
+        second = self.client.get(url, {'page_size': 5, 'cursor': first['next_cursor']}).json()
+        self.assertEqual(len(first['results']) + len(second['results']), 8)
+        self.assertIsNone(second['next_cursor'])
 
-# Create your tests here.
+        for params in ({'cursor': 'not-a-cursor'}, {'side': 'both', 'warehouse': self.warehouse.pk},
+                       {'since': 'yesterday'}):
+            self.assertEqual(self.client.get(url, params).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 401)
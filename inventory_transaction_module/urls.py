@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'inventory_transaction'
+
+urlpatterns = [
+    path('history/', views.transaction_history, name='history'),
+    path('ingest/', views.ingest_transactions, name='ingest'),
+]
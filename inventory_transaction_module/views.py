@@ -1,3 +1,92 @@
-from django.shortcuts import render
+import json
+from datetime import datetime, time
 
-# Create your views here.
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.http import require_GET, require_POST
+
+from .services.history import TransactionHistory
+from .services.ingest import DEFAULT_CHUNK_SIZE, TransactionIngestor
+
+TRUE_VALUES = {'1', 'true', 'yes'}
+NDJSON_TYPES = {'application/x-ndjson', 'application/ndjson', 'application/jsonl'}
+
+
+def _parse_when(value):
+    if not value:
+        return None
+    when = parse_datetime(value)
+    if when is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        when = datetime.combine(day, time.min)
+    return timezone.make_aware(when) if timezone.is_naive(when) else when
+
+
+def _serialize(tx):
+    return {
+        'id': tx.pk,
+        'transaction_type': tx.transaction_type,
+        'product': {'id': tx.product_id, 'name': tx.product.name},
+        'quantity': str(tx.quantity),
+        'unit': tx.unit,
+        'source_warehouse': tx.source_warehouse_id,
+        'destination_warehouse': tx.destination_warehouse_id,
+        'reference_number': tx.reference_number,
+        'processed': tx.processed,
+        'created_at': tx.created_at.isoformat(),
+    }
+
+
+@require_GET
+def transaction_history(request):
+    """
+    GET ?product=&warehouse=&side=source|destination&type=&processed=&since=&until=&page_size=&cursor=
+    Newest first; follow next_cursor for the next page.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    params = request.GET
+    try:
+        processed = params.get('processed')
+        page = TransactionHistory.page(
+            cursor=params.get('cursor') or None,
+            page_size=params.get('page_size', 50),
+            product=params.get('product') or None,
+            warehouse=params.get('warehouse') or None,
+            side=params.get('side') or None,
+            transaction_type=params.get('type') or None,
+            processed=None if processed in (None, '') else processed.lower() in TRUE_VALUES,
+            since=_parse_when(params.get('since')),
+            until=_parse_when(params.get('until')),
+        )
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse({'results': [_serialize(tx) for tx in page.results], 'next_cursor': page.next_cursor})
+
+
+@require_POST
+def ingest_transactions(request):
+    """
+    POST ?chunk_size= with an NDJSON body (Content-Type application/x-ndjson), one transaction per
+    line (see services.ingest.TransactionIngestor). The body is read line by line, never whole;
+    the response streams one NDJSON result per input line as each chunk is applied, then a
+    summary line. Session clients send the CSRF token in the X-CSRFToken header.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    if not request.user.has_perm('inventory_transaction_module.add_inventorytransaction'):
+        return JsonResponse({'error': 'Permission denied.'}, status=403)
+    if request.content_type not in NDJSON_TYPES:
+        return JsonResponse({'error': 'Expected an application/x-ndjson body.'}, status=415)
+    try:
+        ingestor = TransactionIngestor(user=request.user,
+                                       chunk_size=int(request.GET.get('chunk_size') or DEFAULT_CHUNK_SIZE))
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    lines = (json.dumps(result, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+             for result in ingestor.run(request))
+    return StreamingHttpResponse(lines, content_type='application/x-ndjson')
@@ -3,6 +3,28 @@ from .models import Warehouse, Section, Shelf
 
 # Register your models here.
 
-admin.site.register(Warehouse)
-admin.site.register(Section)
-admin.site.register(Shelf)
+
+@admin.register(Warehouse)
+class WarehouseAdmin(admin.ModelAdmin):
+    list_display = ('name', 'code', 'address')
+    search_fields = ('name', 'code')
+    raw_id_fields = ('manager',)
+
+
+@admin.register(Section)
+class SectionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'code', 'warehouse')
+    list_select_related = ('warehouse',)
+    list_filter = ('warehouse',)
+    search_fields = ('code', 'name', 'label')
+    autocomplete_fields = ('warehouse',)
+
+
+@admin.register(Shelf)
+class ShelfAdmin(admin.ModelAdmin):
+    list_display = ('name', 'code', 'section', 'capacity_kind', 'capacity')
+    # __str__ of section falls back to warehouse name when the label is empty
+    list_select_related = ('section__warehouse',)
+    list_filter = ('section__warehouse', 'capacity_kind')
+    search_fields = ('code', 'name', 'label')
+    autocomplete_fields = ('section',)
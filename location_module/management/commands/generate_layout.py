@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from location_module.services.layout import LayoutSpec, LayoutGenerator
+
+
+class Command(BaseCommand):
+    help = "Create a warehouse's sections and shelves in bulk from a JSON layout spec (re-runs only add missing ones)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('spec', help="Path to the JSON layout spec")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be created")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            spec = LayoutSpec.load(options['spec'])
+            result = LayoutGenerator(spec, batch_size=options['batch_size']).apply(dry_run=options['dry_run'])
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(str(exc))
+
+        prefix = "Would create" if options['dry_run'] else "Created"
+        warehouse = f"new warehouse '{result.warehouse.name}'" if result.warehouse_created \
+            else f"warehouse '{result.warehouse.name}'"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {result.sections_created} sections and {result.shelves_created} shelves in {warehouse} "
+            f"({result.sections_existing} sections / {result.shelves_existing} shelves already existed)."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from location_module.services.paths import rebuild_paths
+
+
+class Command(BaseCommand):
+    help = ("Repair materialized location paths (warehouses, sections, shelves, stock rows, transactions) "
+            "by recomputing them from their location ids.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only count the rows with a wrong path")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = rebuild_paths(dry_run=options['dry_run'])
+        verb = "Would fix" if options['dry_run'] else "Fixed"
+        for (label, field), count in fixed.items():
+            self.stdout.write(f"{label}.{field}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"{verb} {sum(fixed.values())} stored paths."))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location_module', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='section',
+            name='code',
+            field=models.CharField(blank=True, default='', max_length=50, verbose_name='Code'),
+        ),
+        migrations.AlterField(
+            model_name='shelf',
+            name='code',
+            field=models.CharField(blank=True, default='', max_length=50, verbose_name='Code'),
+        ),
+        migrations.AlterField(
+            model_name='warehouse',
+            name='code',
+            field=models.CharField(blank=True, default='', max_length=50, unique=True, verbose_name='Code'),
+        ),
+        migrations.AddConstraint(
+            model_name='section',
+            constraint=models.UniqueConstraint(fields=('warehouse', 'name'), name='unique_section_name_per_warehouse'),
+        ),
+        migrations.AddConstraint(
+            model_name='shelf',
+            constraint=models.UniqueConstraint(fields=('section', 'name'), name='unique_shelf_name_per_section'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:04
+
+from django.db import migrations, models
+
+
+def fill_paths_and_labels(apps, schema_editor):
+    Warehouse = apps.get_model('location_module', 'Warehouse')
+    Section = apps.get_model('location_module', 'Section')
+    Shelf = apps.get_model('location_module', 'Shelf')
+
+    warehouses = list(Warehouse.objects.all())
+    for wh in warehouses:
+        wh.path = f"/{wh.pk}/"
+    Warehouse.objects.bulk_update(warehouses, ['path'], batch_size=1000)
+
+    sections = list(Section.objects.select_related('warehouse'))
+    for sec in sections:
+        sec.path = f"/{sec.warehouse_id}/{sec.pk}/"
+        sec.label = f"{sec.warehouse.name} - {sec.name} {sec.code}"
+    Section.objects.bulk_update(sections, ['path', 'label'], batch_size=1000)
+
+    shelves = list(Shelf.objects.select_related('section__warehouse'))
+    for shelf in shelves:
+        shelf.path = f"/{shelf.section.warehouse_id}/{shelf.section_id}/{shelf.pk}/"
+        shelf.label = f"{shelf.section.warehouse.name} - {shelf.section.name} - {shelf.name}"
+    Shelf.objects.bulk_update(shelves, ['path', 'label'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location_module', '0002_alter_codes_and_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='section',
+            name='label',
+            field=models.CharField(blank=True, default='', editable=False, max_length=400),
+        ),
+        migrations.AddField(
+            model_name='section',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='shelf',
+            name='label',
+            field=models.CharField(blank=True, default='', editable=False, max_length=400),
+        ),
+        migrations.AddField(
+            model_name='shelf',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='warehouse',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_paths_and_labels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location_module', '0003_location_paths'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shelf',
+            name='capacity',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=14, null=True, verbose_name='Capacity'),
+        ),
+        migrations.AddField(
+            model_name='shelf',
+            name='capacity_kind',
+            field=models.CharField(choices=[('SLOTS', 'Unit slots'), ('VOLUME', 'Volume'), ('WEIGHT', 'Weight')], default='SLOTS', max_length=10),
+        ),
+    ]
@@ -1,17 +1,22 @@
 from django.db import models
 from user_module.models import User
-from django.db.models import Max
+from django.db.models import Max, Value
+from django.db.models.functions import Concat
+
+from .services.paths import build_path, repoint_subtree
 
 
 class Warehouse(models.Model):
     name = models.CharField(max_length=200, unique=True, verbose_name="Warehouse Name")
     code = models.CharField(max_length=50, unique=True, verbose_name="Code", blank=True, null=False, default="")
     address = models.TextField(blank=True, null=True, verbose_name="Address")
+    path = models.CharField(max_length=100, blank=True, default="", editable=False, db_index=True)
     manager = models.ForeignKey(
         User, on_delete=models.SET_NULL, null=True, blank=True, related_name="managed_warehouses"
     )
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    # indexed: MAX(updated_at) versions the location lists (location_module.views.location_version)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = "Warehouse"
@@ -28,13 +33,27 @@ class Warehouse(models.Model):
             )
             next_number = last_code + 1
             self.code = f"WH-{next_number:04d}"
+        old_name = None
+        if self.pk:
+            old_name = Warehouse.objects.filter(pk=self.pk).values_list('name', flat=True).first()
         super().save(*args, **kwargs)
 
+        if self.path != build_path(self.pk):
+            self.path = build_path(self.pk)
+            Warehouse.objects.filter(pk=self.pk).update(path=self.path)
+        if old_name is not None and old_name != self.name:
+            for section in self.sections.all():
+                section.refresh_labels(warehouse_name=self.name)
+
 
 class Section(models.Model):
     warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="sections")
     name = models.CharField(max_length=100, verbose_name="Section Name")
     code = models.CharField(max_length=50, verbose_name="Code", blank=True, null=False, default="")
+    path = models.CharField(max_length=100, blank=True, default="", editable=False, db_index=True)
+    # denormalized "<warehouse> - <section> <code>" so labels render without joins
+    label = models.CharField(max_length=400, blank=True, default="", editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = "Section"
@@ -46,7 +65,18 @@ class Section(models.Model):
         ordering = ["warehouse", "name"]
 
     def __str__(self):
-        return f"{self.warehouse.name} - {self.name} {self.code}"
+        return self.label or f"{self.warehouse.name} - {self.name} {self.code}"
+
+    @staticmethod
+    def make_label(warehouse_name, name, code):
+        return f"{warehouse_name} - {name} {code}"
+
+    def refresh_labels(self, warehouse_name=None):
+        """Recompute this section's label and its shelves' labels (after a rename)."""
+        warehouse_name = warehouse_name or self.warehouse.name
+        self.label = self.make_label(warehouse_name, self.name, self.code)
+        Section.objects.filter(pk=self.pk).update(label=self.label)
+        self.shelves.update(label=Concat(Value(Shelf.make_label(warehouse_name, self.name, '')), 'name'))
 
     def save(self, *args, **kwargs):
         if not self.code:
@@ -54,14 +84,40 @@ class Section(models.Model):
                     Section.objects.filter(warehouse=self.warehouse).aggregate(max_id=Max("id")).get("max_id") or 0)
             next_num = last_section + 1
             self.code = f"SEC-{self.warehouse.code}-{next_num:02d}"
+        old = None
+        if self.pk:
+            old = Section.objects.filter(pk=self.pk).values('name', 'path').first()
+        self.label = self.make_label(self.warehouse.name, self.name, self.code)
         super().save(*args, **kwargs)
 
+        new_path = build_path(self.warehouse_id, self.pk)
+        if old and old['path'] and old['path'] != new_path:
+            repoint_subtree(old['path'], new_path)
+        if self.path != new_path:
+            self.path = new_path
+            Section.objects.filter(pk=self.pk).update(path=new_path)
+        if old and (old['name'] != self.name or old['path'] != new_path):
+            self.refresh_labels()
+
+
+class CapacityKind(models.TextChoices):
+    SLOTS = 'SLOTS', 'Unit slots'
+    VOLUME = 'VOLUME', 'Volume'
+    WEIGHT = 'WEIGHT', 'Weight'
+
 
 class Shelf(models.Model):
     section = models.ForeignKey(Section, on_delete=models.CASCADE, related_name="shelves")
     name = models.CharField(max_length=100, verbose_name="Shelf Name")
     code = models.CharField(max_length=50, verbose_name="Code", blank=True, null=False, default="")
     description = models.TextField(blank=True, null=True, verbose_name="Description")
+    # capacity in base-unit slots, or in the unit of Product.unit_volume / unit_weight; empty = not tracked
+    capacity_kind = models.CharField(max_length=10, choices=CapacityKind.choices, default=CapacityKind.SLOTS)
+    capacity = models.DecimalField(max_digits=14, decimal_places=4, null=True, blank=True, verbose_name="Capacity")
+    path = models.CharField(max_length=100, blank=True, default="", editable=False, db_index=True)
+    # denormalized "<warehouse> - <section> - <shelf>" so labels render without joins
+    label = models.CharField(max_length=400, blank=True, default="", editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = "Shelf"
@@ -73,7 +129,11 @@ class Shelf(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.section.warehouse.name} - {self.section.name} - {self.name}"
+        return self.label or f"{self.section.warehouse.name} - {self.section.name} - {self.name}"
+
+    @staticmethod
+    def make_label(warehouse_name, section_name, name):
+        return f"{warehouse_name} - {section_name} - {name}"
 
     def save(self, *args, **kwargs):
         if not self.code:
@@ -84,4 +144,15 @@ class Shelf(models.Model):
             )
             next_num = last_shelf + 1
             self.code = f"SH-{self.section.warehouse.code}-{self.section.code.split('-')[-1]}-{next_num:02d}"
+        old_path = None
+        if self.pk:
+            old_path = Shelf.objects.filter(pk=self.pk).values_list('path', flat=True).first()
+        self.label = self.make_label(self.section.warehouse.name, self.section.name, self.name)
         super().save(*args, **kwargs)
+
+        new_path = build_path(self.section.warehouse_id, self.section_id, self.pk)
+        if old_path and old_path != new_path:
+            repoint_subtree(old_path, new_path)
+        if self.path != new_path:
+            self.path = new_path
+            Shelf.objects.filter(pk=self.pk).update(path=new_path)
@@ -0,0 +1,261 @@
+# location_module/services/layout.py
+import json
+import string
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import CharField, Max, Value
+from django.db.models.functions import Cast, Concat
+
+from stock_module.services.metadata_cache import MetadataCache
+from stock_module.services.putaway import ShelfCapacityIndex
+from ..models import CapacityKind, Warehouse, Section, Shelf
+from .paths import build_path
+
+
+def _expand_ranges(value, what):
+    """[[1, 50], [60, 80]] / {"start": 1, "count": 500} / [1, 2, 5] -> list of ints."""
+    if isinstance(value, dict):
+        start = int(value.get('start', 1))
+        return list(range(start, start + int(value['count'])))
+    numbers = []
+    for item in value or []:
+        if isinstance(item, (list, tuple)):
+            if len(item) != 2:
+                raise ValueError(f"Invalid {what} range: {item}")
+            numbers.extend(range(int(item[0]), int(item[1]) + 1))
+        else:
+            numbers.append(int(item))
+    return numbers
+
+
+def _expand_aisles(value):
+    """["A", "B"] / {"start": "A", "count": 4} / {"start": 1, "count": 4} -> list of labels."""
+    if value is None:
+        return [None]
+    if isinstance(value, dict):
+        start, count = value.get('start', 'A'), int(value['count'])
+        if isinstance(start, str) and start.isalpha():
+            first = string.ascii_uppercase.index(start.upper())
+            if first + count > len(string.ascii_uppercase):
+                raise ValueError("Letter aisles run past 'Z'; use numbered aisles instead.")
+            return list(string.ascii_uppercase[first:first + count])
+        return [str(n) for n in range(int(start), int(start) + count)]
+    return [str(a) for a in value]
+
+
+def _code_number(code):
+    tail = (code or '').rsplit('-', 1)[-1]
+    return int(tail) if tail.isdigit() else 0
+
+
+@dataclass
+class LayoutSpec:
+    """
+    Declarative warehouse layout:
+
+        {
+          "warehouse": {"name": "DC North", "address": "..."},
+          "aisles": {"start": "A", "count": 8},          # optional
+          "sections_per_aisle": 5,                         # default 1
+          "section_name": "Aisle {aisle}-{section:02d}",
+          "shelves": [[1, 500]],                           # ranges, or {"start": 1, "count": 500}
+          "shelf_name": "{shelf:03d}",
+          "shelf_capacity": {"kind": "SLOTS", "capacity": 100},    # optional, for new shelves
+          "sections": [{"name": "Returns", "shelves": [[1, 20]]}]   # extra explicit sections
+        }
+
+    Patterns may use {aisle}, {section} (number within the aisle), {index} (running section
+    number); shelf patterns additionally get {section_name} and {shelf}.
+    """
+    warehouse: dict
+    sections: list = field(default_factory=list)  # [(section name, [shelf names])]
+    shelf_capacity: dict = None
+
+    @classmethod
+    def from_dict(cls, data):
+        warehouse = data.get('warehouse')
+        if isinstance(warehouse, str):
+            warehouse = {'name': warehouse}
+        if not warehouse or not warehouse.get('name'):
+            raise ValueError("Layout spec needs a warehouse name.")
+
+        aisles = _expand_aisles(data.get('aisles'))
+        per_aisle = int(data.get('sections_per_aisle', 1))
+        default_section = "{aisle}{section:02d}" if data.get('aisles') is not None else "Section {section:02d}"
+        section_pattern = data.get('section_name', default_section)
+        shelf_pattern = data.get('shelf_name', "Shelf {shelf:03d}")
+        shelf_numbers = _expand_ranges(data.get('shelves', []), 'shelf')
+
+        sections, index = [], 0
+        if data.get('aisles') is not None or 'sections_per_aisle' in data:
+            for aisle in aisles:
+                for number in range(1, per_aisle + 1):
+                    index += 1
+                    name = section_pattern.format(aisle=aisle or '', section=number, index=index)
+                    sections.append((name, cls._shelf_names(shelf_pattern, name, aisle, number, index,
+                                                            shelf_numbers)))
+        for extra in data.get('sections', []):
+            index += 1
+            name = extra['name']
+            numbers = _expand_ranges(extra['shelves'], 'shelf') if 'shelves' in extra else shelf_numbers
+            sections.append((name, cls._shelf_names(extra.get('shelf_name', shelf_pattern), name, None, index,
+                                                    index, numbers)))
+
+        capacity = data.get('shelf_capacity')
+        if capacity is not None:
+            kind = capacity.get('kind', CapacityKind.SLOTS)
+            if kind not in CapacityKind.values or capacity.get('capacity') is None:
+                raise ValueError(f"Invalid shelf_capacity: {capacity}")
+            capacity = {'capacity_kind': kind, 'capacity': capacity['capacity']}
+
+        seen = set()
+        for name, shelves in sections:
+            if name in seen:
+                raise ValueError(f"Section name '{name}' appears twice in the layout.")
+            seen.add(name)
+            if len(set(shelves)) != len(shelves):
+                raise ValueError(f"Shelf names repeat inside section '{name}'; check shelf_name / ranges.")
+        return cls(warehouse=warehouse, sections=sections, shelf_capacity=capacity)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as fp:
+            return cls.from_dict(json.load(fp))
+
+    @staticmethod
+    def _shelf_names(pattern, section_name, aisle, section, index, numbers):
+        return [pattern.format(section_name=section_name, aisle=aisle or '', section=section, index=index, shelf=n)
+                for n in numbers]
+
+
+@dataclass
+class LayoutResult:
+    warehouse: Warehouse = None
+    warehouse_created: bool = False
+    sections_created: int = 0
+    sections_existing: int = 0
+    shelves_created: int = 0
+    shelves_existing: int = 0
+
+
+class LayoutGenerator:
+    """
+    Creates a whole warehouse hierarchy from a LayoutSpec with a handful of bulk queries.
+
+    Codes follow the Section.save / Shelf.save formats (SEC-<wh>-NN, SH-<wh>-NN-NN) but are
+    numbered in memory, and labels are built in memory; paths are filled with one UPDATE per
+    level since they need the new ids. New shelves may get a capacity and are then added to
+    the putaway index (ShelfOccupancy) in bulk as well. Re-running a spec only adds the
+    sections and shelves that do not exist yet (matched by name); new codes are numbered past
+    every code already used. A spec that would create a warehouse with another warehouse's
+    code is rejected (ValueError) before anything is written.
+    """
+
+    def __init__(self, spec, batch_size=2000):
+        self.spec = spec
+        self.batch_size = batch_size
+
+    def _warehouse(self, result, dry_run):
+        data = self.spec.warehouse
+        warehouse = Warehouse.objects.filter(name=data['name']).first()
+        if warehouse is None:
+            owner = Warehouse.objects.filter(code=data.get('code') or None).values_list('name', flat=True).first()
+            if owner is not None:
+                raise ValueError(f"Warehouse code '{data['code']}' already belongs to warehouse '{owner}'.")
+            warehouse = Warehouse(name=data['name'], code=data.get('code', ''), address=data.get('address'))
+            result.warehouse_created = True
+            if not dry_run:
+                warehouse.save()
+        return warehouse
+
+    def _create_sections(self, warehouse, result):
+        existing = dict(Section.objects.filter(warehouse=warehouse).values_list('name', 'code'))
+        wanted = [name for name, _ in self.spec.sections]
+        result.sections_existing = sum(1 for name in wanted if name in existing)
+
+        # same scheme as Section.save (max id + 1), continued past any number already used
+        last = Section.objects.filter(warehouse=warehouse).aggregate(m=Max('id'))['m'] or 0
+        next_num = max([last] + [_code_number(c) for c in existing.values()]) + 1
+        new = []
+        for name in wanted:
+            if name in existing:
+                continue
+            code = f"SEC-{warehouse.code}-{next_num:02d}"
+            next_num += 1
+            new.append(Section(warehouse=warehouse, name=name, code=code,
+                               label=Section.make_label(warehouse.name, name, code)))
+        Section.objects.bulk_create(new, batch_size=self.batch_size)
+        result.sections_created = len(new)
+
+        Section.objects.filter(warehouse=warehouse, path='').update(path=Concat(
+            Value(build_path(warehouse.pk)), Cast('id', CharField()), Value('/'), output_field=CharField()))
+        return {name: (pk, code) for pk, name, code in
+                Section.objects.filter(warehouse=warehouse).values_list('pk', 'name', 'code')}
+
+    def _create_shelves(self, warehouse, sections, result):
+        existing = {}
+        for section_id, name, code in Shelf.objects.filter(section__warehouse=warehouse).values_list(
+                'section_id', 'name', 'code'):
+            existing.setdefault(section_id, {})[name] = code
+        last_ids = dict(Shelf.objects.filter(section__warehouse=warehouse).values('section_id')
+                        .annotate(m=Max('id')).values_list('section_id', 'm').order_by())
+
+        new = []
+        for section_name, shelf_names in self.spec.sections:
+            section_id, section_code = sections[section_name]
+            have = existing.get(section_id, {})
+            next_num = max([last_ids.get(section_id) or 0] + [_code_number(c) for c in have.values()]) + 1
+            suffix = section_code.split('-')[-1]
+            for name in shelf_names:
+                if name in have:
+                    result.shelves_existing += 1
+                    continue
+                new.append(Shelf(section_id=section_id, name=name,
+                                 code=f"SH-{warehouse.code}-{suffix}-{next_num:02d}",
+                                 label=Shelf.make_label(warehouse.name, section_name, name),
+                                 **(self.spec.shelf_capacity or {})))
+                next_num += 1
+        Shelf.objects.bulk_create(new, batch_size=self.batch_size)
+        result.shelves_created = len(new)
+
+        Shelf.objects.filter(section__warehouse=warehouse, path='').update(path=Concat(
+            Value(build_path(warehouse.pk)), Cast('section_id', CharField()), Value('/'),
+            Cast('id', CharField()), Value('/'), output_field=CharField()))
+        if self.spec.shelf_capacity and new:
+            ShelfCapacityIndex.sync_shelves(Shelf.objects.filter(
+                section__warehouse=warehouse, capacity__isnull=False, occupancy__isnull=True).values_list('pk', flat=True))
+
+    def _count_only(self, warehouse, result):
+        sections = self.spec.sections
+        if warehouse.pk is None:
+            result.sections_created = len(sections)
+            result.shelves_created = sum(len(shelves) for _, shelves in sections)
+            return
+        have_sections = set(Section.objects.filter(warehouse=warehouse).values_list('name', flat=True))
+        have_shelves = set(Shelf.objects.filter(section__warehouse=warehouse).values_list('section__name', 'name'))
+        for section_name, shelves in sections:
+            if section_name in have_sections:
+                result.sections_existing += 1
+            else:
+                result.sections_created += 1
+            for name in shelves:
+                if (section_name, name) in have_shelves:
+                    result.shelves_existing += 1
+                else:
+                    result.shelves_created += 1
+
+    def apply(self, dry_run=False):
+        result = LayoutResult()
+        with transaction.atomic():
+            warehouse = self._warehouse(result, dry_run)
+            result.warehouse = warehouse
+            if dry_run:
+                self._count_only(warehouse, result)
+                return result
+            sections = self._create_sections(warehouse, result)
+            self._create_shelves(warehouse, sections, result)
+        # bulk_create skips the post_save receivers that normally drop cached locations; other
+        # processes (this usually runs as a command) find the new rows on a cache miss
+        MetadataCache.invalidate_locations()
+        return result
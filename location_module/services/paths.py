@@ -0,0 +1,101 @@
+# location_module/services/paths.py
+from django.apps import apps
+from django.db.models import Case, CharField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce, Concat, NullIf, Substr
+from django.utils import timezone
+
+# Materialized paths are built from ids: "/<warehouse>/", "/<warehouse>/<section>/",
+# "/<warehouse>/<section>/<shelf>/". Only digits and "/" occur, so every path under a
+# prefix sorts in [prefix, prefix + "~") and a subtree is one indexed range predicate.
+SUBTREE_END = '~'
+
+# (model label, path column) pairs that store a location path and must follow moved subtrees
+PATH_COLUMNS = [
+    ('location_module.Section', 'path'),
+    ('location_module.Shelf', 'path'),
+    ('stock_module.Stock', 'location_path'),
+    ('inventory_transaction_module.InventoryTransaction', 'source_path'),
+    ('inventory_transaction_module.InventoryTransaction', 'destination_path'),
+]
+
+
+def build_path(warehouse_id=None, section_id=None, shelf_id=None):
+    parts = [pk for pk in (warehouse_id, section_id, shelf_id) if pk]
+    return '/' + ''.join(f'{pk}/' for pk in parts) if parts else ''
+
+
+def stored_paths(locations):
+    """
+    Path of the most specific location of each (warehouse_id, section_id, shelf_id), read from
+    the paths stored on Shelf / Section rows (at most two queries for any number of triples).
+    Writers use this rather than MetadataCache, whose copy of the hierarchy can be stale.
+    """
+    locations = list(locations)
+    Shelf, Section = apps.get_model('location_module.Shelf'), apps.get_model('location_module.Section')
+    shelf_ids = {shelf for _, _, shelf in locations if shelf}
+    shelves = dict(Shelf.objects.filter(pk__in=shelf_ids).exclude(path='').values_list('pk', 'path')) \
+        if shelf_ids else {}
+    section_ids = {section for _, section, shelf in locations if section and shelf not in shelves}
+    sections = dict(Section.objects.filter(pk__in=section_ids).exclude(path='').values_list('pk', 'path')) \
+        if section_ids else {}
+    return [shelves.get(shelf) or sections.get(section) or build_path(warehouse)
+            for warehouse, section, shelf in locations]
+
+
+def path_expression(warehouse, section, shelf):
+    """SQL twin of stored_paths() over a row's location FK columns, for set-based repairs."""
+    Shelf, Section = apps.get_model('location_module.Shelf'), apps.get_model('location_module.Section')
+    return Coalesce(
+        NullIf(Subquery(Shelf.objects.filter(pk=OuterRef(shelf)).values('path')[:1]), Value('')),
+        NullIf(Subquery(Section.objects.filter(pk=OuterRef(section)).values('path')[:1]), Value('')),
+        Case(When(**{f'{warehouse}__isnull': True}, then=Value('')),
+             default=Concat(Value('/'), Cast(warehouse, CharField()), Value('/'))),
+        output_field=CharField(),
+    )
+
+
+def subtree_q(field, prefix):
+    """Q matching every path at or below prefix (index-friendly range, no LIKE)."""
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + SUBTREE_END})
+
+
+def repoint_subtree(old_prefix, new_prefix):
+    """Rewrite every stored path under old_prefix to live under new_prefix (after a section/shelf move)."""
+    if not old_prefix or old_prefix == new_prefix:
+        return
+    for label, field in PATH_COLUMNS:
+        model = apps.get_model(label)
+        model.objects.filter(subtree_q(field, old_prefix)).update(
+            **{field: Concat(Value(new_prefix), Substr(field, len(old_prefix) + 1))})
+
+
+def _path_repairs():
+    """(model, path column, SQL expression of its correct value) in dependency order."""
+    Section = apps.get_model('location_module.Section')
+    text = lambda field: Cast(field, CharField())
+    return [
+        (apps.get_model('location_module.Warehouse'), 'path', Concat(Value('/'), text('id'), Value('/'))),
+        (Section, 'path', Concat(Value('/'), text('warehouse_id'), Value('/'), text('id'), Value('/'))),
+        (apps.get_model('location_module.Shelf'), 'path', Concat(
+            Subquery(Section.objects.filter(pk=OuterRef('section_id')).values('path')[:1]), text('id'), Value('/'))),
+        (apps.get_model('stock_module.Stock'), 'location_path', path_expression('warehouse', 'section', 'shelf')),
+        (apps.get_model('inventory_transaction_module.InventoryTransaction'), 'source_path',
+         path_expression('source_warehouse', 'source_section', 'source_shelf')),
+        (apps.get_model('inventory_transaction_module.InventoryTransaction'), 'destination_path',
+         path_expression('destination_warehouse', 'destination_section', 'destination_shelf')),
+    ]
+
+
+def rebuild_paths(dry_run=False):
+    """
+    Recompute every stored location path from the ids it is made of, one UPDATE per column
+    touching only the wrong rows. Returns {(model label, column): rows fixed (or to fix)}.
+    """
+    fixed, now = {}, timezone.now()
+    for model, field, expression in _path_repairs():
+        stale = model.objects.exclude(**{field: expression})
+        changes = {field: expression}
+        if model._meta.app_label == 'location_module':
+            changes['updated_at'] = now     # moves the location lists' version (location_version)
+        fixed[(model._meta.label, field)] = stale.count() if dry_run else stale.update(**changes)
+    return fixed
@@ -1,3 +1,215 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+
+from inventory_transaction_module.models import InventoryTransaction
+from product_module.models import Brand, Category, Product
+from stock_module.models import Stock
+from stock_module.services.metadata_cache import MetadataCache
+from user_module.models import User
+from .models import Section, Shelf, Warehouse
+from .services.layout import LayoutGenerator, LayoutSpec
+from .services.paths import build_path
+
+
+class LocationPathTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Drill', category=Category.objects.create(name='Tools'),
+                                             brand=Brand.objects.create(name='Acme'), base_unit='pcs', price=10)
+        cls.w1, cls.w2 = Warehouse.objects.create(name='W1'), Warehouse.objects.create(name='W2')
+        cls.s1 = Section.objects.create(warehouse=cls.w1, name='A')
+        cls.s2 = Section.objects.create(warehouse=cls.w2, name='B')
+        cls.shelf = Shelf.objects.create(section=cls.s1, name='1')
+
+    def setUp(self):
+        MetadataCache.clear()
+        self.addCleanup(MetadataCache.clear)
+
+    def test_writes_use_stored_paths_not_a_stale_cache(self):
+        MetadataCache.warm(products=False)
+        # moved by another process: this process's cache still has the shelf in section A
+        new_path = build_path(self.w2.pk, self.s2.pk, self.shelf.pk)
+        Shelf.objects.filter(pk=self.shelf.pk).update(section=self.s2, path=new_path)
+
+        tx = InventoryTransaction.objects.create(transaction_type='IN', product=self.product, quantity=1,
+                                                 unit='pcs', destination_warehouse=self.w2,
+                                                 destination_shelf=self.shelf)
+        bulk, = InventoryTransaction.objects.bulk_create([InventoryTransaction(
+            transaction_type='OUT', product=self.product, quantity=1, unit='pcs', source_shelf=self.shelf)])
+        stock = Stock.objects.create(product=self.product, warehouse=self.w2, shelf=self.shelf)
+
+        self.assertEqual((tx.destination_path, bulk.source_path, stock.location_path), (new_path,) * 3)
+
+    def test_rebuild_location_paths_repairs_wrong_rows(self):
+        tx = InventoryTransaction.objects.create(transaction_type='IN', product=self.product, quantity=1,
+                                                 unit='pcs', destination_warehouse=self.w1,
+                                                 destination_section=self.s1, destination_shelf=self.shelf)
+        stock = Stock.objects.create(product=self.product, warehouse=self.w1, section=self.s1)
+        Shelf.objects.filter(pk=self.shelf.pk).update(path='/0/')
+        Stock.objects.filter(pk=stock.pk).update(location_path='/0/')
+        InventoryTransaction.objects.filter(pk=tx.pk).update(destination_path='', source_path='/0/')
+
+        out = StringIO()
+        call_command('rebuild_location_paths', stdout=out)
+
+        self.assertIn("Fixed 4 stored paths", out.getvalue())
+        self.shelf.refresh_from_db()
+        stock.refresh_from_db()
+        tx.refresh_from_db()
+        self.assertEqual(self.shelf.path, build_path(self.w1.pk, self.s1.pk, self.shelf.pk))
+        self.assertEqual(stock.location_path, build_path(self.w1.pk, self.s1.pk))
+        self.assertEqual((tx.source_path, tx.destination_path), ('', self.shelf.path))
+
+    def test_stock_under_accepts_only_warehouses(self):
+        InventoryTransaction.objects.record('in-1', transaction_type='IN', product=self.product, quantity=1,
+                                            unit='pcs', destination_warehouse=self.w1)
+        self.assertEqual(Stock.objects.under(self.w1).count(), 1)
+        with self.assertRaises(ValueError):
+            Stock.objects.under(self.s1)
+
+
+class AdminQueryCountTests(TestCase):
+    """Admin pages run a fixed number of queries, whatever the number of rows shown."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='x'))
+
+    @staticmethod
+    def add_shelves(count):
+        warehouse = Warehouse.objects.create(name=f'W{Warehouse.objects.count()}')
+        for n in range(count):
+            Shelf.objects.create(section=Section.objects.create(warehouse=warehouse, name=f'S{n}'), name='1')
+        return Shelf.objects.latest('pk')
+
+    def assertPageQueries(self, expected, url):
+        self.client.get(url)  # warm process-level caches (content types, permissions)
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_changelists(self):
+        pages = {'admin:location_module_warehouse_changelist': 5,
+                 'admin:location_module_section_changelist': 6,
+                 'admin:location_module_shelf_changelist': 6}
+        for rows in (2, 20):
+            self.add_shelves(rows)
+            for name, expected in pages.items():
+                with self.subTest(page=name, rows=rows):
+                    self.assertPageQueries(expected, reverse(name))
+
+    def test_shelf_change_form(self):
+        for rows in (2, 20):
+            shelf = self.add_shelves(rows)
+            self.assertPageQueries(4, reverse('admin:location_module_shelf_change', args=[shelf.pk]))
+
+
+class LocationContentsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Drill', sku='DRL-1', category=Category.objects.create(name='Tools'),
+                                             brand=Brand.objects.create(name='Acme'), base_unit='pcs', price=10)
+        cls.warehouse = Warehouse.objects.create(name='W1')
+        cls.section = Section.objects.create(warehouse=cls.warehouse, name='A')
+        InventoryTransaction.objects.record('in-1', transaction_type='IN', product=cls.product, quantity=3,
+                                            unit='pcs', destination_warehouse=cls.warehouse)
+        cls.user = User.objects.create(username='scanner')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    def test_warehouse_contents(self):
+        response = self.client.get(reverse('location:contents-sync'), {'location': self.warehouse.path})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(r['sku'], r['quantity']) for r in response.json()['results']], [('DRL-1', '3.0000')])
+
+    def test_section_path_is_rejected(self):
+        response = self.client.get(reverse('location:contents-sync'), {'location': self.section.path})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('per warehouse', response.json()['error'])
+
+    async def test_async_lookup_rejects_a_section_path(self):
+        response = await self.async_client.get(reverse('location:contents'), {'location': self.section.path})
+        self.assertEqual(response.status_code, 400)
+
+
+class LayoutGeneratorTests(TestCase):
+    SPEC = {'warehouse': {'name': 'DC North', 'code': 'DCN'}, 'aisles': {'start': 'A', 'count': 2},
+            'sections_per_aisle': 2, 'shelves': {'start': 1, 'count': 3}, 'shelf_name': '{shelf:02d}',
+            'shelf_capacity': {'kind': 'SLOTS', 'capacity': 50}}
+
+    def setUp(self):
+        MetadataCache.clear()
+        self.addCleanup(MetadataCache.clear)
+
+    def generate(self, spec=None, **kwargs):
+        return LayoutGenerator(LayoutSpec.from_dict(spec or self.SPEC)).apply(**kwargs)
+
+    def test_generates_counts_codes_paths_and_labels(self):
+        self.assertEqual(self.generate(dry_run=True).shelves_created, 12)
+        self.assertFalse(Warehouse.objects.filter(name='DC North').exists())
+
+        result = self.generate()
+
+        warehouse = result.warehouse
+        self.assertEqual((result.sections_created, result.shelves_created), (4, 12))
+        section = Section.objects.get(warehouse=warehouse, name='A02')
+        shelf = Shelf.objects.get(section=section, name='03')
+        self.assertEqual(section.path, build_path(warehouse.pk, section.pk))
+        self.assertEqual(shelf.path, build_path(warehouse.pk, section.pk, shelf.pk))
+        self.assertEqual(section.label, Section.make_label('DC North', 'A02', section.code))
+        self.assertEqual(shelf.label, 'DC North - A02 - 03')
+        self.assertTrue(section.code.startswith('SEC-DCN-'))
+        self.assertEqual(MetadataCache.warehouse_id_for(shelf_id=shelf.pk), warehouse.pk)
+
+    def test_a_rerun_only_adds_missing_locations_with_fresh_codes(self):
+        self.generate()
+        spec = dict(self.SPEC, shelves={'start': 1, 'count': 4})
+
+        result = self.generate(spec)
+
+        self.assertEqual((result.sections_created, result.shelves_created, result.shelves_existing), (0, 4, 12))
+        codes = list(Shelf.objects.filter(section__warehouse=result.warehouse).values_list('section', 'code'))
+        self.assertEqual(len(codes), len(set(codes)))
+
+    def test_a_warehouse_code_of_another_warehouse_is_rejected(self):
+        Warehouse.objects.create(name='Old DC', code='DCN')
+        with self.assertRaises(ValueError):
+            self.generate()
+        self.assertFalse(Warehouse.objects.filter(name='DC North').exists())
+
+
+class LocationListEtagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='keeper')
+        cls.warehouse = Warehouse.objects.create(name='Main')
+        cls.section = Section.objects.create(warehouse=cls.warehouse, name='A')
+        cls.shelf = Shelf.objects.create(section=cls.section, name='1')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def assertChanged(self, name, change):
+        url = reverse(f'location:{name}')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_a_warehouse_rename_moves_the_shelf_labels_and_their_etag(self):
+        def rename():
+            self.warehouse.name = 'Central'
+            self.warehouse.save()
+
+        self.assertEqual(self.assertChanged('shelves', rename)[0]['label'], 'Central - A - 1')
 
-# Create your tests here.
+    def test_etag_follows_inserts_and_deletes(self):
+        results = self.assertChanged('sections', lambda: Section.objects.create(warehouse=self.warehouse, name='B'))
+        self.assertEqual(len(results), 2)
+        self.assertEqual(self.assertChanged('shelves', self.shelf.delete), [])
+        self.assertChanged('warehouses', lambda: Warehouse.objects.create(name='Other'))
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'location'
+
+urlpatterns = [
+    path('warehouses/', views.warehouse_list, name='warehouses'),
+    path('sections/', views.section_list, name='sections'),
+    path('shelves/', views.shelf_list, name='shelves'),
+    path('contents/', views.location_contents, name='contents'),
+    path('contents/sync/', views.location_contents_sync, name='contents-sync'),
+]
@@ -1,3 +1,118 @@
-from django.shortcuts import render
+import re
 
-# Create your views here.
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from InventoryProject.api import apage, json_response, not_modified, page, table_version
+from stock_module.models import Stock
+from .models import Section, Shelf, Warehouse
+
+LOCATION_PATH = re.compile(r'^/(\d+/){1,3}$')
+
+
+def location_version():
+    """All three location tables: labels and paths are denormalized across them."""
+    return table_version(Warehouse.objects.all(), Section.objects.all(), Shelf.objects.all())
+
+
+@require_GET
+def warehouse_list(request):
+    """GET ?after=<id>&limit= — warehouses; conditional on location_version()."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    cached, etag = not_modified(request, location_version())
+    if cached is not None:
+        return cached
+    try:
+        rows, cursor = page(Warehouse.objects.values('pk', 'code', 'name', 'path'), request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    results = [{'id': r['pk'], 'code': r['code'], 'name': r['name'], 'path': r['path']} for r in rows]
+    return json_response(request, {'results': results, 'next': cursor}, etag=etag)
+
+
+@require_GET
+def section_list(request):
+    """GET ?warehouse=&after=<id>&limit= — sections."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    cached, etag = not_modified(request, location_version())
+    if cached is not None:
+        return cached
+    qs = Section.objects.values('pk', 'warehouse_id', 'code', 'name', 'label', 'path')
+    try:
+        if request.GET.get('warehouse'):
+            qs = qs.filter(warehouse_id=int(request.GET['warehouse']))
+        rows, cursor = page(qs, request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    results = [{'id': r['pk'], 'warehouse': r['warehouse_id'], 'code': r['code'], 'name': r['name'],
+                'label': r['label'], 'path': r['path']} for r in rows]
+    return json_response(request, {'results': results, 'next': cursor}, etag=etag)
+
+
+@require_GET
+def shelf_list(request):
+    """GET ?section=|?warehouse=&after=<id>&limit= — shelves with their capacity."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    cached, etag = not_modified(request, location_version())
+    if cached is not None:
+        return cached
+    qs = Shelf.objects.values('pk', 'section_id', 'code', 'name', 'label', 'path', 'capacity_kind', 'capacity')
+    try:
+        if request.GET.get('section'):
+            qs = qs.filter(section_id=int(request.GET['section']))
+        if request.GET.get('warehouse'):
+            qs = qs.filter(section__warehouse_id=int(request.GET['warehouse']))
+        rows, cursor = page(qs, request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    results = [{'id': r['pk'], 'section': r['section_id'], 'code': r['code'], 'name': r['name'],
+                'label': r['label'], 'path': r['path'], 'capacity_kind': r['capacity_kind'],
+                'capacity': None if r['capacity'] is None else str(r['capacity'])} for r in rows]
+    return json_response(request, {'results': results, 'next': cursor}, etag=etag)
+
+
+def _contents_query(params):
+    """Stock rows under a location path; stock is kept per warehouse, so deeper paths are rejected (400)."""
+    location = params.get('location', '')
+    if not LOCATION_PATH.match(location):
+        raise ValueError("location must be a path like /<warehouse>/<section>/<shelf>/.")
+    return Stock.objects.under(location).values(
+        'pk', 'product_id', 'product__sku', 'product__name', 'location_path', 'quantity', 'unit')
+
+
+def _contents_payload(location, rows, cursor):
+    return {
+        'location': location,
+        'results': [{
+            'id': r['pk'], 'product': r['product_id'], 'sku': r['product__sku'], 'name': r['product__name'],
+            'location': r['location_path'], 'quantity': str(r['quantity']), 'unit': r['unit'],
+        } for r in rows],
+        'next': cursor,
+    }
+
+
+@require_GET
+async def location_contents(request):
+    """GET ?location=/<warehouse>/&after=<id>&limit= — what is stored in a warehouse (async, for scanners)."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    try:
+        rows, cursor = await apage(_contents_query(request.GET), request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(_contents_payload(request.GET['location'], rows, cursor))
+
+
+@require_GET
+def location_contents_sync(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    try:
+        rows, cursor = page(_contents_query(request.GET), request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(_contents_payload(request.GET['location'], rows, cursor))
@@ -1,11 +1,56 @@
 # movement_module/admin.py
-from django.contrib import admin
-from .models import ProductMovement, MovementSegment, MovementCost
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.forms.models import BaseInlineFormSet
+from django.urls import reverse
+from django.utils.html import format_html
+from .models import ProductMovement, MovementSegment, MovementCost, ApprovalJob
+
+
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """Autocomplete widget that labels its current value from an already loaded object, without a query."""
+    preloaded = None
+
+    def optgroups(self, name, value, attr=None):
+        obj = self.preloaded
+        if obj is None or [str(v) for v in value if v not in ('', None)] != [str(obj.pk)]:
+            return super().optgroups(name, value, attr)
+        options = [] if self.is_required else [self.create_option(name, '', '', False, 0)]
+        options.append(self.create_option(name, obj.pk, self.choices.field.label_from_instance(obj),
+                                          True, len(options)))
+        return [(None, options, 0)]
+
+
+class PreloadedInlineFormSet(BaseInlineFormSet):
+    """Hands each row's select_related objects to its autocomplete widgets (one query per page, not per row)."""
+
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        for name, field in form.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if isinstance(widget, PreloadedAutocompleteSelect):
+                model_field = form.instance._meta.get_field(name)
+                if model_field.is_cached(form.instance):
+                    widget.preloaded = model_field.get_cached_value(form.instance)
+        return form
 
 
 class MovementSegmentInline(admin.TabularInline):
     model = MovementSegment
+    formset = PreloadedInlineFormSet
     extra = 1
+    # the transaction links render one option per transaction ever created
+    exclude = ('related_inventory_transactions',)
+    autocomplete_fields = ('product', 'from_warehouse', 'to_warehouse')
+
+    def get_queryset(self, request):
+        # movement and product are read by __str__ of each row
+        return super().get_queryset(request).select_related('movement', 'product', 'from_warehouse', 'to_warehouse')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.autocomplete_fields:
+            kwargs['widget'] = PreloadedAutocompleteSelect(db_field, self.admin_site, using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 class MovementCostInline(admin.TabularInline):
@@ -16,22 +61,67 @@ class MovementCostInline(admin.TabularInline):
 @admin.register(ProductMovement)
 class ProductMovementAdmin(admin.ModelAdmin):
     list_display = ('reference_no', 'movement_type', 'status', 'created_at', 'processed')
+    list_filter = ('status', 'movement_type')
+    search_fields = ('reference_no',)
+    autocomplete_fields = ('source_warehouse', 'destination_warehouse')
+    raw_id_fields = ('created_by', 'approved_by')
     inlines = [MovementSegmentInline]
-    actions = ['approve_selected']
+    actions = ['approve_selected', 'reverse_selected']
 
     def approve_selected(self, request, queryset):
-        for mov in queryset.filter(status='DRAFT'):
-            mov.approve(user=request.user, run_async=False)
+        # approval runs as one background job; the request only enqueues it
+        from .services.approval_jobs import ApprovalJobRunner
+        ids = list(queryset.filter(status='DRAFT').order_by('pk').values_list('pk', flat=True))
+        if not ids:
+            self.message_user(request, "No DRAFT movements selected.", level=messages.WARNING)
+            return
+        job = ApprovalJobRunner.enqueue(ids, user=request.user)
+        url = reverse('admin:movement_module_approvaljob_change', args=[job.pk])
+        self.message_user(request, format_html(
+            'Approval of {} movements queued as <a href="{}">job {}</a>.', len(ids), url, job.pk))
 
     approve_selected.short_description = "Approve selected movements"
 
+    def reverse_selected(self, request, queryset):
+        from .services.reversal import MovementReversal
+        try:
+            reversals = MovementReversal.reverse(queryset.exclude(status='CANCELLED'), user=request.user)
+        except ValueError as e:
+            self.message_user(request, str(e), level=messages.ERROR)
+            return
+        self.message_user(request, f"{len(reversals)} compensating transactions created.")
+
+    reverse_selected.short_description = "Reverse (void) selected movements"
+
 
 @admin.register(MovementSegment)
 class MovementSegmentAdmin(admin.ModelAdmin):
     list_display = ('movement', 'product', 'quantity', 'processed')
+    list_select_related = ('movement', 'product')
+    list_filter = ('processed',)
+    search_fields = ('movement__reference_no',)
+    autocomplete_fields = ('product', 'from_warehouse', 'to_warehouse')
+    raw_id_fields = ('movement', 'related_inventory_transactions')
     inlines = [MovementCostInline]
 
 
 @admin.register(MovementCost)
 class MovementCostAdmin(admin.ModelAdmin):
     list_display = ('segment', 'cost_type', 'amount', 'created_at')
+    # segment __str__ reads movement and product
+    list_select_related = ('segment__movement', 'segment__product')
+    raw_id_fields = ('segment',)
+
+
+@admin.register(ApprovalJob)
+class ApprovalJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'total', 'processed', 'failed', 'remaining', 'created_by', 'created_at',
+                    'finished_at')
+    list_select_related = ('created_by',)
+    list_filter = ('status',)
+    readonly_fields = ('status', 'total', 'processed', 'failed', 'remaining', 'errors', 'created_by', 'created_at',
+                       'started_at', 'heartbeat_at', 'runner', 'finished_at')
+    exclude = ('movement_ids',)
+
+    def has_add_permission(self, request):
+        return False
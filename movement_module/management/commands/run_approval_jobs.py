@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from movement_module.services.approval_jobs import ApprovalJobRunner
+
+
+class Command(BaseCommand):
+    help = ("Run pending bulk approval jobs (when they are not started on a background thread) and resume "
+            "running jobs whose runner stopped sending heartbeats.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', type=int, action='append', help="Only these job ids (repeatable)")
+
+    def handle(self, *args, **options):
+        jobs = ApprovalJobRunner.runnable().order_by('pk')
+        if options['job']:
+            jobs = jobs.filter(pk__in=options['job'])
+        for job_id in jobs.values_list('pk', flat=True):
+            job = ApprovalJobRunner.run(job_id)
+            if job is not None:
+                self.stdout.write(f"Job {job.pk}: {job.processed} approved, {job.failed} failed.")
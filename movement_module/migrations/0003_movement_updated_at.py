@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movement_module', '0002_approval_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productmovement',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -45,6 +45,8 @@ class ProductMovement(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     approved_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # indexed: MAX(updated_at) versions the movement list (movement_module.views.movement_version)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     processed = models.BooleanField(default=False,
                                     help_text="True when movement processed into inventory transactions and stock updated")
@@ -93,6 +95,16 @@ class ProductMovement(models.Model):
         MovementProcessor.process(self, run_async=run_async)
         return self
 
+    def reverse(self, user=None):
+        """
+        Void the movement: compensate every processed segment and set the status to CANCELLED.
+        Unprocessed segments are simply left out; a cancelled movement cannot be reversed again.
+        """
+        if self.status == MovementStatus.CANCELLED:
+            raise ValueError("Movement is already cancelled.")
+        from .services.reversal import MovementReversal
+        return MovementReversal.reverse(self, user=user)
+
     def save(self, *args, **kwargs):
         # generate reference_no only when movement_type is present
         if not self.reference_no and self.movement_type:
@@ -119,6 +131,9 @@ class ProductMovement(models.Model):
             new_number = last_number + 1
             self.reference_no = f"{prefix}-{new_number:05d}"
 
+        # partial saves (status changes) must move updated_at too
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'updated_at'}
         super().save(*args, **kwargs)
 
 
@@ -217,3 +232,58 @@ class MovementCost(models.Model):
 
     def __str__(self):
         return f"{self.segment.id} - {self.get_cost_type_display()} - {self.amount}"
+
+
+class JobStatus(models.TextChoices):
+    PENDING = 'PENDING', 'Pending'
+    RUNNING = 'RUNNING', 'Running'
+    DONE = 'DONE', 'Done'
+    FAILED = 'FAILED', 'Failed'
+
+
+class ApprovalJob(models.Model):
+    """
+    Batch of movements approved in the background (see services.approval_jobs).
+    Progress counters are updated with every movement; errors maps movement id -> message.
+    runner / heartbeat_at identify the runner that owns a RUNNING job and when it last
+    made progress, so a job whose runner died can be reclaimed and resumed.
+    """
+    status = models.CharField(max_length=10, choices=JobStatus.choices, default=JobStatus.PENDING, db_index=True)
+    movement_ids = models.JSONField(default=list)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=dict, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name="approval_jobs")
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    runner = models.CharField(max_length=64, blank=True, default="")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Approval Job"
+        verbose_name_plural = "Approval Jobs"
+
+    def __str__(self):
+        return f"Approval job {self.pk} ({self.status}): {self.processed}/{self.total}, {self.failed} failed"
+
+    @property
+    def remaining(self):
+        return max(self.total - self.processed - self.failed, 0)
+
+    def as_dict(self):
+        return {
+            'id': self.pk,
+            'status': self.status,
+            'total': self.total,
+            'processed': self.processed,
+            'failed': self.failed,
+            'remaining': self.remaining,
+            'errors': self.errors,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
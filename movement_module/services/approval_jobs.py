@@ -0,0 +1,132 @@
+# movement_module/services/approval_jobs.py
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import ApprovalJob, JobStatus, MovementStatus, ProductMovement
+from .processor import MovementProcessor
+
+DEFAULT_STALE_SECONDS = 300
+
+
+class JobReclaimed(Exception):
+    """The job was taken over by another runner (this one was considered dead)."""
+
+
+class ApprovalJobRunner:
+    """
+    Approves a batch of movements outside the request. enqueue() stores an ApprovalJob and,
+    after commit, starts it on a background thread (settings.INVENTORY_APPROVAL_JOBS_IN_THREAD,
+    default True; otherwise run the run_approval_jobs command from a worker / cron).
+
+    Every movement is approved and processed in its own DB transaction with grouped stock
+    application, and the job's counters and heartbeat move in that same transaction, so
+    processed + failed is exactly the number of movements handled. A failing movement (any
+    exception) is rolled back - it stays DRAFT -, its error is recorded on the job and the
+    batch continues. A RUNNING job whose heartbeat is older than
+    INVENTORY_APPROVAL_JOB_STALE_SECONDS (default 300, longer than any single movement takes)
+    is considered orphaned: the next runner claims it with a new runner token and resumes
+    after the last handled movement, and the old runner's next write finds the token changed
+    and stops. Movements already approved and processed are counted without work.
+    """
+
+    @staticmethod
+    def in_thread():
+        return getattr(settings, 'INVENTORY_APPROVAL_JOBS_IN_THREAD', True)
+
+    @staticmethod
+    def stale_seconds():
+        return getattr(settings, 'INVENTORY_APPROVAL_JOB_STALE_SECONDS', DEFAULT_STALE_SECONDS)
+
+    @classmethod
+    def runnable(cls):
+        """PENDING jobs and RUNNING jobs whose runner stopped sending heartbeats."""
+        cutoff = timezone.now() - timedelta(seconds=cls.stale_seconds())
+        return ApprovalJob.objects.filter(
+            Q(status=JobStatus.PENDING)
+            | Q(status=JobStatus.RUNNING, heartbeat_at__lt=cutoff)
+            | Q(status=JobStatus.RUNNING, heartbeat_at__isnull=True, started_at__lt=cutoff))
+
+    @classmethod
+    def enqueue(cls, movements, user=None):
+        ids = [getattr(m, 'pk', m) for m in movements]
+        job = ApprovalJob.objects.create(movement_ids=ids, total=len(ids), created_by=user)
+        if cls.in_thread():
+            transaction.on_commit(lambda: cls.start(job.pk))
+        return job
+
+    @classmethod
+    def start(cls, job_id):
+        thread = threading.Thread(target=cls._run_in_thread, args=(job_id,), name=f"approval-job-{job_id}",
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    @classmethod
+    def _run_in_thread(cls, job_id):
+        try:
+            cls.run(job_id)
+        finally:
+            # the thread opened its own connection
+            connection.close()
+
+    @staticmethod
+    def approve(movement_id, user=None):
+        """Approve and process one DRAFT movement; returns False if it was already approved and processed."""
+        with transaction.atomic():
+            movement = ProductMovement.objects.select_for_update().get(pk=movement_id)
+            if movement.status != MovementStatus.DRAFT:
+                if movement.processed:
+                    return False
+                raise ValueError("Only DRAFT movements can be approved.")
+            movement.clean()
+            movement.status = MovementStatus.APPROVED
+            movement.approved_by = user or movement.approved_by
+            movement.approved_at = timezone.now()
+            movement.save(update_fields=['status', 'approved_by', 'approved_at'])
+            MovementProcessor.process(movement, grouped=True)
+        return True
+
+    @classmethod
+    def claim(cls, job_id):
+        """Take a PENDING or orphaned RUNNING job; returns the runner token, or None if it is not runnable."""
+        token = uuid.uuid4().hex
+        now = timezone.now()
+        claimed = cls.runnable().filter(pk=job_id).update(
+            status=JobStatus.RUNNING, runner=token, heartbeat_at=now, started_at=Coalesce('started_at', Value(now)))
+        return token if claimed else None
+
+    @classmethod
+    def run(cls, job_id):
+        """Run (or resume) a job to the end; returns the job, or None if it is not runnable or was taken over."""
+        token = cls.claim(job_id)
+        if token is None:
+            return None
+        job = ApprovalJob.objects.select_related('created_by').get(pk=job_id)
+        progress = ApprovalJob.objects.filter(pk=job_id, runner=token)
+        try:
+            for movement_id in job.movement_ids[job.processed + job.failed:]:
+                try:
+                    with transaction.atomic():
+                        cls.approve(movement_id, job.created_by)
+                        if not progress.update(processed=F('processed') + 1, heartbeat_at=timezone.now()):
+                            raise JobReclaimed()
+                except JobReclaimed:
+                    return None
+                except Exception as e:
+                    job.errors[str(movement_id)] = '; '.join(e.messages) if isinstance(e, ValidationError) else str(e)
+                    if not progress.update(failed=F('failed') + 1, errors=job.errors, heartbeat_at=timezone.now()):
+                        return None
+        except Exception:
+            progress.update(status=JobStatus.FAILED, finished_at=timezone.now())
+            raise
+        progress.update(status=JobStatus.DONE, finished_at=timezone.now())
+        job.refresh_from_db()
+        return job
@@ -1,5 +1,6 @@
 # movement_module/services/processor.py
 from django.db import transaction
+from inventory_transaction_module.services.stock_updater import StockUpdater
 from .strategies import get_strategy_for
 from ..models import ProductMovement, MovementStatus
 from django.utils import timezone
@@ -8,11 +9,18 @@ from django.utils import timezone
 class MovementProcessor:
 
     @classmethod
-    def process(cls, movement: ProductMovement, run_async=False):
+    def process(cls, movement: ProductMovement, run_async=False, grouped=False):
+        """
+        grouped=True: strategies only record the transactions and they are applied together
+        with StockUpdater.apply_many (one lock / bulk write per stock row) before commit.
+        """
 
         # idempotency: اگر قبلاً پردازش شده، کاری نکن
         if movement.processed:
             return []
+        # movement لغو شده دیگر پردازش نمی‌شود
+        if movement.status == MovementStatus.CANCELLED:
+            return []
 
         # validation (business rules)
         movement.clean()
@@ -24,7 +32,9 @@ class MovementProcessor:
         # کل فرایند را در یک transaction دیتابیسی امن انجام می‌دهیم
         # هر segment نیز داخل استراتژی خودش atomic دارد (double safety)
         with transaction.atomic():
-            created_txs = strategy.process(movement)
+            created_txs = strategy.process(movement, apply=not grouped)
+            if grouped:
+                StockUpdater.apply_many(created_txs)
 
             # اگر همه segmentها پردازش شدند -> movement را تکمیل کن
             if not movement.segments.filter(processed=False).exists():
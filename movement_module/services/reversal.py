@@ -0,0 +1,101 @@
+# movement_module/services/reversal.py
+from django.db import transaction
+from django.utils import timezone
+
+from inventory_transaction_module.models import InventoryTransaction
+from inventory_transaction_module.services.stock_updater import StockUpdater
+from ..models import ProductMovement, MovementSegment, MovementStatus
+
+REVERSED_TYPE = {'IN': 'OUT', 'OUT': 'IN', 'TRANSFER': 'TRANSFER'}
+SIDE_FIELDS = ('warehouse_id', 'section_id', 'shelf_id')
+
+
+class MovementReversal:
+    """
+    Voids movements: every inventory transaction of their processed segments gets a
+    compensating transaction (opposite type, source and destination swapped, `reverses` set
+    so valuation books it as a REVERSAL at the original cost), all applied in one grouped
+    batch, newest original first, linked to the segment and the movement set to CANCELLED.
+    The legs of a reversed movement transfer are paired again (out_leg), so the goods go back
+    at the cost they leave the destination with.
+
+    Reversing twice is impossible: only non-cancelled movements are picked up (under a row
+    lock) and each compensating transaction carries the idempotency key REV-<original id>;
+    originals that already have theirs are skipped.
+    The whole batch is one DB transaction: if any stock row would go negative (e.g. received
+    goods were already issued) nothing is reversed and ValueError is raised.
+    """
+
+    @staticmethod
+    def _compensating(original, movement, user):
+        fields = {
+            'transaction_type': REVERSED_TYPE[original.transaction_type],
+            'product_id': original.product_id,
+            'quantity': original.quantity,
+            'unit': original.unit,
+            'created_by_id': getattr(user, 'pk', None) or original.created_by_id,
+            'reference_number': f"{movement.reference_no}-REV",
+            'note': f"Reversal of transaction {original.pk} ({movement.reference_no})",
+            'idempotency_key': f"REV-{original.pk}",
+            'reverses_id': original.pk,
+        }
+        for name in SIDE_FIELDS:
+            fields[f'source_{name}'] = getattr(original, f'destination_{name}')
+            fields[f'destination_{name}'] = getattr(original, f'source_{name}')
+        return InventoryTransaction(**fields)
+
+    @classmethod
+    def reverse(cls, movements, user=None):
+        """Reverse one movement or many (iterable / queryset); returns the compensating transactions."""
+        if isinstance(movements, ProductMovement):
+            movements = [movements]
+        ids = [getattr(m, 'pk', m) for m in movements]
+
+        with transaction.atomic():
+            locked = {m.pk: m for m in ProductMovement.objects.select_for_update().filter(pk__in=ids)
+                      .exclude(status=MovementStatus.CANCELLED).order_by('pk')}
+            if not locked:
+                return []
+
+            Link = MovementSegment.related_inventory_transactions.through
+            links = list(Link.objects.filter(
+                movementsegment__movement_id__in=locked.keys(), movementsegment__processed=True,
+            ).values_list('movementsegment_id', 'movementsegment__movement_id', 'inventorytransaction_id'))
+            originals = InventoryTransaction.objects.in_bulk([tx_id for _, _, tx_id in links])
+            # a movement put back to a live status must not be reversed a second time
+            done = set(InventoryTransaction.objects.filter(
+                idempotency_key__in=[f"REV-{pk}" for pk in originals]).values_list('reverses_id', flat=True))
+
+            reversals, segment_of, reversal_of = [], [], {}
+            # undo newest first, so e.g. an issue is put back before the receipt it drew from is removed
+            for segment_id, movement_id, tx_id in sorted(links, key=lambda link: -link[2]):
+                original = originals.get(tx_id)
+                # the segment also links the reversals of an earlier run
+                if (original is None or not original.processed or original.reverses_id is not None
+                        or original.pk in done):
+                    continue
+                reversal_of[original.pk] = cls._compensating(original, locked[movement_id], user)
+                reversals.append(reversal_of[original.pk])
+                segment_of.append(segment_id)
+
+            InventoryTransaction.objects.bulk_create(reversals, batch_size=2000)
+            # the reversed IN leg goes out first; the reversed OUT leg brings its cost back
+            paired = []
+            for pk, original in originals.items():
+                if original.out_leg_id in reversal_of and pk in reversal_of:
+                    reversal_of[original.out_leg_id].out_leg_id = reversal_of[pk].pk
+                    paired.append(reversal_of[original.out_leg_id])
+            if paired:
+                InventoryTransaction.objects.bulk_update(paired, ['out_leg'])
+            StockUpdater.apply_many(reversals)
+            Link.objects.bulk_create([
+                Link(movementsegment_id=segment_id, inventorytransaction_id=tx.pk)
+                for segment_id, tx in zip(segment_of, reversals)
+            ], batch_size=2000)
+            ProductMovement.objects.filter(pk__in=locked.keys()).update(
+                status=MovementStatus.CANCELLED, updated_at=timezone.now())
+
+        for movement in movements:
+            if isinstance(movement, ProductMovement) and movement.pk in locked:
+                movement.status = MovementStatus.CANCELLED
+        return reversals
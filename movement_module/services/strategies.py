@@ -1,11 +1,12 @@
 # movement_module/services/strategies.py
-from decimal import Decimal, InvalidOperation
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import Sum
 
 from inventory_transaction_module.models import InventoryTransaction
-from inventory_transaction_module.services.stock_updater import StockUpdater
-from product_module.models import ProductConversion
+from product_module.services.unit_converter import UnitConverter
+from stock_module.services.metadata_cache import MetadataCache
+from ..models import MovementCost
 
 STRATEGY_REGISTRY = {}
 
@@ -30,28 +31,34 @@ class BaseMovementStrategy:
     Interface: هر استراتژی باید متد process(movement) پیاده‌سازی کند.
     """
 
-    def process(self, movement):
+    def process(self, movement, apply=True):
+        """apply=False: only record the transactions; the caller applies them (grouped)."""
         raise NotImplementedError
 
     def convert_to_base(self, product, qty, unit):
         """
         تبدیل مقدار به base_unit محصول. اگر تبدیل تعریف نشده باشد، ValueError می‌اندازد.
         """
-        # ensure Decimal
-        try:
-            qty_dec = Decimal(qty)
-        except (InvalidOperation, TypeError):
-            raise ValueError(f"Invalid quantity: {qty}")
+        return UnitConverter.to_base(product, qty, unit)
 
-        base_unit = getattr(product, 'base_unit', None)
-        if not unit or unit == base_unit:
-            return qty_dec
+    @staticmethod
+    def idempotency_key(movement, segment, leg):
+        """کلید یکتای تراکنش هر segment؛ اجرای دوباره‌ی همان segment تراکنش تکراری نمی‌سازد."""
+        return f"MOV-{movement.pk}-SEG-{segment.pk}-{leg}"
 
-        conv = ProductConversion.objects.filter(product=product, from_unit=unit, to_unit=base_unit).first()
-        if conv:
-            return (qty_dec * Decimal(conv.factor)).quantize(Decimal('0.0001'))
-        raise ValueError(
-            f"No conversion from '{unit}' to '{base_unit}' for product id={product.pk} ('{product.name}'). Please define ProductConversion.")
+    def pending_segments(self, movement):
+        """
+        segmentهای پردازش نشده (قفل شده) به ترتیب sequence؛ متادیتای محصولاتشان یکجا در
+        MetadataCache بارگذاری می‌شود تا در حلقه کوئری FK زده نشود.
+        """
+        segments = list(movement.segments.select_for_update().filter(processed=False).order_by('sequence'))
+        MetadataCache.prefetch_products(seg.product_id for seg in segments)
+        # هزینه‌های حمل (MovementCost) هر segment به عنوان landed_cost روی تراکنش ورودی می‌نشیند
+        costs = dict(MovementCost.objects.filter(segment__in=[seg.pk for seg in segments])
+                     .values('segment').annotate(total=Sum('amount')).values_list('segment', 'total'))
+        for seg in segments:
+            seg.landed_cost = costs.get(seg.pk)
+        return segments
 
 
 @register_strategy('IN')
@@ -60,25 +67,27 @@ class InboundMovementStrategy(BaseMovementStrategy):
     برای هر segment: ایجاد یک InventoryTransaction نوع IN (destination)، سپس StockUpdater.apply
     """
 
-    def process(self, movement):
+    def process(self, movement, apply=True):
         created_txs = []
         # lock segments rows to avoid concurrent processing
-        for seg in movement.segments.select_for_update().filter(processed=False).order_by('sequence'):
+        for seg in self.pending_segments(movement):
             with transaction.atomic():
-                qty_base = self.convert_to_base(seg.product, seg.quantity, seg.unit)
-                tx = InventoryTransaction(
+                product = MetadataCache.product(seg.product_id)
+                qty_base = self.convert_to_base(product, seg.quantity, seg.unit)
+                # idempotency key per segment leg: a retried segment reuses the already-applied transaction
+                tx, _ = InventoryTransaction.objects.record(
+                    self.idempotency_key(movement, seg, 'IN'),
+                    apply=apply,
                     transaction_type='IN',
-                    product=seg.product,
+                    product_id=seg.product_id,
                     quantity=qty_base,
-                    unit=seg.product.base_unit,
+                    unit=product.base_unit,
                     source_warehouse=None,
-                    destination_warehouse=seg.to_warehouse or movement.destination_warehouse,
-                    created_by=movement.approved_by,
+                    destination_warehouse_id=seg.to_warehouse_id or movement.destination_warehouse_id,
+                    created_by_id=movement.approved_by_id,
                     reference_number=movement.reference_no,
+                    landed_cost=seg.landed_cost,
                 )
-                tx.save()
-                # apply stock update (may raise)
-                StockUpdater.apply(tx)
                 created_txs.append(tx)
                 seg.mark_processed(tx_list=[tx])
         return created_txs
@@ -90,24 +99,25 @@ class OutboundMovementStrategy(BaseMovementStrategy):
     برای هر segment: ایجاد یک InventoryTransaction نوع OUT (source)، سپس StockUpdater.apply
     """
 
-    def process(self, movement):
+    def process(self, movement, apply=True):
         created_txs = []
-        for seg in movement.segments.select_for_update().filter(processed=False).order_by('sequence'):
+        for seg in self.pending_segments(movement):
             with transaction.atomic():
-                qty_base = self.convert_to_base(seg.product, seg.quantity, seg.unit)
-                tx = InventoryTransaction(
+                product = MetadataCache.product(seg.product_id)
+                qty_base = self.convert_to_base(product, seg.quantity, seg.unit)
+                # applies the stock update (this will check availability)
+                tx, _ = InventoryTransaction.objects.record(
+                    self.idempotency_key(movement, seg, 'OUT'),
+                    apply=apply,
                     transaction_type='OUT',
-                    product=seg.product,
+                    product_id=seg.product_id,
                     quantity=qty_base,
-                    unit=seg.product.base_unit,
-                    source_warehouse=seg.from_warehouse or movement.source_warehouse,
+                    unit=product.base_unit,
+                    source_warehouse_id=seg.from_warehouse_id or movement.source_warehouse_id,
                     destination_warehouse=None,
-                    created_by=movement.approved_by,
+                    created_by_id=movement.approved_by_id,
                     reference_number=movement.reference_no,
                 )
-                tx.save()
-                # apply stock update (this will check availability)
-                StockUpdater.apply(tx)
                 created_txs.append(tx)
                 seg.mark_processed(tx_list=[tx])
         return created_txs
@@ -119,38 +129,42 @@ class TransferMovementStrategy(BaseMovementStrategy):
     برای هر segment: تولید دو تراکنش (OUT از مبدأ و IN به مقصد)، سپس apply هر دو.
     """
 
-    def process(self, movement):
+    def process(self, movement, apply=True):
         created_txs = []
-        for seg in movement.segments.select_for_update().filter(processed=False).order_by('sequence'):
+        for seg in self.pending_segments(movement):
             with transaction.atomic():
-                qty_base = self.convert_to_base(seg.product, seg.quantity, seg.unit)
+                product = MetadataCache.product(seg.product_id)
+                qty_base = self.convert_to_base(product, seg.quantity, seg.unit)
 
-                out_tx = InventoryTransaction(
+                # first remove from source (StockUpdater will raise if not enough)
+                out_tx, _ = InventoryTransaction.objects.record(
+                    self.idempotency_key(movement, seg, 'OUT'),
+                    apply=apply,
                     transaction_type='OUT',
-                    product=seg.product,
+                    product_id=seg.product_id,
                     quantity=qty_base,
-                    unit=seg.product.base_unit,
-                    source_warehouse=seg.from_warehouse or movement.source_warehouse,
-                    destination_warehouse=seg.to_warehouse or movement.destination_warehouse,
-                    created_by=movement.approved_by,
+                    unit=product.base_unit,
+                    source_warehouse_id=seg.from_warehouse_id or movement.source_warehouse_id,
+                    destination_warehouse_id=seg.to_warehouse_id or movement.destination_warehouse_id,
+                    created_by_id=movement.approved_by_id,
                     reference_number=movement.reference_no,
                 )
-                out_tx.save()
-                # first remove from source (StockUpdater will raise if not enough)
-                StockUpdater.apply(out_tx)
 
-                in_tx = InventoryTransaction(
+                in_tx, _ = InventoryTransaction.objects.record(
+                    self.idempotency_key(movement, seg, 'IN'),
+                    apply=apply,
                     transaction_type='IN',
-                    product=seg.product,
+                    product_id=seg.product_id,
                     quantity=qty_base,
-                    unit=seg.product.base_unit,
-                    source_warehouse=seg.from_warehouse or movement.source_warehouse,
-                    destination_warehouse=seg.to_warehouse or movement.destination_warehouse,
-                    created_by=movement.approved_by,
+                    unit=product.base_unit,
+                    source_warehouse_id=seg.from_warehouse_id or movement.source_warehouse_id,
+                    destination_warehouse_id=seg.to_warehouse_id or movement.destination_warehouse_id,
+                    created_by_id=movement.approved_by_id,
                     reference_number=movement.reference_no,
+                    landed_cost=seg.landed_cost,
+                    # valuation carries the outgoing leg's cost to the destination
+                    out_leg_id=out_tx.pk,
                 )
-                in_tx.save()
-                StockUpdater.apply(in_tx)
 
                 created_txs.extend([out_tx, in_tx])
                 seg.mark_processed(tx_list=[out_tx, in_tx])
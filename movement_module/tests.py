@@ -1,3 +1,247 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory_transaction_module.models import InventoryTransaction
+from location_module.models import Warehouse
+from product_module.models import Brand, Category, Product
+from stock_module.models import Stock, ValuationEntry, ValuationKind
+from stock_module.services.analytics import InventoryAnalytics
+from stock_module.services.forecasting import DemandForecaster
+from stock_module.services.valuation import ValuationEngine
+from user_module.models import User
+from .models import ApprovalJob, JobStatus, MovementCost, MovementSegment, MovementStatus, ProductMovement
+from .services.approval_jobs import ApprovalJobRunner
+from .services.processor import MovementProcessor
+from .services.reversal import MovementReversal
+
+
+class AdminQueryCountTests(TestCase):
+    """Admin pages run a fixed number of queries, whatever the number of rows shown."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username='admin', password='x')
+        cls.category, cls.brand = Category.objects.create(name='Tools'), Brand.objects.create(name='Acme')
+        cls.source, cls.destination = Warehouse.objects.create(name='W1'), Warehouse.objects.create(name='W2')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def add_movements(self, count, segments=1):
+        for n in range(count):
+            movement = ProductMovement.objects.create(movement_type='TRANSFER', source_warehouse=self.source,
+                                                      destination_warehouse=self.destination, created_by=self.user)
+            for _ in range(segments):
+                product = Product.objects.create(name=f'P{Product.objects.count()}', category=self.category,
+                                                 brand=self.brand, base_unit='pcs', price=1)
+                segment = MovementSegment.objects.create(movement=movement, product=product, quantity=1, unit='pcs',
+                                                         from_warehouse=self.source, to_warehouse=self.destination)
+                MovementCost.objects.create(segment=segment, cost_type='FREIGHT', amount=1)
+        return movement
+
+    def assertPageQueries(self, expected, url):
+        self.client.get(url)  # warm process-level caches (content types, permissions)
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_changelists(self):
+        pages = {'admin:movement_module_productmovement_changelist': 5,
+                 'admin:movement_module_movementsegment_changelist': 5,
+                 'admin:movement_module_movementcost_changelist': 5}
+        for rows in (2, 20):
+            self.add_movements(rows)
+            for name, expected in pages.items():
+                with self.subTest(page=name, rows=rows):
+                    self.assertPageQueries(expected, reverse(name))
+
+    def test_movement_change_form(self):
+        for segments in (2, 20):
+            movement = self.add_movements(1, segments)
+            self.assertPageQueries(7, reverse('admin:movement_module_productmovement_change', args=[movement.pk]))
+
+
+@override_settings(INVENTORY_APPROVAL_JOBS_IN_THREAD=False, INVENTORY_APPROVAL_JOB_STALE_SECONDS=60)
+class ApprovalJobRunnerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='keeper')
+        cls.source, cls.destination = Warehouse.objects.create(name='W1'), Warehouse.objects.create(name='W2')
+
+    def movements(self, count):
+        return [ProductMovement.objects.create(movement_type='TRANSFER', source_warehouse=self.source,
+                                               destination_warehouse=self.destination, created_by=self.user)
+                for _ in range(count)]
+
+    def test_an_unexpected_error_is_recorded_and_the_batch_continues(self):
+        first, broken, last = self.movements(3)
+        job = ApprovalJobRunner.enqueue([first, broken, last], self.user)
+
+        def process(movement, **kwargs):
+            if movement.pk == broken.pk:
+                raise RuntimeError("disk full")
+            return []
+
+        with mock.patch('movement_module.services.approval_jobs.MovementProcessor.process', side_effect=process):
+            job = ApprovalJobRunner.run(job.pk)
+
+        self.assertEqual((job.status, job.processed, job.failed), (JobStatus.DONE, 2, 1))
+        self.assertEqual(job.errors, {str(broken.pk): "disk full"})
+        broken.refresh_from_db()
+        self.assertEqual(broken.status, MovementStatus.DRAFT)
+
+    def test_a_stale_running_job_is_reclaimed_and_resumed(self):
+        done, approved, pending = self.movements(3)
+        ProductMovement.objects.filter(pk=approved.pk).update(status=MovementStatus.APPROVED, processed=True)
+        job = ApprovalJob.objects.create(movement_ids=[done.pk, approved.pk, pending.pk], total=3, processed=1,
+                                         status=JobStatus.RUNNING, runner='dead', started_at=timezone.now(),
+                                         heartbeat_at=timezone.now() - timedelta(seconds=120))
+        self.assertEqual(list(ApprovalJobRunner.runnable()), [job])
+
+        job = ApprovalJobRunner.run(job.pk)
+
+        self.assertEqual((job.status, job.processed, job.failed), (JobStatus.DONE, 3, 0))
+        self.assertNotEqual(job.runner, 'dead')
+        done.refresh_from_db()
+        pending.refresh_from_db()
+        self.assertEqual((done.status, pending.status), (MovementStatus.DRAFT, MovementStatus.COMPLETED))
+
+    def test_a_live_running_job_is_left_alone(self):
+        movement, = self.movements(1)
+        job = ApprovalJob.objects.create(movement_ids=[movement.pk], total=1, status=JobStatus.RUNNING,
+                                         runner='alive', started_at=timezone.now(), heartbeat_at=timezone.now())
+
+        self.assertIsNone(ApprovalJobRunner.run(job.pk))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.runner, job.processed), (JobStatus.RUNNING, 'alive', 0))
+
+    def test_a_reclaimed_runner_stops_without_writing(self):
+        first, second = self.movements(2)
+        job = ApprovalJobRunner.enqueue([first, second], self.user)
+
+        def process(movement, **kwargs):
+            ApprovalJob.objects.filter(pk=job.pk).update(runner='other')
+            return []
+
+        with mock.patch('movement_module.services.approval_jobs.MovementProcessor.process', side_effect=process):
+            self.assertIsNone(ApprovalJobRunner.run(job.pk))
+
+        job.refresh_from_db()
+        first.refresh_from_db()
+        self.assertEqual((job.status, job.processed, first.status), (JobStatus.RUNNING, 0, MovementStatus.DRAFT))
+
+
+@override_settings(INVENTORY_VALUATION_METHOD='FIFO')
+class ReversalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Drill', category=Category.objects.create(name='Tools'),
+                                             brand=Brand.objects.create(name='Acme'), base_unit='pcs', price=10)
+        cls.source, cls.destination = Warehouse.objects.create(name='W1'), Warehouse.objects.create(name='W2')
+
+    def receive(self, key, quantity, unit_cost, warehouse=None):
+        InventoryTransaction.objects.record(key, transaction_type='IN', product=self.product, quantity=quantity,
+                                           unit='pcs', destination_warehouse=warehouse or self.source,
+                                           unit_cost=unit_cost)
+
+    def process(self, movement_type, quantity, source=None, destination=None):
+        movement = ProductMovement.objects.create(movement_type=movement_type, source_warehouse=source,
+                                                  destination_warehouse=destination, status=MovementStatus.APPROVED)
+        MovementSegment.objects.create(movement=movement, product=self.product, quantity=quantity, unit='pcs',
+                                       from_warehouse=source, to_warehouse=destination)
+        MovementProcessor.process(movement)
+        return movement
+
+    def on_hand(self, warehouse):
+        return Stock.objects.get(product=self.product, warehouse=warehouse).quantity
+
+    def reversal_entries(self, movement):
+        return ValuationEntry.objects.filter(ledger__transaction__reference_number=f"{movement.reference_no}-REV")
+
+    def test_a_reversed_receipt_leaves_at_its_own_cost(self):
+        self.receive('old', 4, 25)
+        movement = self.process('IN', 2, destination=self.source)   # at the product price, 10
+        self.receive('new', 2, 40)
+        self.assertEqual(ValuationEngine.inventory_value(), Decimal('200'))
+
+        MovementReversal.reverse(movement)
+
+        entry = self.reversal_entries(movement).get()
+        self.assertEqual((entry.kind, entry.unit_cost), (ValuationKind.REVERSAL, Decimal('10')))
+        self.assertEqual(ValuationEngine.inventory_value(), Decimal('180'))
+        self.assertEqual(self.on_hand(self.source), Decimal('6'))
+        with self.settings(INVENTORY_VALUATION_METHOD='AVG'):
+            ValuationEngine.rebuild()
+        self.assertEqual(ValuationEngine.inventory_value(), Decimal('180'))
+
+    def test_a_reversed_issue_comes_back_at_its_issue_cost_and_is_not_consumption(self):
+        self.receive('old', 4, 25)
+        movement = self.process('OUT', 1, source=self.source)
+        self.receive('new', 2, 40)
+        start = timezone.now() - timedelta(days=1)
+        self.assertEqual(ValuationEngine.cogs(start, timezone.now() + timedelta(days=1)), Decimal('25'))
+
+        MovementReversal.reverse(movement)
+
+        entry = self.reversal_entries(movement).get()
+        self.assertEqual((entry.kind, entry.unit_cost), (ValuationKind.REVERSAL, Decimal('25')))
+        self.assertEqual(ValuationEngine.inventory_value(), Decimal('180'))
+        self.assertEqual(ValuationEngine.cogs(start, timezone.now() + timedelta(days=1)), Decimal('0'))
+        self.assertFalse(DemandForecaster._demand(start).exists())
+        self.assertEqual(list(InventoryAnalytics.compute(window_days=1).issued), [0.0])
+
+    def test_a_reversed_transfer_brings_the_goods_back_at_their_transfer_cost(self):
+        self.receive('a', 2, 10)
+        self.receive('b', 4, 25)
+        movement = self.process('TRANSFER', 2, source=self.source, destination=self.destination)
+        self.receive('c', 1, 50, warehouse=self.destination)
+        self.assertEqual(ValuationEngine.inventory_value(warehouse=self.destination), Decimal('70'))
+
+        MovementReversal.reverse(movement)
+
+        self.assertEqual(sorted(self.reversal_entries(movement).values_list('kind', 'value')),
+                         [(ValuationKind.TRANSFER_IN, Decimal('20')), (ValuationKind.TRANSFER_OUT, Decimal('-20'))])
+        self.assertEqual(ValuationEngine.inventory_value(warehouse=self.destination), Decimal('50'))
+        self.assertEqual(ValuationEngine.inventory_value(warehouse=self.source), Decimal('120'))
+        self.assertEqual((self.on_hand(self.source), self.on_hand(self.destination)), (Decimal('6'), Decimal('1')))
+
+    def test_reversing_again_is_a_no_op(self):
+        self.receive('old', 4, 25)
+        movement = self.process('OUT', 1, source=self.source)
+        first = MovementReversal.reverse(movement)
+        self.assertEqual((len(first), movement.status), (1, MovementStatus.CANCELLED))
+
+        self.assertEqual(MovementReversal.reverse(movement), [])
+        # even a movement put back to a live status keeps its single reversal
+        ProductMovement.objects.filter(pk=movement.pk).update(status=MovementStatus.COMPLETED)
+        self.assertEqual(MovementReversal.reverse([movement.pk]), [])
+
+        self.assertEqual(self.on_hand(self.source), Decimal('4'))
+        self.assertEqual(InventoryTransaction.objects.filter(reverses__isnull=False).count(), 1)
+
+
+class MovementListEtagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='keeper')
+        cls.movement = ProductMovement.objects.create(movement_type='IN', created_by=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_a_partial_save_moves_the_etag(self):
+        url = reverse('movement:list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.movement.status = MovementStatus.APPROVED
+        self.movement.save(update_fields=['status'])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['status'], MovementStatus.APPROVED)
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'movement'
+
+urlpatterns = [
+    path('', views.movement_list, name='list'),
+    path('<int:pk>/', views.movement_detail, name='detail'),
+    path('approval-jobs/<int:pk>/', views.approval_job_status, name='approval-job'),
+]
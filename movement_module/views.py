@@ -1,3 +1,81 @@
-from django.shortcuts import render
+from django.db.models import Q
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+from InventoryProject.api import json_response, not_modified, page, table_version
+from .models import ApprovalJob, MovementSegment, ProductMovement
+
+MOVEMENT_FIELDS = ('pk', 'reference_no', 'movement_type', 'status', 'source_warehouse_id',
+                   'destination_warehouse_id', 'created_at', 'approved_at', 'completed_at', 'processed')
+
+
+def _movement(row):
+    return {
+        'id': row['pk'],
+        'reference_no': row['reference_no'],
+        'type': row['movement_type'],
+        'status': row['status'],
+        'source_warehouse': row['source_warehouse_id'],
+        'destination_warehouse': row['destination_warehouse_id'],
+        'created_at': row['created_at'],
+        'approved_at': row['approved_at'],
+        'completed_at': row['completed_at'],
+        'processed': row['processed'],
+    }
+
+
+def movement_version():
+    return table_version(ProductMovement.objects.all())
+
+
+@require_GET
+def approval_job_status(request, pk):
+    """GET progress of a bulk approval job: processed / failed / remaining counts and per-movement errors."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    job = ApprovalJob.objects.filter(pk=pk).first()
+    if job is None:
+        return JsonResponse({'error': 'Job not found.'}, status=404)
+    return JsonResponse(job.as_dict())
+
+
+@require_GET
+def movement_list(request):
+    """GET ?status=&type=&warehouse=&after=<id>&limit= — movements; conditional on movement_version()."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    cached, etag = not_modified(request, movement_version())
+    if cached is not None:
+        return cached
+    params = request.GET
+    qs = ProductMovement.objects.values(*MOVEMENT_FIELDS)
+    if params.get('status'):
+        qs = qs.filter(status=params['status'])
+    if params.get('type'):
+        qs = qs.filter(movement_type=params['type'])
+    try:
+        if params.get('warehouse'):
+            warehouse = int(params['warehouse'])
+            qs = qs.filter(Q(source_warehouse_id=warehouse) | Q(destination_warehouse_id=warehouse))
+        rows, cursor = page(qs, params)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return json_response(request, {'results': [_movement(row) for row in rows], 'next': cursor}, etag=etag)
+
+
+@require_GET
+def movement_detail(request, pk):
+    """GET a movement with its segments."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    row = ProductMovement.objects.filter(pk=pk).values(*MOVEMENT_FIELDS).first()
+    if row is None:
+        return JsonResponse({'error': 'Movement not found.'}, status=404)
+    payload = _movement(row)
+    payload['segments'] = [{
+        'id': s['pk'], 'sequence': s['sequence'], 'product': s['product_id'], 'quantity': str(s['quantity']),
+        'unit': s['unit'], 'from_warehouse': s['from_warehouse_id'], 'to_warehouse': s['to_warehouse_id'],
+        'processed': s['processed'],
+    } for s in MovementSegment.objects.filter(movement_id=pk).order_by('sequence', 'pk').values(
+        'pk', 'sequence', 'product_id', 'quantity', 'unit', 'from_warehouse_id', 'to_warehouse_id', 'processed')]
+    return json_response(request, payload)
@@ -1,11 +1,44 @@
 from django.contrib import admin
 
 from product_module.models import Product, ProductConversion, Brand, Category, Supplier
+from product_module.services.search import ProductSearch
 
 # Register your models here.
 
-admin.site.register(Brand)
-admin.site.register(Category)
-admin.site.register(Product)
-admin.site.register(ProductConversion)
-admin.site.register(Supplier)
+
+@admin.register(Brand)
+class BrandAdmin(admin.ModelAdmin):
+    search_fields = ('name',)
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    search_fields = ('name',)
+
+
+@admin.register(Supplier)
+class SupplierAdmin(admin.ModelAdmin):
+    search_fields = ('name',)
+
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ('name', 'sku', 'brand', 'category', 'base_unit', 'price', 'is_active')
+    # matched through the full-text index (see get_search_results), not icontains scans
+    search_fields = ('name', 'sku', 'brand__name', 'category__name', 'description')
+    list_select_related = ('brand', 'category')
+    list_filter = ('is_active', 'category', 'brand')
+    autocomplete_fields = ('category', 'brand', 'supplier')
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return ProductSearch.filter_queryset(queryset, search_term), False
+
+
+@admin.register(ProductConversion)
+class ProductConversionAdmin(admin.ModelAdmin):
+    list_display = ('product', 'from_unit', 'to_unit', 'factor')
+    list_select_related = ('product',)
+    search_fields = ('product__sku', 'product__name')
+    autocomplete_fields = ('product',)
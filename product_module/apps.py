@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ProductModuleConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'product_module'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from product_module.services.catalog_import import CatalogImporter
+
+
+class Command(BaseCommand):
+    help = "Bulk import / upsert a product catalog from a CSV or JSONL file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                            help="Input format (default: guessed from the file extension)")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        importer = CatalogImporter(chunk_size=options['chunk_size'])
+        result = importer.import_file(options['path'], fmt=options['format'])
+        for lineno, message in result.errors[:50]:
+            self.stderr.write(f"line {lineno}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.created}, updated {result.updated}, skipped {result.skipped} products."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from product_module.services.search import ProductSearch
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index from the Product table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if ProductSearch.backend() is None:
+            self.stdout.write("No search index for this database backend; search uses icontains filtering.")
+            return
+        total = ProductSearch.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} products."))
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:58
+
+from django.db import migrations
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS product_module_search USING fts5("
+    "name, sku, brand, category, description, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS product_module_search_vocab USING fts5vocab(product_module_search, 'row')",
+    "INSERT INTO product_module_search (rowid, name, sku, brand, category, description) "
+    "SELECT p.id, p.name, p.sku, b.name, c.name, coalesce(p.description, '') FROM product_module_product p "
+    "JOIN product_module_brand b ON b.id = p.brand_id JOIN product_module_category c ON c.id = p.category_id",
+]
+SQLITE_DROP = [
+    "DROP TABLE IF EXISTS product_module_search_vocab",
+    "DROP TABLE IF EXISTS product_module_search",
+]
+
+POSTGRES_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE TABLE IF NOT EXISTS product_module_search ("
+    "product_id bigint PRIMARY KEY REFERENCES product_module_product (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "name varchar(255) NOT NULL, sku varchar(100) NOT NULL, document tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS product_module_search_document_idx ON product_module_search USING gin (document)",
+    "CREATE INDEX IF NOT EXISTS product_module_search_name_trgm_idx ON product_module_search "
+    "USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS product_module_search_sku_trgm_idx ON product_module_search "
+    "USING gin (sku gin_trgm_ops)",
+    "INSERT INTO product_module_search (product_id, name, sku, document) "
+    "SELECT p.id, p.name, p.sku, "
+    "setweight(to_tsvector('simple', p.name), 'A') || setweight(to_tsvector('simple', p.sku), 'A') || "
+    "setweight(to_tsvector('simple', b.name), 'B') || setweight(to_tsvector('simple', c.name), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(p.description, '')), 'D') FROM product_module_product p "
+    "JOIN product_module_brand b ON b.id = p.brand_id JOIN product_module_category c ON c.id = p.category_id",
+]
+POSTGRES_DROP = [
+    "DROP TABLE IF EXISTS product_module_search",
+]
+
+STATEMENTS = {
+    'sqlite': (SQLITE_CREATE, SQLITE_DROP),
+    'postgresql': (POSTGRES_CREATE, POSTGRES_DROP),
+}
+
+
+def _run(schema_editor, index):
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements:
+        for sql in statements[index]:
+            schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, 0)
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_module', '0003_alter_product_sku'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
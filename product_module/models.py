@@ -40,15 +40,23 @@ class Product(models.Model):
     slug = models.SlugField(default="", null=False, blank=True, max_length=200, unique=True, db_index=True)
     base_unit = models.CharField(max_length=100)
     price = models.DecimalField(max_digits=12, decimal_places=2)
+    # per base unit; used by putaway when shelves are limited by volume / weight
+    unit_volume = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True,
+                                      verbose_name="Volume per base unit")
+    unit_weight = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True,
+                                      verbose_name="Weight per base unit")
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    # indexed: MAX(updated_at) is part of the catalog version (product_module.views.product_version)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def save(self, *args, **kwargs):
         if not self.sku:
             self.sku = f"PRD-{uuid.uuid4().hex[:8].upper()}"
-        self.slug = slugify(self.name)
+        # an existing slug is kept (the catalog importer assigns "-2" style suffixes on collisions)
+        if not self.slug:
+            self.slug = slugify(self.name)
 
         super().save(*args, **kwargs)
 
@@ -61,6 +69,25 @@ class Product(models.Model):
         ordering = ['name']
 
 
+class ProductDeletionCounter(models.Model):
+    """
+    Single row (pk=1) counting deleted products, bumped by a post_delete receiver. Together with
+    MAX(id) and MAX(updated_at) it versions the catalog without counting the table.
+    """
+    deleted = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def bump(cls, by=1):
+        if not cls.objects.filter(pk=1).update(deleted=models.F('deleted') + by):
+            counter, created = cls.objects.get_or_create(pk=1, defaults={'deleted': by})
+            if not created:
+                cls.objects.filter(pk=1).update(deleted=models.F('deleted') + by)
+
+    @classmethod
+    def value(cls):
+        return cls.objects.filter(pk=1).values_list('deleted', flat=True).first() or 0
+
+
 class ProductConversion(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='conversions')
     from_unit = models.CharField(max_length=100)
@@ -0,0 +1,243 @@
+# product_module/services/catalog_import.py
+import csv
+import json
+import operator
+import uuid
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from functools import reduce
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from stock_module.services.metadata_cache import MetadataCache
+from ..models import Product, Category, Brand, Supplier
+from .search import ProductSearch
+
+SLUG_MAX_LENGTH = Product._meta.get_field('slug').max_length
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)  # (line number, message)
+
+
+class CatalogImporter:
+    """
+    Streams a supplier catalog (CSV with a header row, or JSONL) and upserts Products in chunks.
+
+    Columns: name, category, brand, base_unit, price (required); supplier, sku, description,
+    is_active (optional). Products are matched by name. Category/Brand/Supplier are resolved
+    by name through in-memory maps and missing ones are created in bulk. SKU and slug are
+    generated per chunk (bypassing Product.save) with collisions resolved within the import
+    and against the database; existing products keep their slug and, unless given, their SKU.
+    """
+
+    REQUIRED = ('name', 'category', 'brand', 'base_unit', 'price')
+    UPDATE_FIELDS = ['category', 'brand', 'supplier', 'sku', 'base_unit', 'price', 'description', 'is_active',
+                     'updated_at']
+
+    def __init__(self, chunk_size=2000):
+        self.chunk_size = chunk_size
+        self.categories = {}
+        self.brands = {}
+        self.suppliers = {}
+        self.taken_slugs = set()
+        self.taken_skus = set()
+
+    # --- input -----------------------------------------------------------------------------
+
+    @staticmethod
+    def read_rows(fp, fmt):
+        """Yield (line number, dict) from an open text file; a JSONL line that does not parse yields its error."""
+        if fmt == 'csv':
+            for lineno, row in enumerate(csv.DictReader(fp), start=2):
+                yield lineno, row
+        elif fmt == 'jsonl':
+            for lineno, line in enumerate(fp, start=1):
+                if line.strip():
+                    try:
+                        yield lineno, json.loads(line)
+                    except json.JSONDecodeError as exc:
+                        yield lineno, ValueError(f"Invalid JSON: {exc.msg} (column {exc.colno})")
+        else:
+            raise ValueError(f"Unsupported catalog format: {fmt}")
+
+    def import_file(self, path, fmt=None):
+        fmt = fmt or ('jsonl' if str(path).endswith(('.jsonl', '.ndjson')) else 'csv')
+        with open(path, newline='', encoding='utf-8') as fp:
+            return self.import_rows(self.read_rows(fp, fmt))
+
+    def import_rows(self, rows):
+        """Import an iterable of (line number, dict); each chunk is committed in its own transaction."""
+        result = ImportResult()
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self._import_chunk(chunk, result)
+        return result
+
+    # --- per chunk -------------------------------------------------------------------------
+
+    def _clean(self, lineno, raw, result):
+        if isinstance(raw, Exception):
+            result.errors.append((lineno, str(raw)))
+            return None
+        if not isinstance(raw, dict):
+            result.errors.append((lineno, "Each line must be a JSON object."))
+            return None
+        row = {k: (v.strip() if isinstance(v, str) else v) for k, v in raw.items() if k}
+        missing = [f for f in self.REQUIRED if not row.get(f)]
+        if missing:
+            result.errors.append((lineno, f"Missing required field(s): {', '.join(missing)}"))
+            return None
+        try:
+            row['price'] = Decimal(str(row['price']))
+        except InvalidOperation:
+            result.errors.append((lineno, f"Invalid price: {row['price']}"))
+            return None
+        active = row.get('is_active')
+        row['is_active'] = True if active in (None, '') else str(active).strip().lower() in TRUE_VALUES
+        return row
+
+    @staticmethod
+    def _resolve(model, cache, names):
+        """Fill cache with name -> pk for names, creating missing rows with one bulk_create."""
+        wanted = {n for n in names if n and n not in cache}
+        if not wanted:
+            return
+        cache.update(model.objects.filter(name__in=wanted).values_list('name', 'pk'))
+        missing = wanted - cache.keys()
+        if missing:
+            model.objects.bulk_create([model(name=n) for n in missing], ignore_conflicts=True)
+            cache.update(model.objects.filter(name__in=missing).values_list('name', 'pk'))
+
+    def _new_sku(self):
+        while True:
+            sku = f"PRD-{uuid.uuid4().hex[:8].upper()}"
+            if sku not in self.taken_skus:
+                self.taken_skus.add(sku)
+                return sku
+
+    def _assign_skus(self, products):
+        self.taken_skus.update(p.sku for p in products if p.sku)
+        fresh = [p for p in products if not p.sku]
+        for p in fresh:
+            p.sku = self._new_sku()
+        # 8 hex chars can still clash with SKUs already in the database
+        while fresh:
+            clashes = set(Product.objects.filter(sku__in=[p.sku for p in fresh]).values_list('sku', flat=True))
+            fresh = [p for p in fresh if p.sku in clashes]
+            for p in fresh:
+                p.sku = self._new_sku()
+
+    def _assign_slugs(self, products):
+        bases = [slugify(p.name)[:SLUG_MAX_LENGTH - 8].strip('-') or 'product' for p in products]
+        in_db = set(Product.objects.filter(slug__in=set(bases)).values_list('slug', flat=True))
+        # every suffixed slug of every colliding base, with one query for the chunk
+        colliding = {base for base in bases if base in in_db or base in self.taken_slugs}
+        used = set(self.taken_slugs)
+        if colliding:
+            used.update(Product.objects.filter(
+                reduce(operator.or_, (Q(slug__startswith=f"{base}-") for base in colliding))
+            ).values_list('slug', flat=True))
+        for p, base in zip(products, bases):
+            slug = base
+            if base in colliding:
+                n = 2
+                while f"{base}-{n}" in used:
+                    n += 1
+                slug = f"{base}-{n}"
+            p.slug = slug
+            used.add(slug)
+            self.taken_slugs.add(slug)
+
+    @staticmethod
+    def _sku_clashes(rows, lines, result):
+        """Drop rows whose supplied SKU belongs to another product (one query per chunk)."""
+        supplied = {}
+        for name, row in list(rows.items()):
+            sku = row.get('sku')
+            if not sku:
+                continue
+            if sku in supplied:
+                result.errors.append((lines[name], f"SKU {sku} is also given to '{supplied[sku]}' in this import."))
+                del rows[name]
+                continue
+            supplied[sku] = name
+        owners = dict(Product.objects.filter(sku__in=supplied).values_list('sku', 'name')) if supplied else {}
+        for sku, name in supplied.items():
+            owner = owners.get(sku)
+            if owner is not None and owner != name:
+                result.errors.append((lines[name], f"SKU {sku} already belongs to product '{owner}'."))
+                del rows[name]
+
+    def _import_chunk(self, chunk, result):
+        rows, lines = {}, {}
+        for lineno, raw in chunk:
+            row = self._clean(lineno, raw, result)
+            if row is None:
+                result.skipped += 1
+                continue
+            if row['name'] in rows:
+                # duplicate names inside a chunk: last one wins, the earlier line counts as skipped
+                result.skipped += 1
+            rows[row['name']] = row
+            lines[row['name']] = lineno
+
+        before = len(rows)
+        self._sku_clashes(rows, lines, result)
+        result.skipped += before - len(rows)
+        if not rows:
+            return
+
+        with transaction.atomic():
+            self._resolve(Category, self.categories, (r['category'] for r in rows.values()))
+            self._resolve(Brand, self.brands, (r['brand'] for r in rows.values()))
+            self._resolve(Supplier, self.suppliers, (r.get('supplier') for r in rows.values()))
+
+            existing = {
+                name: (pk, sku, slug) for pk, name, sku, slug in
+                Product.objects.filter(name__in=rows.keys()).values_list('pk', 'name', 'sku', 'slug')
+            }
+
+            products = []
+            for name, row in rows.items():
+                _, sku, slug = existing.get(name, (None, '', ''))
+                products.append(Product(
+                    name=name,
+                    category_id=self.categories[row['category']],
+                    brand_id=self.brands[row['brand']],
+                    supplier_id=self.suppliers.get(row.get('supplier')),
+                    sku=row.get('sku') or sku,
+                    slug=slug,
+                    base_unit=row['base_unit'],
+                    price=row['price'],
+                    description=row.get('description') or None,
+                    is_active=row['is_active'],
+                ))
+
+            self._assign_skus(products)
+            self._assign_slugs([p for p in products if not p.slug])
+
+            Product.objects.bulk_create(
+                products,
+                update_conflicts=True,
+                unique_fields=['name'],
+                update_fields=self.UPDATE_FIELDS,
+            )
+            # bulk_create bypasses post_save, so keep the search index and the metadata cache in step here
+            ProductSearch.index_products(Product.objects.filter(name__in=rows.keys()))
+            updated_ids = [pk for pk, _, _ in existing.values()]
+            transaction.on_commit(lambda: [MetadataCache.invalidate_product(pk) for pk in updated_ids])
+
+        result.updated += len(existing)
+        result.created += len(products) - len(existing)
@@ -0,0 +1,290 @@
+# product_module/services/search.py
+import re
+from dataclasses import dataclass, field
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from ..models import Product
+
+SEARCH_TABLE = 'product_module_search'
+VOCAB_TABLE = 'product_module_search_vocab'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    return [t.lower() for t in TOKEN_RE.findall(query or '')]
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance, giving up (returns limit + 1) once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+def max_typos(token):
+    if len(token) < 4:
+        return 0
+    return 1 if len(token) < 8 else 2
+
+
+class SQLiteSearchBackend:
+    """FTS5 table keyed by product id (rowid), bm25-ranked, with prefix indexes and an fts5vocab table."""
+
+    # bm25 column weights: name, sku, brand, category, description
+    WEIGHTS = (10.0, 8.0, 3.0, 2.0, 1.0)
+
+    @staticmethod
+    def _match_expr(tokens, corrections=None):
+        parts = []
+        for t in tokens:
+            alternatives = [f'"{t}"*'] + [f'"{c}"' for c in (corrections or {}).get(t, ())]
+            parts.append(alternatives[0] if len(alternatives) == 1 else f"({' OR '.join(alternatives)})")
+        return ' AND '.join(parts)
+
+    def upsert(self, cursor, rows):
+        cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [(r[0],) for r in rows])
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, name, sku, brand, category, description) "
+            f"VALUES (%s, %s, %s, %s, %s, %s)", rows)
+
+    def delete(self, cursor, ids):
+        cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [(pk,) for pk in ids])
+
+    def clear(self, cursor):
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+
+    def optimize(self, cursor):
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+
+    def match_sql(self, tokens, corrections=None):
+        return (f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s",
+                [self._match_expr(tokens, corrections)])
+
+    def search_ids(self, cursor, tokens, limit, offset, corrections=None):
+        weights = ', '.join(str(w) for w in self.WEIGHTS)
+        cursor.execute(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+            f"ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s OFFSET %s",
+            [self._match_expr(tokens, corrections), limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+    def similar_terms(self, cursor, token):
+        """Indexed terms within max_typos(token) edits that share the token's first letter."""
+        limit = max_typos(token)
+        if not limit:
+            return []
+        head = token[0]
+        cursor.execute(
+            f"SELECT term FROM {VOCAB_TABLE} WHERE term >= %s AND term < %s "
+            f"AND length(term) BETWEEN %s AND %s",
+            [head, head + '￿', len(token) - limit, len(token) + limit])
+        return [term for (term,) in cursor.fetchall() if edit_distance(token, term, limit) <= limit]
+
+
+class PostgresSearchBackend:
+    """Weighted tsvector (GIN) for ranked prefix search, pg_trgm on name/sku for typo tolerance."""
+
+    DOCUMENT_SQL = (
+        "setweight(to_tsvector('simple', coalesce(%s, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(%s, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(%s, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(%s, '')), 'C') || "
+        "setweight(to_tsvector('simple', coalesce(%s, '')), 'D')"
+    )
+
+    @staticmethod
+    def _tsquery(tokens, corrections=None):
+        parts = []
+        for t in tokens:
+            alternatives = [f"{t}:*"] + list((corrections or {}).get(t, ()))
+            parts.append(alternatives[0] if len(alternatives) == 1 else f"({' | '.join(alternatives)})")
+        return ' & '.join(parts)
+
+    def upsert(self, cursor, rows):
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (product_id, name, sku, document) "
+            f"VALUES (%s, %s, %s, {self.DOCUMENT_SQL}) "
+            f"ON CONFLICT (product_id) DO UPDATE SET name = EXCLUDED.name, sku = EXCLUDED.sku, "
+            f"document = EXCLUDED.document",
+            [(pk, name, sku, name, sku, brand, category, description)
+             for pk, name, sku, brand, category, description in rows])
+
+    def delete(self, cursor, ids):
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE product_id = ANY(%s)", [list(ids)])
+
+    def clear(self, cursor):
+        cursor.execute(f"TRUNCATE {SEARCH_TABLE}")
+
+    def optimize(self, cursor):
+        cursor.execute(f"ANALYZE {SEARCH_TABLE}")
+
+    def match_sql(self, tokens, corrections=None):
+        return (f"SELECT product_id FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('simple', %s)",
+                [self._tsquery(tokens, corrections)])
+
+    def search_ids(self, cursor, tokens, limit, offset, corrections=None):
+        cursor.execute(
+            f"SELECT product_id FROM {SEARCH_TABLE}, to_tsquery('simple', %s) q WHERE document @@ q "
+            f"ORDER BY ts_rank(document, q) DESC, product_id LIMIT %s OFFSET %s",
+            [self._tsquery(tokens, corrections), limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+    def similar_terms(self, cursor, token):
+        if not max_typos(token):
+            return []
+        cursor.execute(
+            f"SELECT DISTINCT lower(w) FROM ("
+            f"  SELECT regexp_split_to_table(name, '\\W+') AS w FROM {SEARCH_TABLE}"
+            f"  WHERE name %% %s OR sku %% %s LIMIT 200"
+            f") s WHERE w <> ''",
+            [token, token])
+        limit = max_typos(token)
+        return [term for (term,) in cursor.fetchall() if edit_distance(token, term, limit) <= limit]
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+@dataclass
+class SearchPage:
+    results: list = field(default_factory=list)
+    page: int = 1
+    page_size: int = 20
+    has_next: bool = False
+    corrected: bool = False
+
+
+class ProductSearch:
+    """
+    Ranked product search over name, SKU, brand, category and description.
+    Every query token is matched as a prefix; when a query finds nothing, tokens are
+    widened with indexed terms within one or two edits. Backends without a search
+    index fall back to icontains filtering.
+    """
+
+    @staticmethod
+    def backend():
+        backend_class = BACKENDS.get(connection.vendor)
+        return backend_class() if backend_class else None
+
+    @staticmethod
+    def document_rows(queryset):
+        return queryset.order_by().values_list(
+            'pk', 'name', 'sku', 'brand__name', 'category__name', 'description').iterator(chunk_size=2000)
+
+    # --- index maintenance ------------------------------------------------------------------
+
+    @classmethod
+    def _upsert_all(cls, backend, cursor, queryset, chunk_size):
+        """Stream the documents of queryset into the index, chunk_size rows per upsert."""
+        total = 0
+        batch = []
+        for pk, name, sku, brand, category, description in cls.document_rows(queryset):
+            batch.append((pk, name, sku, brand or '', category or '', description or ''))
+            if len(batch) >= chunk_size:
+                backend.upsert(cursor, batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            backend.upsert(cursor, batch)
+            total += len(batch)
+        return total
+
+    @classmethod
+    def index_products(cls, queryset, chunk_size=2000):
+        backend = cls.backend()
+        if backend is None:
+            return 0
+        with connection.cursor() as cursor:
+            return cls._upsert_all(backend, cursor, queryset, chunk_size)
+
+    @classmethod
+    def remove_products(cls, ids):
+        backend = cls.backend()
+        if backend is not None and ids:
+            with connection.cursor() as cursor:
+                backend.delete(cursor, ids)
+
+    @classmethod
+    def rebuild(cls, chunk_size=5000):
+        backend = cls.backend()
+        if backend is None:
+            return 0
+        with connection.cursor() as cursor:
+            backend.clear(cursor)
+            total = cls._upsert_all(backend, cursor, Product.objects.all(), chunk_size)
+            backend.optimize(cursor)
+        return total
+
+    # --- querying ---------------------------------------------------------------------------
+
+    @classmethod
+    def _corrections(cls, backend, cursor, tokens):
+        corrections = {}
+        for token in tokens:
+            terms = [t for t in backend.similar_terms(cursor, token) if t != token]
+            if terms:
+                corrections[token] = terms[:10]
+        return corrections
+
+    @classmethod
+    def search(cls, query, page=1, page_size=20):
+        """Return a SearchPage of Products ordered by relevance."""
+        tokens = tokenize(query)
+        page = max(int(page), 1)
+        result = SearchPage(page=page, page_size=page_size)
+        if not tokens:
+            return result
+
+        offset = (page - 1) * page_size
+        backend = cls.backend()
+        if backend is None:
+            ids = list(cls.fallback_queryset(tokens).values_list('pk', flat=True)[offset:offset + page_size + 1])
+        else:
+            with connection.cursor() as cursor:
+                ids = backend.search_ids(cursor, tokens, page_size + 1, offset)
+                if not ids and page == 1:
+                    corrections = cls._corrections(backend, cursor, tokens)
+                    if corrections:
+                        ids = backend.search_ids(cursor, tokens, page_size + 1, offset, corrections)
+                        result.corrected = True
+
+        result.has_next = len(ids) > page_size
+        ids = ids[:page_size]
+        products = Product.objects.select_related('brand', 'category').in_bulk(ids)
+        result.results = [products[pk] for pk in ids if pk in products]
+        return result
+
+    @staticmethod
+    def fallback_queryset(tokens):
+        qs = Product.objects.all()
+        for token in tokens:
+            qs = qs.filter(Q(name__icontains=token) | Q(sku__icontains=token) | Q(brand__name__icontains=token)
+                           | Q(category__name__icontains=token) | Q(description__icontains=token))
+        return qs
+
+    @classmethod
+    def filter_queryset(cls, queryset, query):
+        """Restrict a Product queryset to search matches (unranked), e.g. for admin changelists."""
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset
+        backend = cls.backend()
+        if backend is None:
+            return queryset.filter(pk__in=cls.fallback_queryset(tokens).values('pk'))
+        sql, params = backend.match_sql(tokens)
+        return queryset.filter(pk__in=RawSQL(sql, params))
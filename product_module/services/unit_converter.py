@@ -0,0 +1,71 @@
+# product_module/services/unit_converter.py
+from decimal import Decimal, InvalidOperation
+
+from ..models import ProductConversion
+
+QUANTITY_QUANT = Decimal('0.0001')
+
+
+class UnitConverter:
+    """
+    Converts quantities to a product's base_unit using ProductConversion rows.
+    `product` may be a Product or any object with pk, name and base_unit (e.g. a cached ProductMeta).
+    """
+
+    @staticmethod
+    def _to_decimal(qty):
+        try:
+            return Decimal(qty)
+        except (InvalidOperation, TypeError):
+            raise ValueError(f"Invalid quantity: {qty}")
+
+    @staticmethod
+    def _missing(product, unit):
+        return ValueError(
+            f"No conversion from '{unit}' to '{product.base_unit}' for product id={product.pk} "
+            f"('{product.name}'). Please define ProductConversion.")
+
+    @classmethod
+    def to_base(cls, product, qty, unit):
+        """Convert a single quantity; raises ValueError when no conversion is defined."""
+        qty_dec = cls._to_decimal(qty)
+        base_unit = getattr(product, 'base_unit', None)
+        if not unit or unit == base_unit:
+            return qty_dec
+
+        conv = ProductConversion.objects.filter(product_id=product.pk, from_unit=unit, to_unit=base_unit).first()
+        if conv:
+            return (qty_dec * Decimal(conv.factor)).quantize(QUANTITY_QUANT)
+        raise cls._missing(product, unit)
+
+    @classmethod
+    def bulk_to_base(cls, items):
+        """
+        Convert many (product, qty, unit) triples with a single ProductConversion query.
+        Returns the converted quantities in input order.
+        """
+        items = list(items)
+        needed = {(product.pk, unit) for product, _, unit in items if unit and unit != product.base_unit}
+
+        factors = {}
+        if needed:
+            rows = ProductConversion.objects.filter(
+                product_id__in={pid for pid, _ in needed},
+                from_unit__in={unit for _, unit in needed},
+            ).values_list('product_id', 'from_unit', 'to_unit', 'factor')
+            base_units = {product.pk: product.base_unit for product, _, _ in items}
+            for product_id, from_unit, to_unit, factor in rows:
+                if base_units.get(product_id) == to_unit:
+                    factors[(product_id, from_unit)] = Decimal(factor)
+
+        result = []
+        for product, qty, unit in items:
+            qty_dec = cls._to_decimal(qty)
+            if not unit or unit == product.base_unit:
+                result.append(qty_dec)
+                continue
+            factor = factors.get((product.pk, unit))
+            if factor is None:
+                raise cls._missing(product, unit)
+            result.append((qty_dec * factor).quantize(QUANTITY_QUANT))
+        return result
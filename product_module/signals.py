@@ -0,0 +1,36 @@
+# product_module/signals.py
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Product, Brand, Category, ProductDeletionCounter
+from .services.search import ProductSearch
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        ProductSearch.index_products(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    ProductSearch.remove_products([instance.pk])
+    # a delete moves neither MAX(id) nor MAX(updated_at): count it for the catalog version
+    ProductDeletionCounter.bump()
+
+
+@receiver(pre_save, sender=Brand)
+@receiver(pre_save, sender=Category)
+def remember_group_name(sender, instance, raw=False, **kwargs):
+    # نام قبلی، تا post_save فقط در صورت تغییر نام دوباره ایندکس کند
+    if not raw and instance.pk is not None:
+        instance._indexed_name = sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+def reindex_renamed_group(sender, instance, created, raw=False, **kwargs):
+    # brand / category names are part of each product's search document
+    old_name = instance.__dict__.pop('_indexed_name', None)
+    if not created and not raw and old_name != instance.name:
+        ProductSearch.index_products(instance.products.all())
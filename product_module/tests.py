@@ -1,3 +1,173 @@
+import io
+import json
+from unittest import mock
+
 from django.test import TestCase
+from django.urls import reverse
+
+from stock_module.services.metadata_cache import MetadataCache
+from user_module.models import User
+from .models import Brand, Category, Product, ProductConversion
+from .services.catalog_import import CatalogImporter
+from .services.search import ProductSearch
+
+
+def jsonl(*rows):
+    return io.StringIO(''.join((row if isinstance(row, str) else json.dumps(row)) + '\n' for row in rows))
+
+
+class CatalogImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.existing = Product.objects.create(name='Hammer', sku='HAM-1', category=Category.objects.create(name='Tools'),
+                                              brand=Brand.objects.create(name='Acme'), base_unit='pcs', price=5)
+
+    def run_import(self, *rows):
+        return CatalogImporter(chunk_size=10).import_rows(CatalogImporter.read_rows(jsonl(*rows), 'jsonl'))
+
+    @staticmethod
+    def row(name, **extra):
+        return {'name': name, 'category': 'Tools', 'brand': 'Acme', 'base_unit': 'pcs', 'price': '3', **extra}
+
+    def test_bad_json_line_is_reported_and_the_rest_imported(self):
+        result = self.run_import(self.row('Saw'), '{"name": "Broken"', self.row('Level'))
+
+        self.assertEqual((result.created, result.skipped), (2, 1))
+        self.assertEqual([line for line, _ in result.errors], [2])
+        self.assertEqual(Product.objects.filter(name__in=['Saw', 'Level']).count(), 2)
+
+    def test_sku_of_another_product_is_rejected_per_line(self):
+        result = self.run_import(self.row('Saw', sku='HAM-1'), self.row('Level', sku='LVL-1'),
+                                 self.row('Chisel', sku='LVL-1'))
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(sorted(line for line, _ in result.errors), [1, 3])
+        self.assertEqual(Product.objects.get(sku='HAM-1').name, 'Hammer')
+        self.assertEqual(Product.objects.get(sku='LVL-1').name, 'Level')
+
+    def test_collision_suffixes_survive_a_later_save(self):
+        self.run_import(self.row('hammer!'), self.row('HAMMER'))
+        slugs = sorted(Product.objects.exclude(pk=self.existing.pk).values_list('slug', flat=True))
+        self.assertEqual(slugs, ['hammer-2', 'hammer-3'])
+
+        product = Product.objects.get(slug='hammer-3')
+        product.price = 4
+        product.save()
+        product.refresh_from_db()
+        self.assertEqual(product.slug, 'hammer-3')
+
+    def test_a_rename_keeps_the_existing_slug(self):
+        self.existing.name = 'Claw Hammer'
+        self.existing.save()
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.slug, 'hammer')
+
+    def test_duplicate_names_in_a_chunk_are_counted_as_skipped(self):
+        result = self.run_import(self.row('Saw', price='1'), self.row('Saw', price='2'))
+
+        self.assertEqual((result.created, result.skipped), (1, 1))
+        self.assertEqual(Product.objects.get(name='Saw').price, 2)
+
+    def test_updated_products_are_dropped_from_the_metadata_cache(self):
+        MetadataCache.clear()
+        self.addCleanup(MetadataCache.clear)
+        self.assertEqual(MetadataCache.product(self.existing.pk).base_unit, 'pcs')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import(self.row('Hammer', base_unit='box'))
+
+        self.assertEqual(MetadataCache.product(self.existing.pk).base_unit, 'box')
+
+
+class SearchIndexSignalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.brand = Brand.objects.create(name='Acme')
+        Product.objects.create(name='Hammer', category=Category.objects.create(name='Tools'), brand=cls.brand,
+                               base_unit='pcs', price=5)
+
+    def test_group_products_are_reindexed_only_on_rename(self):
+        with mock.patch.object(ProductSearch, 'index_products') as index:
+            self.brand.save()
+            index.assert_not_called()
+            self.brand.name = 'Acme Tools'
+            self.brand.save()
+            index.assert_called_once()
+
+    def test_index_products_upserts_in_chunks(self):
+        backend = mock.Mock()
+        with mock.patch.object(ProductSearch, 'backend', return_value=backend):
+            Product.objects.create(name='Saw', category=Category.objects.get(), brand=self.brand,
+                                   base_unit='pcs', price=3)
+            backend.reset_mock()
+            total = ProductSearch.index_products(Product.objects.all(), chunk_size=1)
+        self.assertEqual(total, 2)
+        self.assertEqual([len(call.args[1]) for call in backend.upsert.call_args_list], [1, 1])
+
+
+class AdminQueryCountTests(TestCase):
+    """Admin pages run a fixed number of queries, whatever the number of rows shown."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='x'))
+
+    @staticmethod
+    def add_products(count):
+        for n in range(count):
+            product = Product.objects.create(name=f'P{Product.objects.count()}',
+                                             category=Category.objects.create(name=f'C{Category.objects.count()}'),
+                                             brand=Brand.objects.create(name=f'B{Brand.objects.count()}'),
+                                             base_unit='pcs', price=1)
+            ProductConversion.objects.create(product=product, from_unit='box', to_unit='pcs', factor=10)
+        return product
+
+    def assertPageQueries(self, expected, url):
+        self.client.get(url)  # warm process-level caches (content types, permissions)
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_changelists(self):
+        pages = {'admin:product_module_product_changelist': 7,
+                 'admin:product_module_productconversion_changelist': 5}
+        for rows in (2, 20):
+            self.add_products(rows)
+            for name, expected in pages.items():
+                with self.subTest(page=name, rows=rows):
+                    self.assertPageQueries(expected, reverse(name))
+
+    def test_product_change_form(self):
+        for rows in (2, 20):
+            product = self.add_products(rows)
+            self.assertPageQueries(5, reverse('admin:product_module_product_change', args=[product.pk]))
+
+
+class ProductApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='keeper')
+        category, brand = Category.objects.create(name='Tools'), Brand.objects.create(name='Acme')
+        cls.drill, cls.hammer = (Product.objects.create(name=name, category=category, brand=brand, base_unit='pcs',
+                                                        price=1) for name in ('Cordless Drill', 'Hammer'))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_etag_changes_when_a_product_is_deleted(self):
+        url = reverse('product:list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.drill.delete()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.hammer.pk])
+
+    def test_q_searches_the_catalog(self):
+        response = self.client.get(reverse('product:list'), {'q': 'drill'})
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([row['id'] for row in body['results']], [self.drill.pk])
+        self.assertFalse(body['has_next'])
+        self.assertEqual(self.client.get(reverse('product:list'), {'q': 'drill', 'page': 'x'}).status_code, 400)
@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'product'
+
+urlpatterns = [
+    path('', views.product_list, name='list'),
+    path('lookup/', views.product_lookup, name='lookup'),
+    path('lookup/sync/', views.product_lookup_sync, name='lookup-sync'),
+    path('<int:pk>/', views.product_detail, name='detail'),
+]
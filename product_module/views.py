@@ -1,3 +1,127 @@
-from django.shortcuts import render
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+from InventoryProject.api import MAX_LIMIT, json_response, not_modified, page
+from .models import Product, ProductDeletionCounter
+from .services.search import ProductSearch
+
+PRODUCT_FIELDS = ('pk', 'sku', 'name', 'category_id', 'brand_id', 'base_unit', 'price', 'is_active')
+
+
+def product_version():
+    """
+    Catalog version: last id (inserts), last updated_at (edits, auto_now) and the deletion
+    counter (deletes). Three index lookups, whatever the size of the table.
+    """
+    last = Product.objects.order_by('-pk').values_list('pk', flat=True).first()
+    changed = Product.objects.order_by('-updated_at').values_list('updated_at', flat=True).first()
+    return f"{last}-{changed}-{ProductDeletionCounter.value()}"
+
+
+def _serialize(row):
+    return {
+        'id': row['pk'],
+        'sku': row['sku'],
+        'name': row['name'],
+        'category': row['category_id'],
+        'brand': row['brand_id'],
+        'base_unit': row['base_unit'],
+        'price': str(row['price']),
+        'is_active': row['is_active'],
+    }
+
+
+def _search(params):
+    """?q=<text>&page=&limit= — ranked ProductSearch results, paged by page number."""
+    try:
+        page_no = int(params.get('page') or 1)
+        limit = max(1, min(int(params.get('limit') or 20), MAX_LIMIT))
+    except ValueError:
+        raise ValueError("page and limit must be integers.")
+    found = ProductSearch.search(params['q'], page=page_no, page_size=limit)
+    return {
+        'results': [_serialize({name: getattr(product, name) for name in PRODUCT_FIELDS}) for product in found.results],
+        'page': found.page,
+        'has_next': found.has_next,
+        'corrected': found.corrected,
+    }
+
+
+@require_GET
+def product_list(request):
+    """
+    GET ?category=&brand=&active=1&after=<id>&limit= — products by id, with ETag.
+    GET ?q=<text>&page=&limit= — search (relevance order, page numbers), same ETag.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    cached, etag = not_modified(request, product_version())
+    if cached is not None:
+        return cached
+    params = request.GET
+    if params.get('q'):
+        try:
+            return json_response(request, _search(params), etag=etag)
+        except ValueError as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+    qs = Product.objects.all()
+    try:
+        if params.get('category'):
+            qs = qs.filter(category_id=int(params['category']))
+        if params.get('brand'):
+            qs = qs.filter(brand_id=int(params['brand']))
+        if params.get('active'):
+            qs = qs.filter(is_active=params['active'].lower() in ('1', 'true', 'yes'))
+        rows, cursor = page(qs.values(*PRODUCT_FIELDS), params)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return json_response(request, {'results': [_serialize(row) for row in rows], 'next': cursor}, etag=etag)
+
+
+@require_GET
+def product_detail(request, pk):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    row = Product.objects.filter(pk=pk).values(*PRODUCT_FIELDS, 'updated_at').first()
+    if row is None:
+        return JsonResponse({'error': 'Product not found.'}, status=404)
+    cached, etag = not_modified(request, row['updated_at'])
+    if cached is not None:
+        return cached
+    return json_response(request, _serialize(row), etag=etag)
+
+
+def _lookup_query(params):
+    """Product for a scanned code. There is no barcode column: labels carry the SKU."""
+    code = params.get('code') or params.get('sku')
+    if not code:
+        raise ValueError("code is required.")
+    return Product.objects.filter(sku=code).values(*PRODUCT_FIELDS)
+
+
+@require_GET
+async def product_lookup(request):
+    """GET ?code=<scanned sku> — async lookup for scanners (see stock_module.views.stock_lookup)."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    try:
+        row = await _lookup_query(request.GET).afirst()
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    if row is None:
+        return JsonResponse({'error': 'Product not found.'}, status=404)
+    return JsonResponse(_serialize(row))
+
+
+@require_GET
+def product_lookup_sync(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    try:
+        row = _lookup_query(request.GET).first()
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    if row is None:
+        return JsonResponse({'error': 'Product not found.'}, status=404)
+    return JsonResponse(_serialize(row))
@@ -1,9 +1,40 @@
 from django.contrib import admin
 
-from stock_module.models import Stock, StockLedger
+from stock_module.models import Stock, StockLedger, StockThreshold, StockAlert
+from stock_module.paginators import KeysetPaginationMixin
 
 # Register your models here.
 
 
-admin.site.register(Stock)
-admin.site.register(StockLedger)
+@admin.register(Stock)
+class StockAdmin(admin.ModelAdmin):
+    list_display = ('product', 'warehouse', 'section', 'shelf', 'quantity', 'unit')
+    list_select_related = ('product', 'warehouse', 'section__warehouse', 'shelf__section__warehouse')
+    list_filter = ('warehouse',)
+    search_fields = ('product__sku', 'product__name')
+    autocomplete_fields = ('product', 'warehouse', 'section', 'shelf')
+
+
+@admin.register(StockLedger)
+class StockLedgerAdmin(KeysetPaginationMixin, admin.ModelAdmin):
+    list_display = ('id', 'stock', 'change', 'new_quantity', 'created_at')
+    date_hierarchy = 'created_at'
+    list_select_related = ('stock__product', 'stock__warehouse')
+    raw_id_fields = ('stock', 'transaction', 'created_by')
+
+
+@admin.register(StockThreshold)
+class StockThresholdAdmin(admin.ModelAdmin):
+    list_display = ('product', 'warehouse', 'min_quantity', 'reorder_point', 'max_quantity', 'is_active')
+    list_select_related = ('product', 'warehouse')
+    list_filter = ('warehouse', 'is_active')
+    search_fields = ('product__sku', 'product__name')
+    autocomplete_fields = ('product', 'warehouse')
+
+
+@admin.register(StockAlert)
+class StockAlertAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'product', 'warehouse', 'quantity', 'level', 'created_at', 'resolved_at')
+    list_select_related = ('product', 'warehouse')
+    list_filter = ('kind', 'warehouse')
+    raw_id_fields = ('threshold', 'product', 'warehouse')
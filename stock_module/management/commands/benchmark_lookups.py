@@ -0,0 +1,152 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from stock_module.models import Stock
+
+LOOKUPS = {
+    # kind: (async path, sync path, query builder)
+    'stock': ('/api/stock/lookup/', '/api/stock/lookup/sync/',
+              lambda row: f"sku={row['product__sku']}&warehouse={row['warehouse_id']}"),
+    'product': ('/api/products/lookup/', '/api/products/lookup/sync/',
+                lambda row: f"code={row['product__sku']}"),
+    'location': ('/api/locations/contents/', '/api/locations/contents/sync/',
+                 lambda row: f"location={row['location_path']}&limit=50"),
+}
+
+
+class Command(BaseCommand):
+    help = ("Load-test the scanner lookups: async views through the ASGI application against their sync "
+            "twins through the WSGI application on a thread pool, in process, at the same concurrency. "
+            "Reports requests/sec and latency percentiles.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per lookup and mode")
+        parser.add_argument('--concurrency', type=int, default=50,
+                            help="In-flight requests (async tasks / WSGI threads)")
+        parser.add_argument('--kind', choices=[*LOOKUPS, 'all'], default='all')
+        parser.add_argument('--user', help="Username to authenticate as (default: first superuser)")
+        parser.add_argument('--host', default=None, help="Host header (default: first ALLOWED_HOSTS entry)")
+
+    def handle(self, *args, **options):
+        targets = list(Stock.objects.filter(product__sku__gt='').values(
+            'product__sku', 'warehouse_id', 'location_path')[:1000])
+        if not targets:
+            raise CommandError("Need stock rows of products with a SKU.")
+        user = self._user(options['user'])
+        client = Client()
+        client.force_login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        host = options['host'] or next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+
+        rnd = random.Random(42)
+        kinds = list(LOOKUPS) if options['kind'] == 'all' else [options['kind']]
+        n, concurrency = options['requests'], options['concurrency']
+        self.stdout.write(f"{n} requests per run, concurrency {concurrency}, {len(targets)} sample rows")
+        for kind in kinds:
+            async_path, sync_path, query = LOOKUPS[kind]
+            queries = [query(rnd.choice(targets)) for _ in range(n)]
+            self._report(kind, 'async / ASGI', *self._run_asgi(async_path, queries, concurrency, host, cookie))
+            self._report(kind, 'sync / WSGI', *self._run_wsgi(sync_path, queries, concurrency, host, cookie))
+
+    @staticmethod
+    def _user(username):
+        User = get_user_model()
+        user = (User.objects.filter(username=username) if username else
+                User.objects.filter(is_superuser=True)).order_by('pk').first()
+        if user is None:
+            raise CommandError("No such user; pass --user.")
+        return user
+
+    def _report(self, kind, mode, wall, timings, errors):
+        timings.sort()
+        pct = lambda p: timings[min(len(timings) - 1, int(len(timings) * p))] * 1000
+        line = (f"[{kind:8}] {mode:12} {len(timings) / wall:8.1f} req/s   p50 {pct(0.50):7.2f} ms   "
+                f"p99 {pct(0.99):7.2f} ms   max {timings[-1] * 1000:7.2f} ms")
+        self.stdout.write(line + (self.style.WARNING(f"   {errors} non-200") if errors else ''))
+
+    # --- ASGI: one event loop, `concurrency` tasks ----------------------------------------------
+
+    def _run_asgi(self, path, queries, concurrency, host, cookie):
+        from InventoryProject.asgi import application
+        return asyncio.run(self._asgi_load(application, path, queries, concurrency, host, cookie))
+
+    @staticmethod
+    async def _asgi_get(application, path, query, host, cookie):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+            'query_string': query.encode(), 'client': ('127.0.0.1', 0), 'server': (host, 80),
+            'headers': [(b'host', host.encode()), (b'cookie', cookie.encode())],
+        }
+        received, disconnected = False, asyncio.Event()
+        status = None
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        await application(scope, receive, send)
+        disconnected.set()
+        return status
+
+    async def _asgi_load(self, application, path, queries, concurrency, host, cookie):
+        pending = iter(queries)
+        timings, errors = [], 0
+
+        async def worker():
+            nonlocal errors
+            for query in pending:
+                started = time.perf_counter()
+                status = await self._asgi_get(application, path, query, host, cookie)
+                timings.append(time.perf_counter() - started)
+                errors += status != 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started, timings, errors
+
+    # --- WSGI: `concurrency` threads, like a threaded WSGI server ----------------------------
+
+    def _run_wsgi(self, path, queries, concurrency, host, cookie):
+        from InventoryProject.wsgi import application
+
+        def get(query):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+                'SERVER_NAME': host, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': host, 'HTTP_COOKIE': cookie, 'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.input': BytesIO(), 'wsgi.errors': BytesIO(), 'wsgi.url_scheme': 'http',
+                'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            status = []
+            started = time.perf_counter()
+            body = application(environ, lambda s, headers, exc_info=None: status.append(s))
+            try:
+                b''.join(body)
+            finally:
+                body.close()
+            return time.perf_counter() - started, status[0].startswith('200')
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(get, queries))
+        wall = time.perf_counter() - started
+        return wall, [t for t, _ in results], sum(not ok for _, ok in results)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stock_module.models import ForecastMethod
+from stock_module.services.forecasting import DemandForecaster, ForecastParams
+
+
+class Command(BaseCommand):
+    help = "Forecast daily demand per (product, warehouse) from outbound history and store safety stock."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--method', choices=ForecastMethod.values, default=ForecastMethod.SES)
+        parser.add_argument('--history-days', type=int, default=90)
+        parser.add_argument('--horizon-days', type=int, default=14)
+        parser.add_argument('--alpha', type=float, default=0.3, help="SES smoothing factor")
+        parser.add_argument('--window', type=int, default=28, help="Moving-average window in days")
+        parser.add_argument('--lead-time-days', type=float, default=7)
+        parser.add_argument('--service-level', type=float, default=0.95)
+        parser.add_argument('--workers', type=int, default=1, help="Parallel worker processes (by product)")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Products per worker task")
+
+    def handle(self, *args, **options):
+        params = ForecastParams(
+            method=options['method'], history_days=options['history_days'], horizon_days=options['horizon_days'],
+            alpha=options['alpha'], window=options['window'], lead_time_days=options['lead_time_days'],
+            service_level=options['service_level'],
+        )
+        try:
+            total = DemandForecaster.run(params, workers=options['workers'], chunk_size=options['chunk_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Forecast {total} series ({params.method})."))
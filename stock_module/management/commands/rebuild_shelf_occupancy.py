@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from stock_module.services.putaway import ShelfCapacityIndex
+
+
+class Command(BaseCommand):
+    help = "Recompute the shelf free-capacity index (ShelfOccupancy) from shelf capacities and the stock moved on and off each shelf."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--warehouse', type=int, default=None, help="Only shelves of this warehouse id")
+
+    def handle(self, *args, **options):
+        count = ShelfCapacityIndex.rebuild(warehouse=options['warehouse'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} shelves with a capacity."))
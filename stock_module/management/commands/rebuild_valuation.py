@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from stock_module.services.valuation import ValuationEngine
+
+
+class Command(BaseCommand):
+    help = "Rebuild stock valuation (cost layers, running averages, value entries) by replaying the ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Parallel worker processes (by product)")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Products per worker task")
+        parser.add_argument('--ledger', action='store_true',
+                            help="First recompute the ledger's prev/new quantities (rows written before the fix)")
+
+    def handle(self, *args, **options):
+        total, corrected = ValuationEngine.rebuild(workers=options['workers'], chunk_size=options['chunk_size'],
+                                                   ledger=options['ledger'])
+        if options['ledger']:
+            self.stdout.write(f"Corrected prev/new quantities of {corrected} ledger entries.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Replayed {total} ledger entries using {ValuationEngine.method()} valuation."))
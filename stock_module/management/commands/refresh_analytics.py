@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stock_module.services.analytics import InventoryAnalytics
+
+
+class Command(BaseCommand):
+    help = "Recompute ABC classes, turnover, days-of-supply and dead-stock flags into StockAnalytics."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window-days', type=int, default=90, help="Consumption window in days")
+        parser.add_argument('--warehouse', type=int, help="Only refresh this warehouse id")
+
+    def handle(self, *args, **options):
+        try:
+            count = InventoryAnalytics.refresh(window_days=options['window_days'], warehouse=options['warehouse'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"{count} analytics rows written."))
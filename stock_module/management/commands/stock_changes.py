@@ -0,0 +1,44 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from stock_module.models import StockFeedConsumer
+from stock_module.services.outbox import StockChangeFeed
+
+
+class Command(BaseCommand):
+    help = ("Print stock change events as JSON lines for a named consumer and acknowledge each batch after it "
+            "is written (at-least-once). --prune deletes old acknowledged events instead.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumer', default='default')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--follow', action='store_true', help="Keep polling for new events")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds between polls with --follow")
+        parser.add_argument('--reset', type=int, default=None, help="Move the consumer to this cursor first")
+        parser.add_argument('--prune', type=int, default=None, metavar='DAYS',
+                            help="Delete events older than DAYS that all consumers have acknowledged")
+
+    def handle(self, *args, **options):
+        if options['prune'] is not None:
+            deleted = StockChangeFeed.prune(options['prune'])
+            self.stderr.write(self.style.SUCCESS(f"Deleted {deleted} events."))
+            return
+
+        consumer = options['consumer']
+        if options['reset'] is not None:
+            StockFeedConsumer.objects.update_or_create(name=consumer, defaults={'position': options['reset']})
+
+        while True:
+            batch = StockChangeFeed.poll(consumer, limit=options['batch_size'])
+            for event in batch.events:
+                self.stdout.write(json.dumps(event.as_dict()))
+            if batch.events:
+                self.stdout.flush()
+                StockChangeFeed.ack(consumer, batch.cursor)
+            if batch.has_more:
+                continue
+            if not options['follow']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stock_module.services.reports import StockOnHandReport, SUBTOTAL_FIELDS
+
+
+class Command(BaseCommand):
+    help = "Write the stock-on-hand report (products x warehouses) as CSV or JSONL, streamed row by row."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+        parser.add_argument('--output', '-o', help="File to write (default: stdout)")
+        parser.add_argument('--subtotals', choices=list(SUBTOTAL_FIELDS), help="Add subtotal rows per group")
+        parser.add_argument('--warehouse', type=int, action='append', help="Only these warehouse ids (repeatable)")
+        parser.add_argument('--skip-zero', action='store_true', help="Leave out products with nothing on hand")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            report = StockOnHandReport(warehouses=options['warehouse'], subtotals=options['subtotals'],
+                                       skip_zero=options['skip_zero'], chunk_size=options['chunk_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as fp:
+                count = report.write(fp, options['format'])
+            self.stderr.write(self.style.SUCCESS(f"{count} products written to {options['output']}."))
+        else:
+            report.write(sys.stdout, options['format'])
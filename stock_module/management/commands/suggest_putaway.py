@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from movement_module.models import ProductMovement
+from stock_module.services.putaway import PutawayService, PutawayStrategy
+
+
+class Command(BaseCommand):
+    help = "Suggest shelves for an inbound movement, or for a single product/quantity in a warehouse."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movement', type=int, help="ProductMovement id (IN / TRANSFER)")
+        parser.add_argument('--product', type=int)
+        parser.add_argument('--quantity')
+        parser.add_argument('--unit', default=None)
+        parser.add_argument('--warehouse', type=int)
+        parser.add_argument('--strategy', choices=[PutawayStrategy.COLOCATE, PutawayStrategy.BEST_FIT],
+                            default=PutawayStrategy.COLOCATE)
+
+    def handle(self, *args, **options):
+        try:
+            if options['movement']:
+                movement = ProductMovement.objects.get(pk=options['movement'])
+                suggestions = PutawayService.suggest_movement(movement, options['strategy'])
+            elif options['product'] and options['quantity'] and options['warehouse']:
+                suggestions = [PutawayService.suggest(options['product'], options['quantity'], options['warehouse'],
+                                                      unit=options['unit'], strategy=options['strategy'])]
+            else:
+                raise CommandError("Give --movement, or --product, --quantity and --warehouse.")
+        except (ProductMovement.DoesNotExist, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for s in suggestions:
+            placed = ', '.join(f"shelf {p.shelf_id}: {p.quantity}" for p in s.placements) or "no shelf"
+            prefix = f"segment {s.segment_id} " if s.segment_id else ""
+            line = f"{prefix}product {s.product_id} x {s.quantity} -> {placed}"
+            if s.unplaced:
+                line += f" (unplaced: {s.unplaced})"
+            self.stdout.write(line)
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:03
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location_module', '0002_alter_codes_and_constraints'),
+        ('product_module', '0004_product_search_index'),
+        ('stock_module', '0002_stockledger_alter_stock_quantity_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CostLayer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit_cost', models.DecimalField(decimal_places=6, max_digits=18)),
+                ('original_quantity', models.DecimalField(decimal_places=4, max_digits=18)),
+                ('remaining_quantity', models.DecimalField(decimal_places=4, max_digits=18)),
+                ('created_at', models.DateTimeField()),
+                ('ledger', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='stock_module.stockledger')),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='stock_module.stock')),
+            ],
+            options={
+                'verbose_name': 'Cost Layer',
+                'verbose_name_plural': 'Cost Layers',
+                'indexes': [models.Index(condition=models.Q(('remaining_quantity__gt', 0)), fields=['stock', 'id'], name='costlayer_open_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockValuation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=18)),
+                ('total_value', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=20)),
+                ('avg_cost', models.DecimalField(decimal_places=6, default=Decimal('0'), max_digits=18)),
+                ('last_ledger_id', models.BigIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valuations', to='product_module.product')),
+                ('stock', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='valuation', to='stock_module.stock')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valuations', to='location_module.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Stock Valuation',
+                'verbose_name_plural': 'Stock Valuations',
+                'indexes': [models.Index(fields=['product', 'warehouse'], name='stock_modul_product_02bb97_idx'), models.Index(fields=['warehouse'], name='stock_modul_warehou_7b102a_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ValuationEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('RECEIPT', 'Receipt'), ('ISSUE', 'Issue (COGS)'), ('TRANSFER_IN', 'Transfer In'), ('TRANSFER_OUT', 'Transfer Out')], max_length=20)),
+                ('quantity', models.DecimalField(decimal_places=4, max_digits=18)),
+                ('value', models.DecimalField(decimal_places=4, max_digits=20)),
+                ('unit_cost', models.DecimalField(decimal_places=6, max_digits=18)),
+                ('created_at', models.DateTimeField()),
+                ('ledger', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='valuation_entry', to='stock_module.stockledger')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valuation_entries', to='product_module.product')),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valuation_entries', to='stock_module.stock')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valuation_entries', to='location_module.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Valuation Entry',
+                'verbose_name_plural': 'Valuation Entries',
+                'indexes': [models.Index(fields=['kind', 'created_at'], name='stock_modul_kind_c3572a_idx'), models.Index(fields=['warehouse', 'created_at'], name='stock_modul_warehou_58660a_idx'), models.Index(fields=['product', 'created_at'], name='stock_modul_product_7752c5_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:04
+
+from django.db import migrations, models
+from django.db.models import CharField, Q, Value
+from django.db.models.functions import Cast, Concat
+
+
+def _location_maps(apps):
+    Section = apps.get_model('location_module', 'Section')
+    Shelf = apps.get_model('location_module', 'Shelf')
+    sections = dict(Section.objects.values_list('pk', 'warehouse_id'))
+    shelves = {pk: (sections.get(sec_id), sec_id) for pk, sec_id in Shelf.objects.values_list('pk', 'section_id')}
+    return sections, shelves
+
+
+def _path(sections, shelves, warehouse_id, section_id, shelf_id):
+    if shelf_id in shelves:
+        wh_id, sec_id = shelves[shelf_id]
+        return f"/{wh_id}/{sec_id}/{shelf_id}/"
+    if section_id in sections:
+        return f"/{sections[section_id]}/{section_id}/"
+    return f"/{warehouse_id}/" if warehouse_id else ""
+
+
+def fill_location_paths(apps, schema_editor):
+    Stock = apps.get_model('stock_module', 'Stock')
+    # warehouse-level rows (the common case) in one statement
+    Stock.objects.filter(section__isnull=True, shelf__isnull=True).update(
+        location_path=Concat(Value('/'), Cast('warehouse_id', CharField()), Value('/')))
+
+    sections, shelves = _location_maps(apps)
+    rows = list(Stock.objects.filter(Q(section__isnull=False) | Q(shelf__isnull=False)))
+    for stock in rows:
+        stock.location_path = _path(sections, shelves, stock.warehouse_id, stock.section_id, stock.shelf_id)
+    Stock.objects.bulk_update(rows, ['location_path'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location_module', '0003_location_paths'),
+        ('product_module', '0004_product_search_index'),
+        ('stock_module', '0003_valuation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stock',
+            name='location_path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['location_path', 'product'], name='stock_modul_locatio_cd7129_idx'),
+        ),
+        migrations.RunPython(fill_location_paths, migrations.RunPython.noop),
+    ]
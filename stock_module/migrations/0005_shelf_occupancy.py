@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:10
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location_module', '0004_shelf_capacity'),
+        ('stock_module', '0004_location_paths'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShelfOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('capacity_kind', models.CharField(max_length=10)),
+                ('capacity', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('used', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=18)),
+                ('free', models.DecimalField(decimal_places=4, max_digits=18)),
+                ('shelf', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='location_module.shelf')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shelf_occupancy', to='location_module.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Shelf Occupancy',
+                'verbose_name_plural': 'Shelf Occupancy',
+                'indexes': [models.Index(fields=['warehouse', 'capacity_kind', 'free'], name='stock_modul_warehou_a1e272_idx')],
+            },
+        ),
+    ]
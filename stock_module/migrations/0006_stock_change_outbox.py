@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock_module', '0005_shelf_occupancy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('stock_id', models.BigIntegerField()),
+                ('product_id', models.BigIntegerField()),
+                ('warehouse_id', models.BigIntegerField()),
+                ('section_id', models.BigIntegerField(blank=True, null=True)),
+                ('shelf_id', models.BigIntegerField(blank=True, null=True)),
+                ('change', models.DecimalField(decimal_places=4, max_digits=18)),
+                ('new_quantity', models.DecimalField(decimal_places=4, max_digits=18)),
+                ('transaction_id', models.BigIntegerField(blank=True, null=True)),
+                ('ledger_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('position', models.BigIntegerField(blank=True, editable=False, null=True, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Stock Change Event',
+                'verbose_name_plural': 'Stock Change Events',
+                'indexes': [models.Index(condition=models.Q(('position__isnull', True)), fields=['id'], name='stockevent_unsequenced_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockFeedConsumer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Stock Feed Consumer',
+                'verbose_name_plural': 'Stock Feed Consumers',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock_module', '0006_stock_change_outbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='valuationentry',
+            name='kind',
+            field=models.CharField(choices=[('RECEIPT', 'Receipt'), ('ISSUE', 'Issue (COGS)'), ('TRANSFER_IN', 'Transfer In'), ('TRANSFER_OUT', 'Transfer Out'), ('REVERSAL', 'Reversal')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:30
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location_module', '0004_shelf_capacity'),
+        ('product_module', '0005_product_dimensions'),
+        ('stock_module', '0007_valuation_kind_reversal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_days', models.PositiveIntegerField()),
+                ('issued_quantity', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=18)),
+                ('consumption_value', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=20)),
+                ('on_hand', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=18)),
+                ('average_on_hand', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=18)),
+                ('turnover', models.DecimalField(blank=True, decimal_places=4, max_digits=14, null=True)),
+                ('days_of_supply', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('abc_class', models.CharField(choices=[('A', 'A'), ('B', 'B'), ('C', 'C')], max_length=1)),
+                ('dead_stock', models.BooleanField(default=False)),
+                ('computed_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analytics', to='product_module.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analytics', to='location_module.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Stock Analytics',
+                'verbose_name_plural': 'Stock Analytics',
+                'indexes': [models.Index(fields=['warehouse', 'abc_class'], name='stock_modul_warehou_be5070_idx'), models.Index(fields=['dead_stock', 'warehouse'], name='stock_modul_dead_st_e39901_idx')],
+                'unique_together': {('product', 'warehouse')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location_module', '0004_shelf_capacity'),
+        ('product_module', '0005_product_dimensions'),
+        ('stock_module', '0008_stock_analytics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(choices=[('SES', 'Simple Exponential Smoothing'), ('MA', 'Moving Average')], max_length=10)),
+                ('history_days', models.PositiveIntegerField()),
+                ('horizon_days', models.PositiveIntegerField()),
+                ('daily_demand', models.DecimalField(decimal_places=4, max_digits=18)),
+                ('forecast_quantity', models.DecimalField(decimal_places=4, help_text='Demand over the horizon', max_digits=18)),
+                ('demand_std', models.DecimalField(decimal_places=4, help_text='Std. dev. of one-day forecast error', max_digits=18)),
+                ('safety_stock', models.DecimalField(decimal_places=4, max_digits=18)),
+                ('reorder_point', models.DecimalField(decimal_places=4, max_digits=18)),
+                ('computed_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to='product_module.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to='location_module.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Demand Forecast',
+                'verbose_name_plural': 'Demand Forecasts',
+                'indexes': [models.Index(fields=['warehouse', 'product'], name='stock_modul_warehou_6b0104_idx')],
+                'unique_together': {('product', 'warehouse')},
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location_module', '0004_shelf_capacity'),
+        ('product_module', '0005_product_dimensions'),
+        ('stock_module', '0009_demand_forecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockThreshold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_quantity', models.DecimalField(blank=True, decimal_places=4, max_digits=18, null=True)),
+                ('reorder_point', models.DecimalField(blank=True, decimal_places=4, max_digits=18, null=True)),
+                ('max_quantity', models.DecimalField(blank=True, decimal_places=4, max_digits=18, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_thresholds', to='product_module.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_thresholds', to='location_module.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Stock Threshold',
+                'verbose_name_plural': 'Stock Thresholds',
+                'unique_together': {('product', 'warehouse')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('LOW', 'Below minimum'), ('REORDER', 'At reorder point'), ('OVERSTOCK', 'Above maximum')], max_length=10)),
+                ('level', models.DecimalField(decimal_places=4, max_digits=18)),
+                ('quantity', models.DecimalField(decimal_places=4, max_digits=18)),
+                ('ledger_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_alerts', to='product_module.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_alerts', to='location_module.warehouse')),
+                ('threshold', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='alerts', to='stock_module.stockthreshold')),
+            ],
+            options={
+                'verbose_name': 'Stock Alert',
+                'verbose_name_plural': 'Stock Alerts',
+                'indexes': [models.Index(fields=['warehouse', 'id'], name='stock_modul_warehou_34edd1_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('resolved_at__isnull', True)), fields=('threshold', 'kind'), name='stockalert_one_open')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_transaction_module', '0006_idempotency_key'),
+        ('stock_module', '0010_stock_alerts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockledger',
+            index=models.Index(fields=['created_at', 'id'], name='stockledger_created_idx'),
+        ),
+    ]
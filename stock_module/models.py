@@ -3,10 +3,43 @@ from decimal import Decimal
 
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 from inventory_transaction_module.models import InventoryTransaction
 from location_module.models import Warehouse, Section, Shelf
 from product_module.models import Product
+from location_module.services.paths import stored_paths, subtree_q
+from .services.metadata_cache import MetadataCache
+
+
+LOCATION_FIELDS = {'warehouse', 'section', 'shelf', 'warehouse_id', 'section_id', 'shelf_id'}
+
+
+def _location_prefix(location):
+    prefix = location if isinstance(location, str) else location.path
+    # stock is booked per warehouse (section / shelf are null): a deeper path would silently match nothing
+    if prefix.count('/') > 2:
+        raise ValueError("Stock is kept per warehouse; section and shelf paths hold no stock rows. "
+                         "Use a warehouse path /<warehouse>/.")
+    return prefix
+
+
+class StockQuerySet(models.QuerySet):
+    def under(self, location):
+        """Stock rows of a Warehouse (or its path); ValueError for a section or shelf."""
+        return self.filter(subtree_q('location_path', _location_prefix(location)))
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        paths = stored_paths((obj.warehouse_id, obj.section_id, obj.shelf_id) for obj in objs)
+        for obj, path in zip(objs, paths):
+            obj.location_path = path
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class StockLedgerQuerySet(models.QuerySet):
+    def under(self, location):
+        return self.filter(subtree_q('stock__location_path', _location_prefix(location)))
 
 
 class Stock(models.Model):
@@ -18,27 +51,39 @@ class Stock(models.Model):
     # Use higher precision for quantities
     quantity = models.DecimalField(max_digits=18, decimal_places=4, default=Decimal('0.0'))
     unit = models.CharField(max_length=50)
+    # materialized path of the most specific location (shelf > section > warehouse)
+    location_path = models.CharField(max_length=100, blank=True, default="", editable=False)
+
+    objects = StockQuerySet.as_manager()
 
     class Meta:
         unique_together = ('product', 'warehouse', 'section', 'shelf')
         indexes = [
             models.Index(fields=['product', 'warehouse']),
+            models.Index(fields=['location_path', 'product']),
         ]
 
     def __str__(self):
         return f"{self.product.name} - {self.warehouse.name}: {self.quantity} {self.unit}"
 
     def save(self, *args, **kwargs):
-        # ensure unit defaults to product.base_unit if available and not set
-        try:
-            base_unit = getattr(self.product, 'base_unit', None)
-        except Exception:
-            base_unit = None
-
-        if not self.unit and base_unit:
-            self.unit = base_unit
+        # ensure unit defaults to product.base_unit if available and not set (cached, no FK query)
+        if not self.unit and self.product_id:
+            try:
+                self.unit = MetadataCache.product(self.product_id).base_unit
+            except Product.DoesNotExist:
+                pass
+        # quantity-only saves keep the stored path; otherwise it is read from the DB, not the cache
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or LOCATION_FIELDS & set(update_fields):
+            self.fill_location_path()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'location_path'}
         super().save(*args, **kwargs)
 
+    def fill_location_path(self):
+        self.location_path, = stored_paths([(self.warehouse_id, self.section_id, self.shelf_id)])
+
     def increase(self, qty):
         self.quantity = (self.quantity or Decimal('0.0')) + Decimal(qty)
         self.save(update_fields=['quantity'])
@@ -61,12 +106,324 @@ class StockLedger(models.Model):
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = StockLedgerQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Stock Ledger Entry"
         verbose_name_plural = "Stock Ledger Entries"
         indexes = [
             models.Index(fields=['stock', 'created_at']),
+            # admin date_hierarchy / newest-first listing without a stock filter
+            models.Index(fields=['created_at', 'id'], name='stockledger_created_idx'),
         ]
 
     def __str__(self):
         return f"Ledger {self.pk} | Stock {self.stock_id} | change={self.change} | at {self.created_at}"
+
+
+class ValuationMethod(models.TextChoices):
+    FIFO = 'FIFO', 'First In, First Out'
+    AVG = 'AVG', 'Weighted Average'
+
+
+class ValuationKind(models.TextChoices):
+    RECEIPT = 'RECEIPT', 'Receipt'
+    ISSUE = 'ISSUE', 'Issue (COGS)'
+    TRANSFER_IN = 'TRANSFER_IN', 'Transfer In'
+    TRANSFER_OUT = 'TRANSFER_OUT', 'Transfer Out'
+    REVERSAL = 'REVERSAL', 'Reversal'
+
+
+class StockValuation(models.Model):
+    """Running value of one stock row; maintained incrementally from ledger entries."""
+    stock = models.OneToOneField(Stock, on_delete=models.CASCADE, related_name="valuation")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="valuations")
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="valuations")
+    quantity = models.DecimalField(max_digits=18, decimal_places=4, default=Decimal('0'))
+    total_value = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal('0'))
+    avg_cost = models.DecimalField(max_digits=18, decimal_places=6, default=Decimal('0'))
+    last_ledger_id = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Stock Valuation"
+        verbose_name_plural = "Stock Valuations"
+        indexes = [
+            models.Index(fields=['product', 'warehouse']),
+            models.Index(fields=['warehouse']),
+        ]
+
+    def __str__(self):
+        return f"Valuation stock {self.stock_id}: {self.quantity} @ {self.avg_cost} = {self.total_value}"
+
+
+class CostLayer(models.Model):
+    """FIFO receipt layer; consumed oldest first."""
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name="cost_layers")
+    ledger = models.ForeignKey(StockLedger, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    unit_cost = models.DecimalField(max_digits=18, decimal_places=6)
+    original_quantity = models.DecimalField(max_digits=18, decimal_places=4)
+    remaining_quantity = models.DecimalField(max_digits=18, decimal_places=4)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Cost Layer"
+        verbose_name_plural = "Cost Layers"
+        indexes = [
+            models.Index(fields=['stock', 'id'], condition=models.Q(remaining_quantity__gt=0),
+                         name='costlayer_open_idx'),
+        ]
+
+    def __str__(self):
+        return f"Layer {self.pk} | stock {self.stock_id}: {self.remaining_quantity}/{self.original_quantity} @ {self.unit_cost}"
+
+
+class ValuationEntry(models.Model):
+    """Value movement of one ledger entry (signed); COGS for a period = -sum(value) of ISSUE entries."""
+    ledger = models.OneToOneField(StockLedger, on_delete=models.CASCADE, related_name="valuation_entry")
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name="valuation_entries")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="valuation_entries")
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="valuation_entries")
+    kind = models.CharField(max_length=20, choices=ValuationKind.choices)
+    quantity = models.DecimalField(max_digits=18, decimal_places=4)
+    value = models.DecimalField(max_digits=20, decimal_places=4)
+    unit_cost = models.DecimalField(max_digits=18, decimal_places=6)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Valuation Entry"
+        verbose_name_plural = "Valuation Entries"
+        indexes = [
+            models.Index(fields=['kind', 'created_at']),
+            models.Index(fields=['warehouse', 'created_at']),
+            models.Index(fields=['product', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} ledger {self.ledger_id}: {self.quantity} -> {self.value}"
+
+
+class ShelfOccupancy(models.Model):
+    """
+    Free-capacity index row for a shelf with a capacity; maintained from the stock movements
+    onto and off the shelf (see stock_module.services.putaway). `free` is in the shelf's capacity_kind.
+    """
+    shelf = models.OneToOneField(Shelf, on_delete=models.CASCADE, related_name="occupancy")
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="shelf_occupancy")
+    capacity_kind = models.CharField(max_length=10)
+    capacity = models.DecimalField(max_digits=14, decimal_places=4)
+    used = models.DecimalField(max_digits=18, decimal_places=4, default=Decimal('0'))
+    free = models.DecimalField(max_digits=18, decimal_places=4)
+
+    class Meta:
+        verbose_name = "Shelf Occupancy"
+        verbose_name_plural = "Shelf Occupancy"
+        indexes = [
+            models.Index(fields=['warehouse', 'capacity_kind', 'free']),
+        ]
+
+    def __str__(self):
+        return f"Shelf {self.shelf_id}: {self.used}/{self.capacity} {self.capacity_kind}"
+
+
+class StockChangeEvent(models.Model):
+    """
+    Outbox row for one stock change, written in the same DB transaction as the ledger entry.
+    Plain id columns (no FKs): events outlive the rows they describe. Read in `position`
+    order: positions are stamped after commit (see StockChangeFeed.sequence), ids are not.
+    """
+    id = models.BigAutoField(primary_key=True)
+    # commit-order sequence number; null until the row is stamped
+    position = models.BigIntegerField(null=True, blank=True, unique=True, editable=False)
+    stock_id = models.BigIntegerField()
+    product_id = models.BigIntegerField()
+    warehouse_id = models.BigIntegerField()
+    section_id = models.BigIntegerField(null=True, blank=True)
+    shelf_id = models.BigIntegerField(null=True, blank=True)
+    change = models.DecimalField(max_digits=18, decimal_places=4)
+    new_quantity = models.DecimalField(max_digits=18, decimal_places=4)
+    transaction_id = models.BigIntegerField(null=True, blank=True)
+    ledger_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Stock Change Event"
+        verbose_name_plural = "Stock Change Events"
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(position__isnull=True), name='stockevent_unsequenced_idx'),
+        ]
+
+    def __str__(self):
+        return f"Event {self.pk} | stock {self.stock_id}: {self.change:+} -> {self.new_quantity}"
+
+    def as_dict(self):
+        return {
+            'id': self.pk,
+            'position': self.position,
+            'stock_id': self.stock_id,
+            'product_id': self.product_id,
+            'warehouse_id': self.warehouse_id,
+            'section_id': self.section_id,
+            'shelf_id': self.shelf_id,
+            'change': str(self.change),
+            'new_quantity': str(self.new_quantity),
+            'transaction_id': self.transaction_id,
+            'created_at': self.created_at.isoformat(),
+        }
+
+
+class StockFeedConsumer(models.Model):
+    """Committed read position of a named change-feed consumer (at-least-once: ack after processing)."""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Stock Feed Consumer"
+        verbose_name_plural = "Stock Feed Consumers"
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class AbcClass(models.TextChoices):
+    A = 'A', 'A'
+    B = 'B', 'B'
+    C = 'C', 'C'
+
+
+class StockAnalytics(models.Model):
+    """
+    Precomputed ABC / turnover figures per (product, warehouse) for the window ending at
+    computed_at; replaced as a whole by stock_module.services.analytics.InventoryAnalytics.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="analytics")
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="analytics")
+    window_days = models.PositiveIntegerField()
+    issued_quantity = models.DecimalField(max_digits=18, decimal_places=4, default=Decimal('0'))
+    consumption_value = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal('0'))
+    on_hand = models.DecimalField(max_digits=18, decimal_places=4, default=Decimal('0'))
+    average_on_hand = models.DecimalField(max_digits=18, decimal_places=4, default=Decimal('0'))
+    turnover = models.DecimalField(max_digits=14, decimal_places=4, null=True, blank=True)
+    days_of_supply = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+    abc_class = models.CharField(max_length=1, choices=AbcClass.choices)
+    dead_stock = models.BooleanField(default=False)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Stock Analytics"
+        verbose_name_plural = "Stock Analytics"
+        unique_together = ('product', 'warehouse')
+        indexes = [
+            models.Index(fields=['warehouse', 'abc_class']),
+            models.Index(fields=['dead_stock', 'warehouse']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}@{self.warehouse_id}: {self.abc_class} turnover={self.turnover}"
+
+
+class ForecastMethod(models.TextChoices):
+    SES = 'SES', 'Simple Exponential Smoothing'
+    MA = 'MA', 'Moving Average'
+
+
+class DemandForecast(models.Model):
+    """Latest daily demand forecast per (product, warehouse); written by stock_module.services.forecasting."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="demand_forecasts")
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="demand_forecasts")
+    method = models.CharField(max_length=10, choices=ForecastMethod.choices)
+    history_days = models.PositiveIntegerField()
+    horizon_days = models.PositiveIntegerField()
+    daily_demand = models.DecimalField(max_digits=18, decimal_places=4)
+    forecast_quantity = models.DecimalField(max_digits=18, decimal_places=4, help_text="Demand over the horizon")
+    demand_std = models.DecimalField(max_digits=18, decimal_places=4, help_text="Std. dev. of one-day forecast error")
+    safety_stock = models.DecimalField(max_digits=18, decimal_places=4)
+    reorder_point = models.DecimalField(max_digits=18, decimal_places=4)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Demand Forecast"
+        verbose_name_plural = "Demand Forecasts"
+        unique_together = ('product', 'warehouse')
+        indexes = [
+            models.Index(fields=['warehouse', 'product']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}@{self.warehouse_id}: {self.daily_demand}/day, safety {self.safety_stock}"
+
+
+class StockThreshold(models.Model):
+    """
+    Low / reorder / overstock levels for one (product, warehouse), checked against the
+    warehouse-level stock row whenever it changes (see stock_module.services.alerts).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_thresholds")
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="stock_thresholds")
+    min_quantity = models.DecimalField(max_digits=18, decimal_places=4, null=True, blank=True)
+    reorder_point = models.DecimalField(max_digits=18, decimal_places=4, null=True, blank=True)
+    max_quantity = models.DecimalField(max_digits=18, decimal_places=4, null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = "Stock Threshold"
+        verbose_name_plural = "Stock Thresholds"
+        unique_together = ('product', 'warehouse')
+
+    def __str__(self):
+        return (f"{self.product_id}@{self.warehouse_id}: min={self.min_quantity} "
+                f"reorder={self.reorder_point} max={self.max_quantity}")
+
+
+class AlertKind(models.TextChoices):
+    LOW = 'LOW', 'Below minimum'
+    REORDER = 'REORDER', 'At reorder point'
+    OVERSTOCK = 'OVERSTOCK', 'Above maximum'
+
+
+class StockAlert(models.Model):
+    """
+    Fired while a balance breaches a threshold level; resolved when it is back, or when the
+    threshold is deactivated, changed or deleted.
+    At most one open alert per (threshold, kind). Read in id order (cursor API).
+    """
+    id = models.BigAutoField(primary_key=True)
+    # kept (resolved) when the threshold is deleted
+    threshold = models.ForeignKey(StockThreshold, on_delete=models.SET_NULL, null=True, blank=True,
+                                  related_name="alerts")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_alerts")
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="stock_alerts")
+    kind = models.CharField(max_length=10, choices=AlertKind.choices)
+    level = models.DecimalField(max_digits=18, decimal_places=4)
+    quantity = models.DecimalField(max_digits=18, decimal_places=4)
+    ledger_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Stock Alert"
+        verbose_name_plural = "Stock Alerts"
+        constraints = [
+            models.UniqueConstraint(fields=['threshold', 'kind'], condition=models.Q(resolved_at__isnull=True),
+                                    name='stockalert_one_open'),
+        ]
+        indexes = [
+            models.Index(fields=['warehouse', 'id']),
+        ]
+
+    def __str__(self):
+        state = 'resolved' if self.resolved_at else 'open'
+        return f"{self.kind} {self.product_id}@{self.warehouse_id}: {self.quantity} vs {self.level} ({state})"
+
+    def as_dict(self):
+        return {
+            'id': self.pk,
+            'product_id': self.product_id,
+            'warehouse_id': self.warehouse_id,
+            'kind': self.kind,
+            'level': str(self.level),
+            'quantity': str(self.quantity),
+            'ledger_id': self.ledger_id,
+            'created_at': self.created_at.isoformat(),
+            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
+        }
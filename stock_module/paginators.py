@@ -0,0 +1,96 @@
+# stock_module/paginators.py
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+DEFAULT_EXACT_LIMIT = 10000
+COUNT_CACHE_TTL = 300
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for very large tables. Counts exactly only up to a limit (a COUNT over a
+    LIMITed subquery, so it stops early); above it the count comes from the PostgreSQL
+    planner estimate (EXPLAIN, filters included) or, on other databases, from an exact count
+    cached for a few minutes per query. Page links past the estimate may come out empty.
+    """
+
+    @staticmethod
+    def exact_limit():
+        return getattr(settings, 'INVENTORY_ADMIN_EXACT_COUNT_LIMIT', DEFAULT_EXACT_LIMIT)
+
+    @staticmethod
+    def _planner_estimate(qs):
+        if connections[qs.db].vendor != 'postgresql':
+            return None
+        plan = json.loads(qs.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @staticmethod
+    def _cached_count(qs):
+        sql, params = qs.order_by().query.sql_with_params()
+        key = 'admin-count:' + hashlib.md5(f"{qs.db}|{sql}|{params}".encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = qs.count()
+            cache.set(key, count, COUNT_CACHE_TTL)
+        return count
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if not hasattr(qs, 'query'):
+            return len(qs)
+        limit = self.exact_limit()
+        bounded = qs.order_by()[:limit + 1].count()
+        if bounded <= limit:
+            return bounded
+        estimate = self._planner_estimate(qs)
+        if estimate is not None:
+            return max(estimate, bounded)
+        return self._cached_count(qs)
+
+
+class KeysetPaginationMixin:
+    """
+    ModelAdmin mixin for append-only tables ordered newest first by id: estimated counts,
+    no full-table count for filtered views, and a "next" link that continues below the last
+    id shown (?after=<id>), so deep pages are an index range scan instead of a large OFFSET.
+    The keyset link is only offered with the default ordering.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ('-id',)
+    change_list_template = 'admin/keyset_change_list.html'
+    keyset_param = 'after'
+
+    def changelist_view(self, request, extra_context=None):
+        after = request.GET.get(self.keyset_param)
+        if after is not None:
+            # not a field lookup: hide it from ChangeList and apply it in get_queryset
+            request.GET = request.GET.copy()
+            del request.GET[self.keyset_param]
+            request.keyset_after = int(after) if after.isdigit() else None
+        response = super().changelist_view(request, extra_context)
+        cl = getattr(response, 'context_data', {}).get('cl')
+        if cl is None:
+            return response
+        response.context_data['keyset_after'] = getattr(request, 'keyset_after', None)
+        response.context_data['keyset_first'] = cl.get_query_string(remove=[PAGE_VAR])
+        if ORDER_VAR not in cl.params and len(cl.result_list) >= cl.list_per_page:
+            last = cl.result_list[len(cl.result_list) - 1]
+            response.context_data['keyset_next'] = cl.get_query_string({self.keyset_param: last.pk}, [PAGE_VAR])
+        return response
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        after = getattr(request, 'keyset_after', None)
+        if after:
+            qs = qs.filter(pk__lt=after)
+        return qs
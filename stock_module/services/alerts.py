@@ -0,0 +1,148 @@
+# stock_module/services/alerts.py
+from dataclasses import dataclass, field
+
+from django.utils import timezone
+
+from ..models import AlertKind, Stock, StockAlert, StockThreshold
+
+MAX_BATCH = 1000
+
+# (threshold field, alert kind, breached when the balance is ... the level)
+LEVELS = (
+    ('min_quantity', AlertKind.LOW, 'below'),
+    ('reorder_point', AlertKind.REORDER, 'below'),
+    ('max_quantity', AlertKind.OVERSTOCK, 'above'),
+)
+
+
+def _breached(direction, quantity, level):
+    return quantity <= level if direction == 'below' else quantity > level
+
+
+@dataclass
+class AlertBatch:
+    alerts: list = field(default_factory=list)
+    cursor: int = 0
+    has_more: bool = False
+
+
+class StockAlertEngine:
+    """
+    Threshold alerts evaluated incrementally from ledger entries (see stock_module.signals),
+    inside the transaction that changes the stock. Each entry carries the balance after it, so
+    no history is read: an alert fires whenever the balance is breached and none is open, and
+    resolves when the balance is back out. One query loads the thresholds of the touched
+    (product, warehouse) keys and one the open alerts, per batch; the partial unique constraint
+    keeps at most one open alert per threshold and kind. Only warehouse-level stock rows are
+    checked. A threshold that is saved is checked against the current balance right away
+    (evaluate), and a deleted one resolves its open alerts (close).
+    """
+
+    @staticmethod
+    def record(entries):
+        entries = [e for e in entries if e.stock.section_id is None and e.stock.shelf_id is None]
+        keys = {(e.stock.product_id, e.stock.warehouse_id) for e in entries}
+        if not keys:
+            return []
+        thresholds = {
+            (t.product_id, t.warehouse_id): t
+            for t in StockThreshold.objects.filter(
+                is_active=True, product_id__in={k[0] for k in keys}, warehouse_id__in={k[1] for k in keys})
+            if (t.product_id, t.warehouse_id) in keys
+        }
+        if not thresholds:
+            return []
+        open_alerts = {(a.threshold_id, a.kind): a for a in StockAlert.objects.filter(
+            threshold__in=thresholds.values(), resolved_at__isnull=True)}
+
+        now = timezone.now()
+        created, resolved = [], []
+        for entry in entries:
+            threshold = thresholds.get((entry.stock.product_id, entry.stock.warehouse_id))
+            if threshold is None:
+                continue
+            for name, kind, direction in LEVELS:
+                level = getattr(threshold, name)
+                if level is None:
+                    continue
+                key = (threshold.pk, kind)
+                now_breached = _breached(direction, entry.new_quantity, level)
+                if now_breached and key not in open_alerts:
+                    alert = StockAlert(threshold=threshold, product_id=threshold.product_id,
+                                       warehouse_id=threshold.warehouse_id, kind=kind, level=level,
+                                       quantity=entry.new_quantity, ledger_id=entry.pk, created_at=now)
+                    created.append(alert)
+                    open_alerts[key] = alert
+                elif not now_breached and key in open_alerts:
+                    alert = open_alerts.pop(key)
+                    if alert.pk:
+                        resolved.append(alert.pk)
+                    else:
+                        alert.resolved_at = now   # fired and recovered within the same batch
+
+        if resolved:
+            StockAlert.objects.filter(pk__in=resolved).update(resolved_at=now)
+        if created:
+            StockAlert.objects.bulk_create(created)
+        return created
+
+    @staticmethod
+    def evaluate(thresholds):
+        """
+        Check thresholds against the current warehouse balance, e.g. after one was added or
+        changed: open alerts of inactive / cleared levels, of levels that moved, or no longer
+        breached are resolved; breached levels without an open alert fire. Returns the new alerts.
+        """
+        thresholds = list(thresholds)
+        if not thresholds:
+            return []
+        balances = dict(((p, w), q) for p, w, q in Stock.objects.filter(
+            section__isnull=True, shelf__isnull=True, product_id__in={t.product_id for t in thresholds},
+            warehouse_id__in={t.warehouse_id for t in thresholds},
+        ).values_list('product_id', 'warehouse_id', 'quantity'))
+        open_alerts = {(a.threshold_id, a.kind): a for a in StockAlert.objects.filter(
+            threshold__in=thresholds, resolved_at__isnull=True)}
+
+        now = timezone.now()
+        created, resolved = [], []
+        for threshold in thresholds:
+            quantity = balances.get((threshold.product_id, threshold.warehouse_id), 0)
+            for name, kind, direction in LEVELS:
+                level = getattr(threshold, name) if threshold.is_active else None
+                breached = level is not None and _breached(direction, quantity, level)
+                alert = open_alerts.get((threshold.pk, kind))
+                if alert is not None and (not breached or alert.level != level):
+                    resolved.append(alert.pk)
+                    alert = None
+                if breached and alert is None:
+                    created.append(StockAlert(threshold=threshold, product_id=threshold.product_id,
+                                              warehouse_id=threshold.warehouse_id, kind=kind, level=level,
+                                              quantity=quantity, created_at=now))
+
+        if resolved:
+            StockAlert.objects.filter(pk__in=resolved).update(resolved_at=now)
+        if created:
+            StockAlert.objects.bulk_create(created)
+        return created
+
+    @staticmethod
+    def close(thresholds):
+        """Resolve the open alerts of thresholds that are going away; returns how many."""
+        return StockAlert.objects.filter(threshold__in=list(thresholds), resolved_at__isnull=True).update(
+            resolved_at=timezone.now())
+
+    @staticmethod
+    def read(after=0, limit=100, warehouse=None, product=None, open_only=False):
+        """Alerts with id > after, oldest first."""
+        limit = max(1, min(int(limit), MAX_BATCH))
+        qs = StockAlert.objects.filter(pk__gt=int(after))
+        if warehouse is not None:
+            qs = qs.filter(warehouse_id=getattr(warehouse, 'pk', warehouse))
+        if product is not None:
+            qs = qs.filter(product_id=getattr(product, 'pk', product))
+        if open_only:
+            qs = qs.filter(resolved_at__isnull=True)
+        alerts = list(qs.order_by('pk')[:limit + 1])
+        batch = AlertBatch(alerts=alerts[:limit], has_more=len(alerts) > limit)
+        batch.cursor = batch.alerts[-1].pk if batch.alerts else int(after)
+        return batch
@@ -0,0 +1,157 @@
+# stock_module/services/analytics.py
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from ..models import AbcClass, Stock, StockAnalytics, ValuationEntry
+from .valuation import CONSUMPTION
+
+ABC_LABELS = np.array([AbcClass.A, AbcClass.B, AbcClass.C])
+
+
+@dataclass
+class AnalyticsArrays:
+    """One entry per (product, warehouse); all arrays have the same length."""
+    product_ids: np.ndarray
+    warehouse_ids: np.ndarray
+    issued: np.ndarray
+    value: np.ndarray
+    on_hand: np.ndarray
+    average_on_hand: np.ndarray
+    turnover: np.ndarray          # NaN where there was no stock to turn
+    days_of_supply: np.ndarray    # NaN where nothing was issued
+    abc: np.ndarray
+    dead: np.ndarray
+
+    def __len__(self):
+        return len(self.product_ids)
+
+
+def _decimal(x, places='0.0001'):
+    return None if np.isnan(x) else Decimal(repr(float(x))).quantize(Decimal(places))
+
+
+class InventoryAnalytics:
+    """
+    ABC classes, turnover, days-of-supply and dead-stock flags per (product, warehouse).
+
+    Issues in the window (quantity and value at cost, net of reversed issues) and the net
+    movement come from one grouped query over ValuationEntry, current quantities from one over
+    Stock; everything else is computed on NumPy arrays. ABC is ranked by consumption value inside each
+    warehouse: a row is A while the value ranked above it is below the first threshold, B
+    below the second, C otherwise (settings.INVENTORY_ABC_THRESHOLDS, default (0.8, 0.95)).
+    Average on hand is the mean of the opening (on hand minus net movement) and current balance.
+    """
+
+    @staticmethod
+    def thresholds():
+        return getattr(settings, 'INVENTORY_ABC_THRESHOLDS', (0.8, 0.95))
+
+    @staticmethod
+    def _load(since, warehouse):
+        flows = ValuationEntry.objects.filter(created_at__gte=since)
+        stocks = Stock.objects.all()
+        if warehouse is not None:
+            flows = flows.filter(warehouse_id=getattr(warehouse, 'pk', warehouse))
+            stocks = stocks.filter(warehouse_id=getattr(warehouse, 'pk', warehouse))
+        flows = flows.values_list('product_id', 'warehouse_id').annotate(
+            issued=Sum('quantity', filter=CONSUMPTION), value=Sum('value', filter=CONSUMPTION), net=Sum('quantity'),
+        ).order_by()
+        stocks = stocks.values_list('product_id', 'warehouse_id').annotate(on_hand=Sum('quantity')).order_by()
+
+        index, columns = {}, [[], [], [], []]   # issued, value, net, on_hand
+
+        def slot(key):
+            i = index.get(key)
+            if i is None:
+                i = index[key] = len(index)
+                for column in columns:
+                    column.append(0.0)
+            return i
+
+        for product_id, warehouse_id, issued, value, net in flows:
+            i = slot((product_id, warehouse_id))
+            # reversed issues net out; a reversal of an issue before the window does not go below zero
+            columns[0][i], columns[1][i] = max(0.0, -float(issued or 0)), max(0.0, -float(value or 0))
+            columns[2][i] = float(net or 0)
+        for product_id, warehouse_id, on_hand in stocks:
+            columns[3][slot((product_id, warehouse_id))] = float(on_hand or 0)
+
+        keys = np.array(list(index.keys()), dtype=np.int64).reshape(-1, 2)
+        return keys, [np.array(column, dtype=np.float64) for column in columns]
+
+    @classmethod
+    def _abc(cls, warehouse_ids, value):
+        """ABC per warehouse by cumulative share of consumption value."""
+        n = len(value)
+        if not n:
+            return np.empty(0, dtype=object)
+        order = np.lexsort((-value, warehouse_ids))
+        v, w = value[order], warehouse_ids[order]
+        starts = np.flatnonzero(np.r_[True, w[1:] != w[:-1]])
+        lengths = np.diff(np.r_[starts, n])
+        totals = np.repeat(np.add.reduceat(v, starts), lengths)
+        cumulative = np.cumsum(v)
+        before_group = np.repeat(cumulative[starts] - v[starts], lengths)
+        above = cumulative - v - before_group          # value ranked above this row
+        share = np.divide(above, totals, out=np.ones(n), where=totals > 0)
+        a, b = cls.thresholds()
+        classes = np.where(v <= 0, 2, np.where(share < a, 0, np.where(share < b, 1, 2)))
+        result = np.empty(n, dtype=object)
+        result[order] = ABC_LABELS[classes]
+        return result
+
+    @classmethod
+    def compute(cls, window_days=90, warehouse=None):
+        if window_days <= 0:
+            raise ValueError("window_days must be positive.")
+        keys, (issued, value, net, on_hand) = cls._load(timezone.now() - timedelta(days=window_days), warehouse)
+        average = np.maximum((2 * on_hand - net) / 2, 0)
+        daily = issued / window_days
+        return AnalyticsArrays(
+            product_ids=keys[:, 0],
+            warehouse_ids=keys[:, 1],
+            issued=issued,
+            value=value,
+            on_hand=on_hand,
+            average_on_hand=average,
+            turnover=np.divide(issued, average, out=np.full_like(issued, np.nan), where=average > 0),
+            days_of_supply=np.divide(on_hand, daily, out=np.full_like(issued, np.nan), where=daily > 0),
+            abc=cls._abc(keys[:, 1], value),
+            dead=(on_hand > 0) & (issued <= 0),
+        )
+
+    @classmethod
+    def refresh(cls, window_days=90, warehouse=None, batch_size=2000):
+        """Recompute and replace the StockAnalytics rows (of one warehouse, or all); returns the row count."""
+        data = cls.compute(window_days, warehouse)
+        now = timezone.now()
+        rows = [
+            StockAnalytics(
+                product_id=int(data.product_ids[i]),
+                warehouse_id=int(data.warehouse_ids[i]),
+                window_days=window_days,
+                issued_quantity=_decimal(data.issued[i]),
+                consumption_value=_decimal(data.value[i]),
+                on_hand=_decimal(data.on_hand[i]),
+                average_on_hand=_decimal(data.average_on_hand[i]),
+                turnover=_decimal(data.turnover[i]),
+                days_of_supply=_decimal(data.days_of_supply[i], '0.01'),
+                abc_class=data.abc[i],
+                dead_stock=bool(data.dead[i]),
+                computed_at=now,
+            ) for i in range(len(data))
+        ]
+        with transaction.atomic():
+            existing = StockAnalytics.objects.all()
+            if warehouse is not None:
+                existing = existing.filter(warehouse_id=getattr(warehouse, 'pk', warehouse))
+            existing.delete()
+            StockAnalytics.objects.bulk_create(rows, batch_size=batch_size)
+        return len(rows)
@@ -0,0 +1,164 @@
+# stock_module/services/forecasting.py
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from statistics import NormalDist
+
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from inventory_transaction_module.models import InventoryTransaction
+from ..models import DemandForecast, ForecastMethod
+
+QUANT = Decimal('0.0001')
+
+
+@dataclass
+class ForecastParams:
+    method: str = ForecastMethod.SES
+    history_days: int = 90
+    horizon_days: int = 14
+    alpha: float = 0.3            # SES smoothing factor
+    window: int = 28              # MA window in days
+    lead_time_days: float = 7
+    service_level: float = 0.95
+
+    def validate(self):
+        if self.method not in ForecastMethod.values:
+            raise ValueError(f"Invalid forecast method: {self.method}")
+        if not 0 < self.alpha <= 1:
+            raise ValueError("alpha must be in (0, 1].")
+        if not 0 < self.service_level < 1:
+            raise ValueError("service_level must be between 0 and 1.")
+        if self.history_days < 2 or self.horizon_days < 1 or self.window < 1:
+            raise ValueError("history_days must be >= 2, horizon_days and window >= 1.")
+
+
+def _q(x):
+    return Decimal(repr(float(x))).quantize(QUANT)
+
+
+class DemandForecaster:
+    """
+    Daily demand forecasts per (product, warehouse) from outbound transactions.
+
+    Demand is OUT transactions without a destination (transfer legs are not consumption),
+    summed per day; reversals and the issues they reverse are left out. A chunk of products becomes one (series x days) matrix and every model
+    is fitted on the whole matrix at once: SES steps through the days updating all series
+    in one vector operation, the moving average uses a cumulative sum. The one-step forecast
+    error gives the demand deviation; safety stock = z(service level) * sigma * sqrt(lead time)
+    and reorder point = daily demand * lead time + safety stock. Chunks are independent and
+    can run in a process pool.
+    """
+
+    @staticmethod
+    def _demand(since):
+        return InventoryTransaction.objects.filter(
+            transaction_type='OUT', processed=True, destination_warehouse__isnull=True,
+            source_warehouse__isnull=False, reverses__isnull=True, reversals__isnull=True,
+            created_at__gte=since)
+
+    @classmethod
+    def _matrix(cls, product_ids, since, days):
+        rows = list(cls._demand(since).filter(product_id__in=product_ids)
+                    .annotate(day=TruncDate('created_at'))
+                    .values_list('product_id', 'source_warehouse_id', 'day')
+                    .annotate(qty=Sum('quantity')).order_by())
+        if not rows:
+            return np.empty((0, 2), dtype=np.int64), np.empty((0, days))
+        products, warehouses, day, qty = zip(*rows)
+        pairs = np.column_stack([np.array(products, dtype=np.int64), np.array(warehouses, dtype=np.int64)])
+        keys, series = np.unique(pairs, axis=0, return_inverse=True)
+        first = timezone.localtime(since).date()
+        columns = np.array([(d - first).days for d in day], dtype=np.int64)
+        matrix = np.zeros((len(keys), days))
+        inside = (columns >= 0) & (columns < days)
+        np.add.at(matrix, (series.ravel()[inside], columns[inside]), np.array(qty, dtype=np.float64)[inside])
+        return keys, matrix
+
+    @staticmethod
+    def _ses(matrix, alpha):
+        """Returns (level after the last day, one-step error std) per series."""
+        start = min(7, matrix.shape[1])
+        level = matrix[:, :start].mean(axis=1)
+        squared = np.zeros(matrix.shape[0])
+        for t in range(matrix.shape[1]):
+            error = matrix[:, t] - level
+            squared += error * error
+            level = level + alpha * error
+        return level, np.sqrt(squared / matrix.shape[1])
+
+    @staticmethod
+    def _moving_average(matrix, window):
+        window = min(window, matrix.shape[1] - 1)
+        cumulative = np.cumsum(np.pad(matrix, ((0, 0), (1, 0))), axis=1)
+        averages = (cumulative[:, window:] - cumulative[:, :-window]) / window   # mean of days [t-window, t)
+        errors = matrix[:, window:] - averages[:, :-1]
+        return averages[:, -1], np.sqrt((errors * errors).mean(axis=1))
+
+    @classmethod
+    def forecast_products(cls, product_ids, params, since, now):
+        """Fit and store the forecasts of a chunk of products; returns the number of series."""
+        keys, matrix = cls._matrix(product_ids, since, params.history_days)
+        if not len(keys):
+            return 0
+        if params.method == ForecastMethod.SES:
+            daily, sigma = cls._ses(matrix, params.alpha)
+        else:
+            daily, sigma = cls._moving_average(matrix, params.window)
+        daily = np.maximum(daily, 0)
+        z = NormalDist().inv_cdf(params.service_level)
+        safety = z * sigma * np.sqrt(params.lead_time_days)
+        reorder = daily * params.lead_time_days + safety
+
+        rows = [DemandForecast(
+            product_id=int(keys[i, 0]), warehouse_id=int(keys[i, 1]), method=params.method,
+            history_days=params.history_days, horizon_days=params.horizon_days,
+            daily_demand=_q(daily[i]), forecast_quantity=_q(daily[i] * params.horizon_days),
+            demand_std=_q(sigma[i]), safety_stock=_q(safety[i]), reorder_point=_q(reorder[i]),
+            computed_at=now,
+        ) for i in range(len(keys))]
+        with transaction.atomic():
+            # chunks are split by product, so every series of these products is in this chunk
+            DemandForecast.objects.filter(product_id__in=product_ids).delete()
+            DemandForecast.objects.bulk_create(rows, batch_size=2000)
+        return len(rows)
+
+    @classmethod
+    def run(cls, params=None, workers=1, chunk_size=2000):
+        """Forecast every series with demand in the history window; returns the number of series."""
+        params = params or ForecastParams()
+        params.validate()
+        now = timezone.now()
+        today = timezone.localtime(now).date()
+        since = timezone.make_aware(datetime.combine(today - timedelta(days=params.history_days - 1), time.min))
+
+        product_ids = list(cls._demand(since).order_by('product_id').values_list('product_id', flat=True).distinct())
+        chunks = [product_ids[i:i + chunk_size] for i in range(0, len(product_ids), chunk_size)]
+        if workers <= 1 or len(chunks) <= 1:
+            total = sum(cls.forecast_products(chunk, params, since, now) for chunk in chunks)
+        else:
+            # children must open their own connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                total = sum(pool.map(_forecast_chunk, chunks, [params] * len(chunks),
+                                     [since] * len(chunks), [now] * len(chunks)))
+        # series without demand in this window keep no stale forecast
+        DemandForecast.objects.filter(computed_at__lt=now).delete()
+        return total
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _forecast_chunk(product_ids, params, since, now):
+    try:
+        return DemandForecaster.forecast_products(product_ids, params, since, now)
+    finally:
+        connections.close_all()
@@ -0,0 +1,139 @@
+# stock_module/services/live.py
+import asyncio
+import weakref
+from dataclasses import dataclass, field
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Max
+
+from ..models import StockChangeEvent
+from .outbox import StockChangeFeed
+
+DEFAULT_POLL_SECONDS = 1.0
+MAX_BATCH = 1000
+
+
+@dataclass
+class LiveBatch:
+    changes: list = field(default_factory=list)
+    cursor: int = 0           # last feed position covered; pass back as `after`
+    has_more: bool = False
+
+
+async def latest_position():
+    """Highest feed position; stamps committed events first, so a cursor never skips a late commit."""
+    return await sync_to_async(StockChangeFeed.sequence)()
+
+
+async def read_changes(after, horizon, limit=MAX_BATCH, warehouse=None, product=None):
+    """Change events in positions (after, horizon], oldest first; without a match the cursor still moves to horizon."""
+    limit = max(1, min(int(limit), MAX_BATCH))
+    qs = StockChangeEvent.objects.filter(position__gt=after, position__lte=horizon)
+    if warehouse is not None:
+        qs = qs.filter(warehouse_id=warehouse)
+    if product is not None:
+        qs = qs.filter(product_id=product)
+    rows = [row async for row in qs.order_by('position').values(
+        'position', 'ledger_id', 'stock_id', 'product_id', 'warehouse_id', 'section_id', 'shelf_id',
+        'change', 'new_quantity', 'transaction_id', 'created_at')[:limit + 1]]
+    batch = LiveBatch(changes=rows[:limit], has_more=len(rows) > limit)
+    batch.cursor = batch.changes[-1]['position'] if batch.has_more else horizon
+    return batch
+
+
+@dataclass(eq=False)
+class Waiter:
+    checked: int              # positions up to here hold nothing for this filter
+    warehouse: int = None
+    product: int = None
+    woken: asyncio.Future = None
+
+    @property
+    def filtered(self):
+        return self.warehouse is not None or self.product is not None
+
+    def matches(self, warehouse_id, product_id):
+        return ((self.warehouse is None or self.warehouse == warehouse_id)
+                and (self.product is None or self.product == product_id))
+
+
+class LedgerWatcher:
+    """
+    Wakes long-polling clients when the change feed moves past their cursor. One watcher per
+    event loop: while anyone is waiting, a single task stamps and reads the latest feed position
+    every INVENTORY_LIVE_POLL_SECONDS and, when it moved, reads the (warehouse, product) pairs of
+    the new positions once (one grouped range query, skipped when no waiter is filtered). Only
+    the waiters whose filter matches one of them are woken; the others just move their checked
+    position. Idle clients therefore cost a suspended coroutine each and the process a query or
+    two per interval, however many displays are connected. Positions are in commit order (see
+    StockChangeFeed), so changes committed by any process are seen, at most one interval late.
+    """
+
+    _by_loop = weakref.WeakKeyDictionary()
+
+    def __init__(self):
+        self.latest = None
+        self.waiters = set()
+        self.task = None
+
+    @classmethod
+    def current(cls):
+        loop = asyncio.get_running_loop()
+        watcher = cls._by_loop.get(loop)
+        if watcher is None:
+            watcher = cls._by_loop[loop] = cls()
+        return watcher
+
+    @staticmethod
+    def poll_seconds():
+        return getattr(settings, 'INVENTORY_LIVE_POLL_SECONDS', DEFAULT_POLL_SECONDS)
+
+    def polling(self):
+        return self.task is not None and not self.task.done()
+
+    async def horizon(self):
+        """Current feed position; free while the poller is running (its value is at most one interval old)."""
+        if self.polling() and self.latest is not None:
+            return self.latest
+        return await latest_position()
+
+    async def wait_past(self, after, timeout, warehouse=None, product=None):
+        """
+        Wait for a change after `after` that matches the filter. Returns (True, new horizon) when
+        woken, or (False, checked position) on timeout - nothing up to it matched the filter.
+        """
+        waiter = Waiter(checked=after, warehouse=warehouse, product=product,
+                        woken=asyncio.get_running_loop().create_future())
+        self.waiters.add(waiter)
+        if not self.polling():
+            self.task = asyncio.get_running_loop().create_task(self._poll())
+        try:
+            return True, await asyncio.wait_for(asyncio.shield(waiter.woken), timeout)
+        except asyncio.TimeoutError:
+            return False, waiter.checked
+        finally:
+            self.waiters.discard(waiter)
+
+    async def _poll(self):
+        while self.waiters:
+            latest = await latest_position()
+            waiters = [w for w in self.waiters if not w.woken.done()]
+            start = min((w.checked for w in waiters), default=latest)
+            if latest > start:
+                # newest position per (warehouse, product) in the range, read once for every filtered waiter
+                pairs = []
+                if any(w.filtered for w in waiters):
+                    pairs = [row async for row in StockChangeEvent.objects.filter(
+                        position__gt=start, position__lte=latest).order_by().values(
+                        'warehouse_id', 'product_id').annotate(last=Max('position'))]
+                for waiter in waiters:
+                    if waiter.checked >= latest:
+                        continue
+                    if not waiter.filtered or any(row['last'] > waiter.checked and waiter.matches(
+                            row['warehouse_id'], row['product_id']) for row in pairs):
+                        waiter.woken.set_result(latest)
+                    else:
+                        waiter.checked = latest
+            self.latest = latest
+            await asyncio.sleep(self.poll_seconds())
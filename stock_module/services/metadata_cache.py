@@ -0,0 +1,217 @@
+# stock_module/services/metadata_cache.py
+import threading
+import time
+
+from django.conf import settings
+
+from product_module.models import Product
+from location_module.models import Warehouse, Section, Shelf
+from location_module.services.paths import build_path
+
+# Entries are dropped by model signals in this process; other processes rely on the TTL for
+# changed rows. Rows created elsewhere are found at once: a miss is looked up in the database.
+DEFAULT_TTL = 300
+
+
+class ProductMeta:
+    __slots__ = ('id', 'base_unit', 'name', 'sku', 'is_active', 'unit_volume', 'unit_weight', 'loaded_at')
+
+    def __init__(self, id, base_unit, name, sku, is_active, unit_volume, unit_weight, loaded_at):
+        self.id = id
+        self.base_unit = base_unit
+        self.name = name
+        self.sku = sku
+        self.is_active = is_active
+        self.unit_volume = unit_volume
+        self.unit_weight = unit_weight
+        self.loaded_at = loaded_at
+
+    @property
+    def pk(self):
+        return self.id
+
+
+class WarehouseMeta:
+    __slots__ = ('id', 'name', 'code')
+
+    def __init__(self, id, name, code):
+        self.id = id
+        self.name = name
+        self.code = code
+
+
+class SectionMeta:
+    __slots__ = ('id', 'warehouse_id', 'name', 'code')
+
+    def __init__(self, id, warehouse_id, name, code):
+        self.id = id
+        self.warehouse_id = warehouse_id
+        self.name = name
+        self.code = code
+
+
+class ShelfMeta:
+    __slots__ = ('id', 'section_id', 'warehouse_id', 'name', 'code')
+
+    def __init__(self, id, section_id, warehouse_id, name, code):
+        self.id = id
+        self.section_id = section_id
+        self.warehouse_id = warehouse_id
+        self.name = name
+        self.code = code
+
+
+class MetadataCache:
+    """
+    Process-local cache of product metadata (base_unit, name, sku, is_active, unit volume/weight) and of the
+    warehouse -> section -> shelf hierarchy, so hot paths avoid lazy FK queries.
+
+    Products are loaded on demand in batches (prefetch_products) or all at once (warm);
+    the location hierarchy is small and is loaded whole on first use. Signals in
+    stock_module.signals invalidate entries when the underlying rows change.
+    """
+
+    _lock = threading.Lock()
+    _products = {}
+    _warehouses = {}
+    _sections = {}
+    _shelves = {}
+    _locations_loaded_at = None
+
+    @staticmethod
+    def ttl():
+        return getattr(settings, 'INVENTORY_METADATA_CACHE_TTL', DEFAULT_TTL)
+
+    # --- products ----------------------------------------------------------------------------
+
+    @classmethod
+    def _load_products(cls, queryset):
+        now = time.monotonic()
+        loaded = {
+            pk: ProductMeta(pk, base_unit, name, sku, is_active, unit_volume, unit_weight, now)
+            for pk, base_unit, name, sku, is_active, unit_volume, unit_weight in queryset.order_by().values_list(
+                'pk', 'base_unit', 'name', 'sku', 'is_active', 'unit_volume', 'unit_weight').iterator(chunk_size=5000)
+        }
+        cls._products.update(loaded)
+        return loaded
+
+    @classmethod
+    def prefetch_products(cls, ids):
+        """Make sure all ids are cached (one query for the missing or expired ones); returns {id: ProductMeta}."""
+        deadline = time.monotonic() - cls.ttl()
+        found, missing = {}, []
+        for pk in set(ids):
+            meta = cls._products.get(pk)
+            if meta is None or meta.loaded_at < deadline:
+                missing.append(pk)
+            else:
+                found[pk] = meta
+        if missing:
+            found.update(cls._load_products(Product.objects.filter(pk__in=missing)))
+        return found
+
+    @classmethod
+    def product(cls, pk):
+        """ProductMeta for pk; raises Product.DoesNotExist if there is no such product."""
+        meta = cls.prefetch_products([pk]).get(pk)
+        if meta is None:
+            raise Product.DoesNotExist(f"Product id={pk} does not exist.")
+        return meta
+
+    # --- locations ---------------------------------------------------------------------------
+
+    @classmethod
+    def _ensure_locations(cls):
+        loaded_at = cls._locations_loaded_at
+        if loaded_at is not None and loaded_at >= time.monotonic() - cls.ttl():
+            return
+        with cls._lock:
+            if cls._locations_loaded_at is not loaded_at:
+                return  # another thread reloaded meanwhile
+            warehouses = {pk: WarehouseMeta(pk, name, code)
+                          for pk, name, code in Warehouse.objects.values_list('pk', 'name', 'code')}
+            sections = {pk: SectionMeta(pk, wh_id, name, code)
+                        for pk, wh_id, name, code in Section.objects.values_list('pk', 'warehouse_id', 'name', 'code')}
+            shelves = {
+                pk: ShelfMeta(pk, sec_id, sections[sec_id].warehouse_id, name, code)
+                for pk, sec_id, name, code in Shelf.objects.values_list('pk', 'section_id', 'name', 'code')
+                if sec_id in sections
+            }
+            cls._warehouses, cls._sections, cls._shelves = warehouses, sections, shelves
+            cls._locations_loaded_at = time.monotonic()
+
+    @classmethod
+    def warehouse(cls, pk):
+        cls._ensure_locations()
+        meta = cls._warehouses.get(pk)
+        if meta is None and pk is not None:
+            row = Warehouse.objects.filter(pk=pk).values_list('name', 'code').first()
+            if row is not None:
+                meta = cls._warehouses[pk] = WarehouseMeta(pk, *row)
+        return meta
+
+    @classmethod
+    def section(cls, pk):
+        cls._ensure_locations()
+        meta = cls._sections.get(pk)
+        if meta is None and pk is not None:
+            row = Section.objects.filter(pk=pk).values_list('warehouse_id', 'name', 'code').first()
+            if row is not None:
+                meta = cls._sections[pk] = SectionMeta(pk, *row)
+        return meta
+
+    @classmethod
+    def shelf(cls, pk):
+        cls._ensure_locations()
+        meta = cls._shelves.get(pk)
+        if meta is None and pk is not None:
+            row = Shelf.objects.filter(pk=pk).values_list(
+                'section_id', 'section__warehouse_id', 'name', 'code').first()
+            if row is not None:
+                meta = cls._shelves[pk] = ShelfMeta(pk, *row)
+        return meta
+
+    @classmethod
+    def warehouse_id_for(cls, section_id=None, shelf_id=None):
+        """Owning warehouse id of a shelf or section (None if neither exists)."""
+        shelf = cls.shelf(shelf_id) if shelf_id else None
+        if shelf is not None:
+            return shelf.warehouse_id
+        section = cls.section(section_id) if section_id else None
+        if section is not None:
+            return section.warehouse_id
+        return None
+
+    @classmethod
+    def location_path(cls, warehouse_id=None, section_id=None, shelf_id=None):
+        """Materialized path of the most specific known location (see location_module.services.paths)."""
+        shelf = cls.shelf(shelf_id) if shelf_id else None
+        if shelf is not None:
+            return build_path(shelf.warehouse_id, shelf.section_id, shelf_id)
+        section = cls.section(section_id) if section_id else None
+        if section is not None:
+            return build_path(section.warehouse_id, section_id)
+        return build_path(warehouse_id)
+
+    # --- maintenance -------------------------------------------------------------------------
+
+    @classmethod
+    def warm(cls, products=True):
+        """Bulk-load the location hierarchy and (optionally) every product, e.g. at worker startup."""
+        cls._locations_loaded_at = None
+        cls._ensure_locations()
+        if products:
+            cls._load_products(Product.objects.all())
+
+    @classmethod
+    def invalidate_product(cls, pk):
+        cls._products.pop(pk, None)
+
+    @classmethod
+    def invalidate_locations(cls):
+        cls._locations_loaded_at = None
+
+    @classmethod
+    def clear(cls):
+        cls._products.clear()
+        cls.invalidate_locations()
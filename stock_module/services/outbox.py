@@ -0,0 +1,122 @@
+# stock_module/services/outbox.py
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ..models import StockChangeEvent, StockFeedConsumer
+
+MAX_BATCH = 5000
+SEQUENCE_BATCH = 5000
+SEQUENCER_LOCK = 0x5354_4f43  # pg advisory lock key of the position sequencer
+
+
+@dataclass
+class FeedBatch:
+    events: list = field(default_factory=list)
+    cursor: int = 0           # last position covered; pass back as `after` to continue
+    has_more: bool = False
+
+
+class StockChangeFeed:
+    """
+    Transactional outbox for stock changes. Every batch of ledger entries appends one
+    StockChangeEvent per entry inside the writing transaction (see stock_module.signals), so
+    an event exists exactly when its stock change committed. Consumers read by position
+    cursor (an index range scan) and acknowledge after processing: delivery is at-least-once,
+    so consumers must tolerate seeing an event again after a crash.
+
+    Ids come from a sequence at insert time, so on PostgreSQL a long transaction can commit
+    ids below a cursor that was already handed out. The cursor is therefore the `position`,
+    stamped by sequence() under a lock on rows that are already committed: a row that
+    commits later gets a higher position, whatever its id. Residual limits: events become
+    readable only once a read (or the live watcher) has stamped them, so readers need write
+    access; the feed is in commit order, not id order; and the sequencer is serialized with
+    a PostgreSQL advisory lock (SQLite serializes writers anyway) - other backends would
+    need their own lock.
+    """
+
+    @staticmethod
+    def record(entries):
+        StockChangeEvent.objects.bulk_create([
+            StockChangeEvent(
+                stock_id=e.stock_id,
+                product_id=e.stock.product_id,
+                warehouse_id=e.stock.warehouse_id,
+                section_id=e.stock.section_id,
+                shelf_id=e.stock.shelf_id,
+                change=e.change,
+                new_quantity=e.new_quantity,
+                transaction_id=e.transaction_id,
+                ledger_id=e.pk,
+                created_at=e.created_at or timezone.now(),
+            ) for e in entries
+        ])
+
+    @staticmethod
+    def sequence(limit=SEQUENCE_BATCH):
+        """Stamp positions on committed, unstamped events in id order; returns the latest position."""
+        if not StockChangeEvent.objects.filter(position__isnull=True).exists():
+            return StockChangeFeed.latest_position()
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_xact_lock(%s)", [SEQUENCER_LOCK])
+            last = StockChangeEvent.objects.aggregate(p=Max('position'))['p'] or 0
+            pending = list(StockChangeEvent.objects.filter(position__isnull=True).order_by('pk').only('pk')[:limit])
+            for offset, event in enumerate(pending, start=1):
+                event.position = last + offset
+            StockChangeEvent.objects.bulk_update(pending, ['position'], batch_size=1000)
+        return last + len(pending)
+
+    @classmethod
+    def read(cls, after=0, limit=1000, warehouse=None, product=None):
+        """Events with position > after, oldest first."""
+        limit = max(1, min(int(limit), MAX_BATCH))
+        after = int(after)
+        cls.sequence()
+        qs = StockChangeEvent.objects.filter(position__gt=after)
+        if warehouse is not None:
+            qs = qs.filter(warehouse_id=getattr(warehouse, 'pk', warehouse))
+        if product is not None:
+            qs = qs.filter(product_id=getattr(product, 'pk', product))
+        events = list(qs.order_by('position')[:limit + 1])
+        batch = FeedBatch(events=events[:limit], has_more=len(events) > limit)
+        batch.cursor = batch.events[-1].position if batch.events else after
+        return batch
+
+    @staticmethod
+    def latest_position():
+        return StockChangeEvent.objects.aggregate(p=Max('position'))['p'] or 0
+
+    # --- named consumers -----------------------------------------------------------------------
+
+    @classmethod
+    def poll(cls, consumer, limit=1000):
+        """Next batch after the consumer's committed position; does not move the position."""
+        position = StockFeedConsumer.objects.filter(name=consumer).values_list('position', flat=True).first() or 0
+        return cls.read(after=position, limit=limit)
+
+    @staticmethod
+    @transaction.atomic
+    def ack(consumer, cursor):
+        """Commit the consumer's position (never moves it backwards)."""
+        row, _ = StockFeedConsumer.objects.select_for_update().get_or_create(name=consumer)
+        if cursor > row.position:
+            row.position = cursor
+            row.save(update_fields=['position', 'updated_at'])
+        return row.position
+
+    @staticmethod
+    def prune(older_than_days=30):
+        """Delete events older than the cutoff that every registered consumer has acknowledged."""
+        cutoff = timezone.now() - timedelta(days=older_than_days)
+        qs = StockChangeEvent.objects.filter(created_at__lt=cutoff)
+        slowest = StockFeedConsumer.objects.order_by('position').values_list('position', flat=True).first()
+        qs = qs.filter(position__isnull=False)
+        if slowest is not None:
+            qs = qs.filter(position__lte=slowest)
+        deleted, _ = qs.delete()
+        return deleted
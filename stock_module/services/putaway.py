@@ -0,0 +1,351 @@
+# stock_module/services/putaway.py
+from bisect import bisect_left, insort
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal, ROUND_DOWN
+
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from location_module.models import CapacityKind, Shelf
+from product_module.services.unit_converter import UnitConverter
+from ..models import Stock, StockLedger, ShelfOccupancy
+from .metadata_cache import MetadataCache
+
+ZERO = Decimal('0')
+QUANTITY_QUANT = Decimal('0.0001')
+
+
+class PutawayStrategy:
+    BEST_FIT = 'best_fit'    # tightest shelf that takes the whole quantity
+    COLOCATE = 'colocate'    # shelves already holding the product first, then best fit
+
+
+def unit_size(meta, kind):
+    """Capacity one base unit of a product takes on a shelf of this kind; None if the product has no such size."""
+    if kind == CapacityKind.SLOTS:
+        return Decimal('1')
+    size = meta.unit_volume if kind == CapacityKind.VOLUME else meta.unit_weight
+    return Decimal(size) if size else None
+
+
+# --- index maintenance ---------------------------------------------------------------------------
+
+def entry_shelf(entry):
+    """
+    Shelf a ledger entry moves goods on or off: the stock row's shelf, or for warehouse-level
+    stock the shelf named by its transaction (destination when adding, source when removing).
+    """
+    if entry.stock.shelf_id:
+        return entry.stock.shelf_id
+    tx = entry.transaction
+    if tx is None:
+        return None
+    return tx.destination_shelf_id if entry.change > 0 else tx.source_shelf_id
+
+
+def shelf_quantities(shelf_ids=None, product_ids=None, warehouse_ids=None):
+    """
+    {(shelf_id, warehouse_id, product_id): quantity} of goods on shelves: shelf-level Stock rows,
+    plus the shelf side of the ledger of warehouse-level stock (see entry_shelf). Three grouped
+    queries, restricted to the given shelves / products / warehouses.
+    """
+    stock_filter, ledger_filter = {}, {}
+    if product_ids is not None:
+        stock_filter['product_id__in'] = ledger_filter['stock__product_id__in'] = product_ids
+    if warehouse_ids is not None:
+        stock_filter['warehouse_id__in'] = ledger_filter['stock__warehouse_id__in'] = warehouse_ids
+    quantities = defaultdict(lambda: ZERO)
+    stock = Stock.objects.filter(shelf__isnull=False, **stock_filter)
+    if shelf_ids is not None:
+        stock = stock.filter(shelf_id__in=shelf_ids)
+    for shelf_id, warehouse_id, product_id, quantity in stock.values_list(
+            'shelf_id', 'warehouse_id', 'product_id').annotate(quantity=Sum('quantity')).order_by():
+        quantities[(shelf_id, warehouse_id, product_id)] += quantity
+    # warehouse-level stock: replay the shelf side of the ledger
+    ledger = StockLedger.objects.filter(stock__shelf__isnull=True, **ledger_filter)
+    for side, condition in (('destination', Q(change__gt=0)), ('source', Q(change__lt=0))):
+        side_filter = ({f'transaction__{side}_shelf_id__in': shelf_ids} if shelf_ids is not None
+                       else {f'transaction__{side}_shelf__isnull': False})
+        for shelf_id, warehouse_id, product_id, quantity in ledger.filter(condition, **side_filter).values_list(
+                f'transaction__{side}_shelf_id', 'stock__warehouse_id', 'stock__product_id').annotate(
+                quantity=Sum('change')).order_by():
+            quantities[(shelf_id, warehouse_id, product_id)] += quantity
+    return quantities
+
+
+class ShelfCapacityIndex:
+    """
+    Keeps ShelfOccupancy (capacity / used / free per shelf) in step with the stock on shelves.
+    Stock is booked per warehouse, so goods count on a shelf through the transactions that put
+    them there or took them off (see entry_shelf); shelf-level Stock rows count as well. An OUT
+    without a source shelf does not free shelf capacity.
+    """
+
+    @staticmethod
+    def _used_by_shelf(kinds):
+        quantities = shelf_quantities(shelf_ids=kinds.keys())
+        metas = MetadataCache.prefetch_products(product_id for _, _, product_id in quantities)
+        used = defaultdict(lambda: ZERO)
+        for (shelf_id, _, product_id), quantity in quantities.items():
+            size = unit_size(metas[product_id], kinds[shelf_id])
+            if size:
+                used[shelf_id] += quantity * size
+        return used
+
+    @classmethod
+    def _sync_chunk(cls, shelf_ids):
+        shelves = {pk: (warehouse_id, kind, capacity) for pk, warehouse_id, kind, capacity in
+                   Shelf.objects.filter(pk__in=shelf_ids).values_list(
+                       'pk', 'section__warehouse_id', 'capacity_kind', 'capacity')}
+        tracked = {pk: row for pk, row in shelves.items() if row[2] is not None}
+        ShelfOccupancy.objects.filter(shelf_id__in=shelf_ids).exclude(shelf_id__in=tracked.keys()).delete()
+        if not tracked:
+            return 0
+
+        existing = {o.shelf_id: o for o in
+                    ShelfOccupancy.objects.select_for_update().filter(shelf_id__in=tracked.keys()).order_by('pk')}
+        used = cls._used_by_shelf({pk: row[1] for pk, row in tracked.items()})
+        new, changed = [], []
+        for pk, (warehouse_id, kind, capacity) in tracked.items():
+            occupancy = existing.get(pk) or ShelfOccupancy(shelf_id=pk)
+            occupancy.warehouse_id, occupancy.capacity_kind, occupancy.capacity = warehouse_id, kind, capacity
+            occupancy.used = used.get(pk, ZERO)
+            occupancy.free = capacity - occupancy.used
+            (changed if occupancy.pk else new).append(occupancy)
+        ShelfOccupancy.objects.bulk_create(new, batch_size=2000)
+        ShelfOccupancy.objects.bulk_update(changed, ['warehouse_id', 'capacity_kind', 'capacity', 'used', 'free'],
+                                           batch_size=2000)
+        return len(tracked)
+
+    @classmethod
+    @transaction.atomic
+    def sync_shelves(cls, shelf_ids, chunk_size=2000):
+        """Recompute index rows for these shelves from their capacity and the stock on them."""
+        shelf_ids = list(shelf_ids)
+        return sum(cls._sync_chunk(shelf_ids[i:i + chunk_size]) for i in range(0, len(shelf_ids), chunk_size))
+
+    @classmethod
+    def rebuild(cls, warehouse=None):
+        shelves = Shelf.objects.order_by('pk')
+        if warehouse is not None:
+            shelves = shelves.filter(section__warehouse=warehouse)
+        return cls.sync_shelves(shelves.values_list('pk', flat=True))
+
+    @staticmethod
+    def record(entries):
+        """Apply a batch of ledger entries to the shelves they touch (inside the writing transaction)."""
+        changes = defaultdict(list)
+        for entry in entries:
+            shelf_id = entry_shelf(entry)
+            if shelf_id:
+                changes[shelf_id].append((entry.stock.product_id, entry.change))
+        if not changes:
+            return
+        rows = list(ShelfOccupancy.objects.select_for_update().filter(shelf_id__in=changes.keys()).order_by('pk'))
+        if not rows:
+            return
+        metas = MetadataCache.prefetch_products(pid for items in changes.values() for pid, _ in items)
+        for occupancy in rows:
+            for product_id, change in changes[occupancy.shelf_id]:
+                size = unit_size(metas[product_id], occupancy.capacity_kind)
+                if size:
+                    occupancy.used += change * size
+            occupancy.free = occupancy.capacity - occupancy.used
+        ShelfOccupancy.objects.bulk_update(rows, ['used', 'free'])
+
+
+# --- suggestions ---------------------------------------------------------------------------------
+
+class FreeCapacityIndex:
+    """In-memory (free, shelf_id) lists per capacity kind; best fit and reservations by bisection."""
+
+    def __init__(self, rows=()):
+        self._by_kind = defaultdict(list)
+        self._shelves = {}
+        for shelf_id, kind, free in rows:
+            self.add(shelf_id, kind, free)
+
+    def add(self, shelf_id, kind, free):
+        if shelf_id in self._shelves or free <= 0:
+            return
+        self._shelves[shelf_id] = (kind, free)
+        insort(self._by_kind[kind], (free, shelf_id))
+
+    def get(self, shelf_id):
+        return self._shelves.get(shelf_id)
+
+    def best_fit(self, kind, need):
+        """(free, shelf_id) of the tightest shelf with at least `need` free, or None."""
+        entries = self._by_kind.get(kind)
+        if not entries:
+            return None
+        i = bisect_left(entries, (need, 0))
+        return entries[i] if i < len(entries) else None
+
+    def largest(self, kind):
+        entries = self._by_kind.get(kind)
+        return entries[-1] if entries else None
+
+    def reserve(self, shelf_id, amount):
+        kind, free = self._shelves[shelf_id]
+        entries = self._by_kind[kind]
+        del entries[bisect_left(entries, (free, shelf_id))]
+        free -= amount
+        self._shelves[shelf_id] = (kind, free)
+        if free > 0:
+            insort(entries, (free, shelf_id))
+
+
+@dataclass
+class Placement:
+    shelf_id: int
+    quantity: Decimal
+
+
+@dataclass
+class PutawaySuggestion:
+    product_id: int
+    warehouse_id: int
+    quantity: Decimal  # in the product's base unit
+    placements: list = field(default_factory=list)
+    unplaced: Decimal = ZERO
+    segment_id: int = None
+
+
+class PutawayService:
+    """
+    Suggests shelves for incoming stock from the ShelfOccupancy index. A single suggestion
+    reads only the candidate rows it needs (index seeks on warehouse/kind/free); bulk
+    suggestions load a warehouse's free shelves once and reserve capacity in memory as
+    items are placed, so items of the same inbound never double-book a shelf.
+    """
+
+    SPLIT_CANDIDATES = 20
+
+    @staticmethod
+    def _place(meta, quantity, index, colocated, strategy):
+        sizes = {kind: unit_size(meta, kind) for kind in CapacityKind.values}
+        sizes = {kind: size for kind, size in sizes.items() if size}
+        placements, remaining = [], quantity
+
+        def take(shelf_id):
+            nonlocal remaining
+            kind, free = index.get(shelf_id)
+            qty = min(remaining, (free / sizes[kind]).quantize(QUANTITY_QUANT, rounding=ROUND_DOWN))
+            if qty <= 0:
+                return False
+            index.reserve(shelf_id, qty * sizes[kind])
+            placements.append(Placement(shelf_id, qty))
+            remaining -= qty
+            return True
+
+        if strategy == PutawayStrategy.COLOCATE:
+            own = [(index.get(pk)[1] / sizes[index.get(pk)[0]], pk) for pk in colocated
+                   if index.get(pk) and index.get(pk)[0] in sizes]
+            fitting = [c for c in own if c[0] >= remaining]
+            for _, shelf_id in ([min(fitting)] if fitting else sorted(own, reverse=True)):
+                if remaining <= 0:
+                    break
+                take(shelf_id)
+
+        if remaining > 0:
+            # tightest single shelf across capacity kinds
+            candidates = []
+            for kind, size in sizes.items():
+                hit = index.best_fit(kind, remaining * size)
+                if hit is not None:
+                    candidates.append((hit[0] / (remaining * size), hit[1]))
+            if candidates:
+                take(min(candidates)[1])
+
+        while remaining > 0:
+            # nothing takes it all: split over the largest free shelves
+            candidates = []
+            for kind, size in sizes.items():
+                hit = index.largest(kind)
+                if hit is not None:
+                    candidates.append((hit[0] / size, hit[1]))
+            if not candidates or not take(max(candidates)[1]):
+                break
+        return placements, remaining
+
+    @classmethod
+    def _plan(cls, items, index_for, colocated, strategy):
+        suggestions = []
+        for item in items:
+            meta = MetadataCache.product(item.product_id)
+            item.placements, item.unplaced = cls._place(
+                meta, item.quantity, index_for(item.warehouse_id),
+                colocated.get((item.warehouse_id, item.product_id), ()), strategy)
+            suggestions.append(item)
+        return suggestions
+
+    @staticmethod
+    def _colocated(product_ids, warehouse_ids):
+        """Shelves holding each (warehouse, product), from the same shelf quantities as the occupancy index."""
+        colocated = defaultdict(list)
+        for (shelf_id, warehouse_id, product_id), quantity in sorted(shelf_quantities(
+                product_ids=product_ids, warehouse_ids=warehouse_ids).items()):
+            if quantity > 0:
+                colocated[(warehouse_id, product_id)].append(shelf_id)
+        return colocated
+
+    @classmethod
+    def suggest(cls, product, quantity, warehouse, unit=None, strategy=PutawayStrategy.COLOCATE):
+        """Shelves for one incoming (product, quantity) in a warehouse; returns a PutawaySuggestion."""
+        meta = MetadataCache.product(getattr(product, 'pk', product))
+        quantity = UnitConverter.to_base(meta, quantity, unit)
+        warehouse_id = getattr(warehouse, 'pk', warehouse)
+
+        colocated = cls._colocated([meta.pk], [warehouse_id])
+        occupancy = ShelfOccupancy.objects.filter(warehouse_id=warehouse_id, free__gt=0)
+        fields = ('shelf_id', 'capacity_kind', 'free')
+        rows = set(occupancy.filter(shelf_id__in=colocated.get((warehouse_id, meta.pk), ())).values_list(*fields))
+        for kind in CapacityKind.values:
+            size = unit_size(meta, kind)
+            if not size:
+                continue
+            of_kind = occupancy.filter(capacity_kind=kind)
+            rows.update(of_kind.filter(free__gte=quantity * size).order_by('free', 'shelf_id')
+                        .values_list(*fields)[:1])
+            rows.update(of_kind.order_by('-free', 'shelf_id').values_list(*fields)[:cls.SPLIT_CANDIDATES])
+
+        index = FreeCapacityIndex(rows)
+        item = PutawaySuggestion(product_id=meta.pk, warehouse_id=warehouse_id, quantity=quantity)
+        return cls._plan([item], lambda _: index, colocated, strategy)[0]
+
+    @classmethod
+    def suggest_many(cls, items, strategy=PutawayStrategy.COLOCATE):
+        """
+        items: PutawaySuggestion-s (product_id, warehouse_id, quantity in base unit) to place together.
+        Loads each warehouse's free shelves with one query and plans in memory.
+        """
+        items = list(items)
+        warehouse_ids = {item.warehouse_id for item in items}
+        MetadataCache.prefetch_products(item.product_id for item in items)
+        rows = defaultdict(list)
+        for warehouse_id, shelf_id, kind, free in ShelfOccupancy.objects.filter(
+                warehouse_id__in=warehouse_ids, free__gt=0).values_list('warehouse_id', 'shelf_id',
+                                                                        'capacity_kind', 'free'):
+            rows[warehouse_id].append((shelf_id, kind, free))
+        indexes = {warehouse_id: FreeCapacityIndex(rows[warehouse_id]) for warehouse_id in warehouse_ids}
+        colocated = cls._colocated({item.product_id for item in items}, warehouse_ids)
+        return cls._plan(items, indexes.__getitem__, colocated, strategy)
+
+    @classmethod
+    def suggest_movement(cls, movement, strategy=PutawayStrategy.COLOCATE):
+        """Suggestions for every unprocessed inbound segment of a ProductMovement (IN or TRANSFER)."""
+        if movement.movement_type not in ('IN', 'TRANSFER'):
+            raise ValueError("Putaway suggestions only apply to inbound or transfer movements.")
+        segments = list(movement.segments.filter(processed=False).order_by('sequence'))
+        metas = MetadataCache.prefetch_products(seg.product_id for seg in segments)
+        quantities = UnitConverter.bulk_to_base((metas[seg.product_id], seg.quantity, seg.unit) for seg in segments)
+        items = []
+        for seg, quantity in zip(segments, quantities):
+            warehouse_id = seg.to_warehouse_id or movement.destination_warehouse_id
+            if warehouse_id is None:
+                raise ValueError(f"Segment {seg.pk} has no destination warehouse.")
+            items.append(PutawaySuggestion(product_id=seg.product_id, warehouse_id=warehouse_id,
+                                           quantity=quantity, segment_id=seg.pk))
+        return cls.suggest_many(items, strategy)
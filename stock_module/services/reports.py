@@ -0,0 +1,136 @@
+# stock_module/services/reports.py
+import csv
+import json
+from decimal import Decimal
+
+from django.db.models import Sum
+
+from location_module.models import Warehouse
+from ..models import Stock
+
+SUBTOTAL_FIELDS = {
+    'category': 'product__category__name',
+    'brand': 'product__brand__name',
+}
+PRODUCT_COLUMNS = ['product_id', 'sku', 'product', 'category', 'brand']
+
+
+class StockOnHandReport:
+    """
+    Product x warehouse quantity matrix from one grouped aggregate over Stock (no model
+    instances, no per-row product / warehouse lookups). Rows arrive ordered by product, so each
+    product's line is emitted as soon as the next product starts: the query is read through
+    a server-side cursor (iterator) and memory stays constant in the catalog size — only the
+    warehouse columns and the running subtotals are held.
+    """
+
+    def __init__(self, warehouses=None, subtotals=None, skip_zero=False, chunk_size=2000):
+        if subtotals not in (None, *SUBTOTAL_FIELDS):
+            raise ValueError(f"Invalid subtotals: {subtotals} (use one of {', '.join(SUBTOTAL_FIELDS)})")
+        qs = Warehouse.objects.order_by('pk')
+        if warehouses:
+            qs = qs.filter(pk__in=[getattr(w, 'pk', w) for w in warehouses])
+        self.warehouses = list(qs.values_list('pk', 'name'))
+        self.filtered = bool(warehouses)
+        self.subtotals = subtotals
+        self.skip_zero = skip_zero
+        self.chunk_size = chunk_size
+
+    @property
+    def header(self):
+        return PRODUCT_COLUMNS + [name for _, name in self.warehouses] + ['total']
+
+    def _cells(self):
+        group = SUBTOTAL_FIELDS.get(self.subtotals)
+        qs = Stock.objects.all()
+        if self.filtered:
+            qs = qs.filter(warehouse_id__in=[pk for pk, _ in self.warehouses])
+        return (qs.values_list('product_id', 'product__sku', 'product__name', 'product__category__name',
+                               'product__brand__name', 'warehouse_id')
+                .annotate(quantity=Sum('quantity'))
+                .order_by(*([group] if group else []), 'product_id', 'warehouse_id')
+                .iterator(self.chunk_size))
+
+    def rows(self):
+        """
+        Yields ('product', [product columns...], [qty per warehouse], total), then — when
+        subtotals are on — ('subtotal', group name, [...], total) after each group, and finally
+        ('total', None, [...], total).
+        """
+        column = {pk: i for i, (pk, _) in enumerate(self.warehouses)}
+        width = len(self.warehouses)
+        group_index = {'category': 3, 'brand': 4}.get(self.subtotals)
+        grand = [Decimal(0)] * width
+        sub, current_group = None, None
+        info, line = None, None
+
+        def product_line():
+            total = sum(line)
+            if self.skip_zero and not total:
+                return None
+            return 'product', list(info), line, total
+
+        for cell in self._cells():
+            product_id, warehouse_id, quantity = cell[0], cell[5], cell[6] or Decimal(0)
+            if info is None or info[0] != product_id:
+                if info is not None:
+                    out = product_line()
+                    if out:
+                        yield out
+                if group_index is not None and (sub is None or cell[group_index] != current_group):
+                    if sub is not None:
+                        yield 'subtotal', current_group, sub, sum(sub)
+                    sub, current_group = [Decimal(0)] * width, cell[group_index]
+                info, line = cell[:5], [Decimal(0)] * width
+            i = column[warehouse_id]
+            line[i] += quantity
+            grand[i] += quantity
+            if sub is not None:
+                sub[i] += quantity
+
+        if info is not None:
+            out = product_line()
+            if out:
+                yield out
+        if sub is not None:
+            yield 'subtotal', current_group, sub, sum(sub)
+        yield 'total', None, grand, sum(grand)
+
+    # --- writers ---------------------------------------------------------------------------
+
+    def write_csv(self, fp):
+        writer = csv.writer(fp)
+        writer.writerow(self.header)
+        count = 0
+        for kind, key, quantities, total in self.rows():
+            if kind == 'product':
+                head = key
+                count += 1
+            elif kind == 'subtotal':
+                head = ['', '', f"Subtotal: {key}", '', '']
+            else:
+                head = ['', '', 'Total', '', '']
+            writer.writerow(head + quantities + [total])
+        return count
+
+    def write_jsonl(self, fp):
+        names = [name for _, name in self.warehouses]
+        count = 0
+        for kind, key, quantities, total in self.rows():
+            record = {'type': kind}
+            if kind == 'product':
+                record.update(zip(PRODUCT_COLUMNS, key))
+                count += 1
+            elif kind == 'subtotal':
+                record[self.subtotals] = key
+            record['warehouses'] = {name: str(qty) for name, qty in zip(names, quantities)}
+            record['total'] = str(total)
+            fp.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return count
+
+    def write(self, fp, fmt='csv'):
+        if fmt == 'csv':
+            return self.write_csv(fp)
+        if fmt == 'jsonl':
+            return self.write_jsonl(fp)
+        raise ValueError(f"Unsupported format: {fmt}")
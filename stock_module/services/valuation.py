@@ -0,0 +1,355 @@
+# stock_module/services/valuation.py
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q, Sum
+
+from product_module.models import Product
+from ..models import (Stock, StockLedger, StockValuation, CostLayer, ValuationEntry, ValuationKind,
+                      ValuationMethod)
+
+VALUE_QUANT = Decimal('0.0001')
+COST_QUANT = Decimal('0.000001')
+ZERO = Decimal('0')
+# issues, net of the reversals that bring issued goods back
+CONSUMPTION = Q(kind=ValuationKind.ISSUE) | Q(kind=ValuationKind.REVERSAL, quantity__gt=0)
+
+
+def _out_leg_id(tx):
+    """Transaction holding the transfer-out cost of a transfer-in: the paired OUT leg, or the TRANSFER itself."""
+    return tx.out_leg_id or tx.pk
+
+
+def _classify(entry):
+    tx = entry.transaction
+    reverses = tx is not None and tx.reverses_id is not None
+    if entry.change > 0:
+        if tx is not None and (tx.transaction_type == 'TRANSFER' or tx.source_warehouse_id):
+            return ValuationKind.TRANSFER_IN
+        return ValuationKind.REVERSAL if reverses else ValuationKind.RECEIPT
+    if tx is not None and (tx.transaction_type == 'TRANSFER' or tx.destination_warehouse_id):
+        return ValuationKind.TRANSFER_OUT
+    return ValuationKind.REVERSAL if reverses else ValuationKind.ISSUE
+
+
+class ValuationEngine:
+    """
+    Incremental inventory valuation per stock row (product, warehouse).
+
+    Every batch of StockLedger entries is valued as it is written (see stock_module.signals):
+    receipts add value at the transaction's unit_cost (fallback: product.price) plus landed
+    cost per unit; issues remove value at the running average (AVG) or by consuming the
+    oldest CostLayers (FIFO). Transfers carry the cost of the outgoing leg to the receiving
+    warehouse (the same TRANSFER transaction, or the IN leg's out_leg for movement transfers).
+    A transaction that reverses another (borrow return, movement reversal) is a REVERSAL: it
+    undoes the original at the original's cost (an issue comes back at its issue cost, a
+    receipt leaves at its receipt cost, from its own FIFO layer first).
+    The method comes from settings.INVENTORY_VALUATION_METHOD (default AVG).
+    """
+
+    @staticmethod
+    def method():
+        return getattr(settings, 'INVENTORY_VALUATION_METHOD', ValuationMethod.AVG)
+
+    # --- incremental update ------------------------------------------------------------------
+
+    @staticmethod
+    def _lock_valuations(stocks):
+        valuations = {v.stock_id: v for v in StockValuation.objects.select_for_update()
+                      .filter(stock_id__in=stocks.keys()).order_by('pk')}
+        missing = [StockValuation(stock_id=pk, product_id=s.product_id, warehouse_id=s.warehouse_id)
+                   for pk, s in stocks.items() if pk not in valuations]
+        if missing:
+            StockValuation.objects.bulk_create(missing)
+            valuations.update({v.stock_id: v for v in missing})
+        return valuations
+
+    @staticmethod
+    def _open_layers(stock_ids):
+        layers = defaultdict(deque)
+        for layer in CostLayer.objects.select_for_update().filter(
+                stock_id__in=stock_ids, remaining_quantity__gt=0).order_by('id'):
+            layers[layer.stock_id].append(layer)
+        return layers
+
+    @classmethod
+    def _receipt_costs(cls, receipts, by_stock_product):
+        """Unit cost before landed cost for each receipt / transfer-in entry."""
+        costs = {}
+        reversed_ids = {e.transaction.reverses_id for e, kind in receipts if kind == ValuationKind.REVERSAL}
+        issue_costs = dict(ValuationEntry.objects.filter(
+            ledger__transaction_id__in=reversed_ids, kind=ValuationKind.ISSUE,
+        ).values_list('ledger__transaction_id', 'unit_cost')) if reversed_ids else {}
+        transfer_ins = [e for e, kind in receipts if kind == ValuationKind.TRANSFER_IN]
+        out_costs = dict(ValuationEntry.objects.filter(
+            ledger__transaction_id__in={_out_leg_id(e.transaction) for e in transfer_ins},
+            kind=ValuationKind.TRANSFER_OUT,
+        ).values_list('ledger__transaction_id', 'unit_cost')) if transfer_ins else {}
+        source_avg = {}
+        if transfer_ins:
+            for product_id, warehouse_id, avg in StockValuation.objects.filter(
+                    product_id__in={by_stock_product[e.stock_id] for e in transfer_ins},
+                    warehouse_id__in={e.transaction.source_warehouse_id for e in transfer_ins},
+            ).values_list('product_id', 'warehouse_id', 'avg_cost'):
+                source_avg[(product_id, warehouse_id)] = avg
+        prices = None
+        for entry, kind in receipts:
+            tx = entry.transaction
+            cost = tx.unit_cost if tx is not None else None
+            if cost is None and kind == ValuationKind.REVERSAL:
+                # e.g. a borrow return comes back at the cost it went out with
+                cost = issue_costs.get(tx.reverses_id)
+            if cost is None and kind == ValuationKind.TRANSFER_IN:
+                cost = out_costs.get(_out_leg_id(tx))
+                if cost is None:
+                    cost = source_avg.get((by_stock_product[entry.stock_id], tx.source_warehouse_id))
+            if cost is None:
+                if prices is None:
+                    prices = dict(Product.objects.filter(
+                        pk__in=set(by_stock_product.values())).values_list('pk', 'price'))
+                cost = prices.get(by_stock_product[entry.stock_id]) or ZERO
+            costs[entry.pk] = Decimal(cost)
+        return costs
+
+    @staticmethod
+    def _reversed_receipts(entries, kinds):
+        """(ledger id, unit cost) of the receipt each outgoing REVERSAL undoes, by receipt transaction."""
+        ids = {e.transaction.reverses_id for e in entries if e.change < 0 and kinds[e.pk] == ValuationKind.REVERSAL}
+        if not ids:
+            return {}
+        return {tx_id: (ledger_id, cost) for tx_id, ledger_id, cost in ValuationEntry.objects.filter(
+            ledger__transaction_id__in=ids, kind=ValuationKind.RECEIPT,
+        ).values_list('ledger__transaction_id', 'ledger_id', 'unit_cost')}
+
+    @classmethod
+    def record(cls, entries):
+        """Value a batch of freshly written ledger entries; call inside the writing transaction."""
+        entries = sorted(entries, key=lambda e: e.pk)
+        if not entries:
+            return []
+        fifo = cls.method() == ValuationMethod.FIFO
+        stocks = {e.stock_id: e.stock for e in entries}
+        by_stock_product = {pk: s.product_id for pk, s in stocks.items()}
+
+        valuations = cls._lock_valuations(stocks)
+        layers = cls._open_layers(stocks.keys()) if fifo else {}
+        kinds = {e.pk: _classify(e) for e in entries}
+        receipt_costs = cls._receipt_costs(
+            [(e, kinds[e.pk]) for e in entries if e.change > 0], by_stock_product)
+        received = cls._reversed_receipts(entries, kinds)
+
+        value_entries, new_layers, touched_layers = [], [], {}
+        out_costs = {}     # transfer-out / issue unit cost per transaction, for legs later in this batch
+        issue_costs = {}
+        for entry in entries:
+            val = valuations[entry.stock_id]
+            kind = kinds[entry.pk]
+            tx = entry.transaction
+            if entry.change > 0:
+                qty = entry.change
+                unit_cost = receipt_costs[entry.pk]
+                if kind == ValuationKind.TRANSFER_IN and tx.unit_cost is None and _out_leg_id(tx) in out_costs:
+                    unit_cost = out_costs[_out_leg_id(tx)]
+                if kind == ValuationKind.REVERSAL and tx.unit_cost is None and tx.reverses_id in issue_costs:
+                    unit_cost = issue_costs[tx.reverses_id]
+                if tx is not None and tx.landed_cost:
+                    unit_cost += Decimal(tx.landed_cost) / qty
+                unit_cost = unit_cost.quantize(COST_QUANT)
+                value = (qty * unit_cost).quantize(VALUE_QUANT)
+                if kind == ValuationKind.RECEIPT and tx is not None:
+                    received[tx.pk] = (entry.pk, unit_cost)
+                if fifo:
+                    layer = CostLayer(stock_id=entry.stock_id, ledger=entry, unit_cost=unit_cost,
+                                      original_quantity=qty, remaining_quantity=qty, created_at=entry.created_at)
+                    layers[entry.stock_id].append(layer)
+                    new_layers.append(layer)
+            else:
+                qty = -entry.change
+                value = ZERO
+                remaining = qty
+                if kind == ValuationKind.REVERSAL and tx.reverses_id in received:
+                    # a reversed receipt leaves at its receipt cost: its own layer first (FIFO), all of it (AVG)
+                    ledger_id, cost = received[tx.reverses_id]
+                    take = remaining
+                    if fifo:
+                        layer = next((l for l in layers[entry.stock_id] if l.ledger_id == ledger_id), None)
+                        take = min(remaining, layer.remaining_quantity) if layer is not None else ZERO
+                        if take:
+                            layer.remaining_quantity -= take
+                            if layer.pk:
+                                touched_layers[layer.pk] = layer
+                            if layer.remaining_quantity <= 0:
+                                layers[entry.stock_id].remove(layer)
+                    value += take * cost
+                    remaining -= take
+                if fifo:
+                    open_layers = layers[entry.stock_id]
+                    while remaining > 0 and open_layers:
+                        layer = open_layers[0]
+                        take = min(remaining, layer.remaining_quantity)
+                        value += take * layer.unit_cost
+                        layer.remaining_quantity -= take
+                        remaining -= take
+                        if layer.pk:
+                            touched_layers[layer.pk] = layer
+                        if layer.remaining_quantity <= 0:
+                            open_layers.popleft()
+                # AVG, or stock that predates the FIFO layers
+                value += remaining * val.avg_cost
+                value = value.quantize(VALUE_QUANT)
+                unit_cost = (value / qty).quantize(COST_QUANT) if qty else val.avg_cost
+                if kind == ValuationKind.TRANSFER_OUT and tx is not None:
+                    out_costs[tx.pk] = unit_cost
+                elif kind == ValuationKind.ISSUE and tx is not None:
+                    issue_costs[tx.pk] = unit_cost
+                value = -value
+
+            val.quantity += entry.change
+            val.total_value += value
+            if val.quantity <= 0:
+                val.total_value = ZERO
+            else:
+                val.avg_cost = (val.total_value / val.quantity).quantize(COST_QUANT)
+            val.last_ledger_id = entry.pk
+
+            value_entries.append(ValuationEntry(
+                ledger=entry, stock_id=entry.stock_id, product_id=by_stock_product[entry.stock_id],
+                warehouse_id=stocks[entry.stock_id].warehouse_id, kind=kind, quantity=entry.change,
+                value=value, unit_cost=unit_cost, created_at=entry.created_at,
+            ))
+
+        StockValuation.objects.bulk_update(
+            valuations.values(), ['quantity', 'total_value', 'avg_cost', 'last_ledger_id'])
+        if new_layers:
+            CostLayer.objects.bulk_create(new_layers)
+        if touched_layers:
+            CostLayer.objects.bulk_update(touched_layers.values(), ['remaining_quantity'])
+        ValuationEntry.objects.bulk_create(value_entries)
+        return value_entries
+
+    # --- reads -------------------------------------------------------------------------------
+
+    @staticmethod
+    def inventory_value(warehouse=None, product=None):
+        """Current total inventory value from the precomputed StockValuation rows."""
+        qs = StockValuation.objects.all()
+        if warehouse is not None:
+            qs = qs.filter(warehouse=warehouse)
+        if product is not None:
+            qs = qs.filter(product=product)
+        return qs.aggregate(v=Sum('total_value'))['v'] or ZERO
+
+    @staticmethod
+    def inventory_value_at(when, warehouse=None, product=None):
+        """Inventory value as of a point in time (sum of value movements up to it)."""
+        qs = ValuationEntry.objects.filter(created_at__lte=when)
+        if warehouse is not None:
+            qs = qs.filter(warehouse=warehouse)
+        if product is not None:
+            qs = qs.filter(product=product)
+        return qs.aggregate(v=Sum('value'))['v'] or ZERO
+
+    @staticmethod
+    def cogs(start, end, warehouse=None, product=None):
+        """Cost of goods issued (OUT transactions, transfers excluded, net of reversed issues) in [start, end)."""
+        qs = ValuationEntry.objects.filter(CONSUMPTION, created_at__gte=start, created_at__lt=end)
+        if warehouse is not None:
+            qs = qs.filter(warehouse=warehouse)
+        if product is not None:
+            qs = qs.filter(product=product)
+        return -(qs.aggregate(v=Sum('value'))['v'] or ZERO)
+
+    # --- rebuild -----------------------------------------------------------------------------
+
+    @staticmethod
+    def rebuild_ledger_quantities(product_ids, batch_size=2000):
+        """
+        Recompute prev_quantity / new_quantity of the products' ledger rows. Each stock row's
+        history is walked newest first from its current quantity, so rows written before the
+        after-update fix (shifted by one change) and opening stock without a ledger row both
+        come out right. Returns the number of rows corrected.
+        """
+        with transaction.atomic():
+            stocks = dict(Stock.objects.select_for_update().filter(product_id__in=product_ids)
+                          .order_by('pk').values_list('pk', 'quantity'))
+            ledger = (StockLedger.objects.filter(stock_id__in=stocks.keys())
+                      .only('pk', 'stock_id', 'change', 'prev_quantity', 'new_quantity')
+                      .order_by('stock_id', '-pk'))
+            running, changed, total = {}, [], 0
+            for entry in ledger.iterator(chunk_size=batch_size):
+                new = running.get(entry.stock_id, stocks[entry.stock_id])
+                prev = new - entry.change
+                running[entry.stock_id] = prev
+                if (entry.prev_quantity, entry.new_quantity) != (prev, new):
+                    entry.prev_quantity, entry.new_quantity = prev, new
+                    changed.append(entry)
+                if len(changed) >= batch_size:
+                    StockLedger.objects.bulk_update(changed, ['prev_quantity', 'new_quantity'])
+                    total += len(changed)
+                    changed = []
+            if changed:
+                StockLedger.objects.bulk_update(changed, ['prev_quantity', 'new_quantity'])
+                total += len(changed)
+        return total
+
+    @classmethod
+    def rebuild_products(cls, product_ids, batch_size=2000):
+        """Drop and replay valuation for the given products from their full ledger history."""
+        with transaction.atomic():
+            stock_ids = Stock.objects.filter(product_id__in=product_ids).values('pk')
+            ValuationEntry.objects.filter(stock_id__in=stock_ids).delete()
+            CostLayer.objects.filter(stock_id__in=stock_ids).delete()
+            StockValuation.objects.filter(stock_id__in=stock_ids).delete()
+
+            ledger = (StockLedger.objects.filter(stock__product_id__in=product_ids)
+                      .select_related('stock', 'transaction').order_by('pk'))
+            batch, total = [], 0
+            for entry in ledger.iterator(chunk_size=batch_size):
+                batch.append(entry)
+                if len(batch) >= batch_size:
+                    cls.record(batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                cls.record(batch)
+                total += len(batch)
+        return total
+
+    @classmethod
+    def rebuild(cls, workers=1, chunk_size=500, ledger=False):
+        """
+        Rebuild all valuation rows; products are independent, so chunks run in parallel workers.
+        With ledger=True the ledger's prev/new quantities are recomputed first. Returns
+        (ledger entries replayed, ledger rows corrected).
+        """
+        product_ids = list(Stock.objects.order_by('product_id').values_list('product_id', flat=True).distinct())
+        chunks = [(product_ids[i:i + chunk_size], ledger) for i in range(0, len(product_ids), chunk_size)]
+        if workers <= 1 or len(chunks) <= 1:
+            results = [_replay(chunk) for chunk in chunks]
+        else:
+            # children must open their own connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                results = list(pool.map(_rebuild_chunk, chunks))
+        return sum(r[0] for r in results), sum(r[1] for r in results)
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _replay(chunk):
+    product_ids, ledger = chunk
+    corrected = ValuationEngine.rebuild_ledger_quantities(product_ids) if ledger else 0
+    return ValuationEngine.rebuild_products(product_ids), corrected
+
+
+def _rebuild_chunk(chunk):
+    try:
+        return _replay(chunk)
+    finally:
+        connections.close_all()
@@ -0,0 +1,74 @@
+# stock_module/signals.py
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver, Signal
+
+from product_module.models import Product
+from location_module.models import Warehouse, Section, Shelf
+from .models import Stock, StockThreshold
+from .services.alerts import StockAlertEngine
+from .services.metadata_cache import MetadataCache
+from .services.outbox import StockChangeFeed
+from .services.putaway import ShelfCapacityIndex
+from .services.valuation import ValuationEngine
+
+# Sent by the stock strategies right after StockLedger rows are written, inside the same
+# database transaction: ledger_recorded.send(sender=..., entries=[StockLedger, ...]).
+ledger_recorded = Signal()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_metadata(sender, instance, **kwargs):
+    MetadataCache.invalidate_product(instance.pk)
+
+
+@receiver(post_save, sender=Warehouse)
+@receiver(post_delete, sender=Warehouse)
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+@receiver(post_save, sender=Shelf)
+@receiver(post_delete, sender=Shelf)
+def invalidate_location_metadata(sender, instance, **kwargs):
+    MetadataCache.invalidate_locations()
+
+
+@receiver(ledger_recorded)
+def value_ledger_entries(sender, entries, **kwargs):
+    ValuationEngine.record(entries)
+
+
+@receiver(ledger_recorded)
+def publish_stock_changes(sender, entries, **kwargs):
+    StockChangeFeed.record(entries)
+
+
+@receiver(ledger_recorded)
+def track_shelf_occupancy(sender, entries, **kwargs):
+    ShelfCapacityIndex.record(entries)
+
+
+@receiver(ledger_recorded)
+def check_stock_thresholds(sender, entries, **kwargs):
+    StockAlertEngine.record(entries)
+
+
+@receiver(post_save, sender=StockThreshold)
+def evaluate_stock_threshold(sender, instance, **kwargs):
+    StockAlertEngine.evaluate([instance])
+
+
+@receiver(pre_delete, sender=StockThreshold)
+def close_stock_threshold(sender, instance, **kwargs):
+    StockAlertEngine.close([instance])
+
+
+@receiver(post_save, sender=Shelf)
+def sync_shelf_capacity(sender, instance, **kwargs):
+    ShelfCapacityIndex.sync_shelves([instance.pk])
+
+
+@receiver(post_save, sender=Stock)
+def sync_shelf_stock(sender, instance, update_fields=None, **kwargs):
+    # quantity-only saves come with a ledger entry and are counted by track_shelf_occupancy
+    if instance.shelf_id and update_fields is None:
+        ShelfCapacityIndex.sync_shelves([instance.shelf_id])
@@ -1,3 +1,525 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.contrib import admin
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory_transaction_module.models import InventoryTransaction
+from inventory_transaction_module.services.stock_updater import StockUpdater
+from location_module.models import CapacityKind, Section, Shelf, Warehouse
+from movement_module.models import MovementSegment, MovementStatus, ProductMovement
+from movement_module.services.processor import MovementProcessor
+from product_module.models import Brand, Category, Product
+from user_module.models import User
+from .models import (AlertKind, DemandForecast, ForecastMethod, ShelfOccupancy, Stock, StockAlert, StockAnalytics,
+                     StockChangeEvent, StockLedger, StockThreshold, ValuationEntry)
+from .services.analytics import InventoryAnalytics
+from .services.forecasting import DemandForecaster, ForecastParams
+from .services.metadata_cache import MetadataCache
+from .services.outbox import StockChangeFeed
+from .services.putaway import PutawayService, PutawayStrategy, ShelfCapacityIndex
+from .services.reports import StockOnHandReport
+from .services.timeseries import StockBalanceSeries
+from .services.valuation import ValuationEngine
+
+
+class StockTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Drill', category=Category.objects.create(name='Tools'),
+                                             brand=Brand.objects.create(name='Acme'), base_unit='pcs', price=10)
+        cls.warehouse = Warehouse.objects.create(name='Main')
+
+    def record(self, key, transaction_type='IN', quantity=1, **fields):
+        side = 'destination_warehouse' if transaction_type == 'IN' else 'source_warehouse'
+        fields.setdefault(side, self.warehouse)
+        tx, _ = InventoryTransaction.objects.record(key, transaction_type=transaction_type, product=self.product,
+                                                    quantity=quantity, unit='pcs', **fields)
+        return tx
+
+    def on_hand(self):
+        return Stock.objects.get(product=self.product, warehouse=self.warehouse).quantity
+
+
+class LedgerRebuildTests(StockTestCase):
+    def test_rebuild_recomputes_shifted_ledger_quantities(self):
+        self.record('in-1', quantity=5)
+        self.record('out-1', 'OUT', quantity=2)
+        self.record('in-2', quantity=4)
+        expected = list(StockLedger.objects.order_by('pk').values_list('prev_quantity', 'new_quantity'))
+        self.assertEqual(expected, [(0, 5), (5, 3), (3, 7)])
+        # rows as the old code wrote them: both quantities one change ahead
+        for entry in StockLedger.objects.all():
+            StockLedger.objects.filter(pk=entry.pk).update(prev_quantity=entry.new_quantity,
+                                                            new_quantity=entry.new_quantity + entry.change)
+
+        total, corrected = ValuationEngine.rebuild(ledger=True)
+
+        self.assertEqual((total, corrected), (3, 3))
+        self.assertEqual(list(StockLedger.objects.order_by('pk').values_list('prev_quantity', 'new_quantity')),
+                         expected)
+        self.assertEqual(ValuationEngine.rebuild_ledger_quantities([self.product.pk]), 0)
+
+
+class ShelfOccupancyTests(StockTestCase):
+    def test_transactions_to_and_from_a_shelf_change_its_occupancy(self):
+        shelf = Shelf.objects.create(section=Section.objects.create(warehouse=self.warehouse, name='A'), name='1',
+                                     capacity_kind=CapacityKind.SLOTS, capacity=10)
+        occupancy = lambda: ShelfOccupancy.objects.values_list('used', 'free').get(shelf=shelf)
+        self.assertEqual(occupancy(), (0, 10))
+
+        self.record('in-1', quantity=3, destination_shelf=shelf)
+        self.assertEqual(occupancy(), (3, 7))
+        self.record('out-1', 'OUT', quantity=1, source_shelf=shelf)
+        self.record('out-2', 'OUT', quantity=1)   # not taken from a shelf
+        self.assertEqual(occupancy(), (2, 8))
+
+        ShelfOccupancy.objects.filter(shelf=shelf).update(used=0, free=10)
+        ShelfCapacityIndex.rebuild()
+        self.assertEqual(occupancy(), (2, 8))
+
+    def test_colocate_prefers_the_shelf_already_holding_the_product(self):
+        section = Section.objects.create(warehouse=self.warehouse, name='A')
+        holding, tight = (Shelf.objects.create(section=section, name=name, capacity_kind=CapacityKind.SLOTS,
+                                               capacity=capacity) for name, capacity in (('1', 10), ('2', 5)))
+        self.record('in-1', quantity=3, destination_shelf=holding)
+
+        best_fit = PutawayService.suggest(self.product, 2, self.warehouse, strategy=PutawayStrategy.BEST_FIT)
+        colocated = PutawayService.suggest(self.product, 2, self.warehouse, strategy=PutawayStrategy.COLOCATE)
+
+        self.assertEqual([p.shelf_id for p in best_fit.placements], [tight.pk])
+        self.assertEqual([p.shelf_id for p in colocated.placements], [holding.pk])
+
+
+class LedgerAdminKeysetTests(StockTestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='x'))
+        model_admin = admin.site._registry[StockLedger]
+        self.addCleanup(setattr, model_admin, 'list_per_page', model_admin.list_per_page)
+        model_admin.list_per_page = 2
+
+    def test_older_link_continues_below_the_last_id_shown(self):
+        for n in range(3):
+            self.record(f'in-{n}')
+        oldest, middle, newest = StockLedger.objects.order_by('pk').values_list('pk', flat=True)
+        url = reverse('admin:stock_module_stockledger_changelist')
+
+        response = self.client.get(url)
+        self.assertEqual([e.pk for e in response.context['cl'].result_list], [newest, middle])
+        self.assertEqual(response.context['keyset_next'], f'?after={middle}')
+
+        response = self.client.get(url + response.context['keyset_next'])
+        self.assertEqual([e.pk for e in response.context['cl'].result_list], [oldest])
+        self.assertEqual(response.context['keyset_after'], middle)
+        self.assertNotIn('keyset_next', response.context)
+        self.assertContains(response, f'older than #{middle}')
+
+    def test_no_keyset_link_with_a_custom_ordering(self):
+        for n in range(3):
+            self.record(f'in-{n}')
+        response = self.client.get(reverse('admin:stock_module_stockledger_changelist'), {'o': '4'})
+        self.assertNotIn('keyset_next', response.context)
+
+
+@override_settings(INVENTORY_LIVE_POLL_SECONDS=0.02)
+class LivePollTests(StockTestCase):
+    def setUp(self):
+        self.async_client.force_login(User.objects.create(username='display'))
+
+    async def poll(self, **params):
+        response = await self.async_client.get(reverse('stock:live'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    async def record_later(self, key, delay=0.1, **fields):
+        await asyncio.sleep(delay)
+        await sync_to_async(self.record)(key, **fields)
+
+    async def test_waiting_client_wakes_on_a_change(self):
+        cursor = (await self.poll())['cursor']
+        loop = asyncio.get_running_loop()
+        writer = asyncio.create_task(self.record_later('in-1', quantity=2))
+        started = loop.time()
+
+        data = await self.poll(after=cursor, wait=5)
+        await writer
+
+        self.assertLess(loop.time() - started, 4)
+        self.assertEqual([(c['product'], c['change']) for c in data['changes']], [(self.product.pk, '2.0000')])
+        self.assertEqual(data['cursor'], data['changes'][-1]['position'])
+
+    async def test_filtered_client_sleeps_through_other_changes(self):
+        cursor = (await self.poll())['cursor']
+        writer = asyncio.create_task(self.record_later('in-1', delay=0.05))
+
+        data = await self.poll(after=cursor, wait=0.4, product=self.product.pk + 1)
+        await writer
+
+        self.assertEqual(data['changes'], [])
+        self.assertGreater(data['cursor'], cursor)
+
+    async def test_only_the_matching_filtered_client_is_woken(self):
+        cursor = (await self.poll())['cursor']
+        writer = asyncio.create_task(self.record_later('in-1', delay=0.05, quantity=3))
+
+        matching, other = await asyncio.gather(self.poll(after=cursor, wait=5, product=self.product.pk),
+                                               self.poll(after=cursor, wait=0.4, product=self.product.pk + 1))
+        await writer
+
+        self.assertEqual([c['change'] for c in matching['changes']], ['3.0000'])
+        self.assertEqual(other['changes'], [])
+        self.assertEqual(other['cursor'], matching['cursor'])
+
+
+class StockChangeFeedTests(StockTestCase):
+    @staticmethod
+    def event(pk):
+        return StockChangeEvent.objects.create(id=pk, stock_id=1, product_id=1, warehouse_id=1, change=1,
+                                               new_quantity=1)
+
+    def test_an_event_committed_below_the_cursor_is_still_delivered(self):
+        self.event(10)
+        first = StockChangeFeed.read(after=0)
+        self.assertEqual([e.pk for e in first.events], [10])
+
+        # a long transaction inserted id 5 before id 10 but commits only now
+        self.event(5)
+        second = StockChangeFeed.read(after=first.cursor)
+
+        self.assertEqual([e.pk for e in second.events], [5])
+        self.assertGreater(second.cursor, first.cursor)
+        self.assertEqual(StockChangeFeed.read(after=second.cursor).events, [])
+
+    def test_ledger_writes_are_read_in_commit_order(self):
+        self.record('in-1', quantity=2)
+        self.record('out-1', 'OUT', quantity=1)
+        batch = StockChangeFeed.read(limit=1)
+        self.assertTrue(batch.has_more)
+        rest = StockChangeFeed.read(after=batch.cursor)
+        self.assertEqual([e.change for e in batch.events + rest.events], [2, -1])
+
+
+class BalanceSeriesTests(StockTestCase):
+    def test_closing_balances_are_forward_filled(self):
+        day = date(2026, 3, 1)
+        for key, transaction_type, quantity, offset in (('in-1', 'IN', 5, 1), ('out-1', 'OUT', 2, 3),
+                                                        ('in-2', 'IN', 4, 3)):
+            tx = self.record(key, transaction_type, quantity=quantity)
+            moment = timezone.make_aware(datetime.combine(day + timedelta(days=offset), time(12)))
+            StockLedger.objects.filter(transaction=tx).update(created_at=moment)
+
+        series = StockBalanceSeries.build(day, day + timedelta(days=4), product=self.product)
+
+        self.assertEqual(series.balances.shape, (1, 5))
+        self.assertEqual(series.as_dict()['balances'], [[0.0, 5.0, 5.0, 7.0, 7.0]])
+
+
+class AdminQueryCountTests(StockTestCase):
+    """Admin pages run a fixed number of queries, whatever the number of rows shown."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='x'))
+
+    def add_stock(self, count):
+        for n in range(count):
+            warehouse = Warehouse.objects.create(name=f'W{Warehouse.objects.count()}')
+            self.record(f'in-{warehouse.pk}', destination_warehouse=warehouse)
+
+    def assertPageQueries(self, expected, url):
+        self.client.get(url)  # warm process-level caches (content types, permissions)
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_changelists(self):
+        pages = {'admin:stock_module_stock_changelist': 6,
+                 'admin:stock_module_stockledger_changelist': 6}
+        for rows in (2, 20):
+            self.add_stock(rows)
+            for name, expected in pages.items():
+                with self.subTest(page=name, rows=rows):
+                    self.assertPageQueries(expected, reverse(name))
+
+    def test_ledger_change_form(self):
+        self.add_stock(1)
+        entry = StockLedger.objects.select_related('stock').latest('pk')
+        self.assertPageQueries(8, reverse('admin:stock_module_stockledger_change', args=[entry.pk]))
+
+
+class MetadataCacheTests(StockTestCase):
+    def setUp(self):
+        MetadataCache.clear()
+        self.addCleanup(MetadataCache.clear)
+
+    def test_a_cached_location_costs_no_query(self):
+        MetadataCache.warehouse(self.warehouse.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(MetadataCache.warehouse(self.warehouse.pk).name, 'Main')
+
+    def test_a_location_created_by_another_process_is_found_on_a_miss(self):
+        MetadataCache.warehouse(self.warehouse.pk)
+        # bulk_create sends no signals, like a save in another process
+        section, = Section.objects.bulk_create([Section(warehouse=self.warehouse, name='A')])
+        shelf, = Shelf.objects.bulk_create([Shelf(section=section, name='1')])
+
+        with self.assertNumQueries(2):
+            self.assertEqual(MetadataCache.warehouse_id_for(shelf_id=shelf.pk), self.warehouse.pk)
+            self.assertEqual(MetadataCache.section(section.pk).warehouse_id, self.warehouse.pk)
+        with self.assertNumQueries(1):
+            self.assertIsNone(MetadataCache.shelf(shelf.pk + 100))
+
+    def test_a_local_save_invalidates_the_hierarchy(self):
+        MetadataCache.warehouse(self.warehouse.pk)
+        self.warehouse.name = 'Central'
+        self.warehouse.save()
+        self.assertEqual(MetadataCache.warehouse(self.warehouse.pk).name, 'Central')
+
+    def test_a_change_elsewhere_is_seen_after_the_ttl(self):
+        MetadataCache.warehouse(self.warehouse.pk)
+        Warehouse.objects.filter(pk=self.warehouse.pk).update(name='Central')
+        self.assertEqual(MetadataCache.warehouse(self.warehouse.pk).name, 'Main')
+
+        with override_settings(INVENTORY_METADATA_CACHE_TTL=0):
+            self.assertEqual(MetadataCache.warehouse(self.warehouse.pk).name, 'Central')
+
+
+@override_settings(INVENTORY_VALUATION_METHOD='FIFO')
+class TransferValuationTests(StockTestCase):
+    def test_movement_transfers_conserve_fifo_value(self):
+        other = Warehouse.objects.create(name='Other')
+        self.record('in-1', quantity=2, unit_cost=10)
+        self.record('in-2', quantity=4, unit_cost=25)
+        self.assertEqual(ValuationEngine.inventory_value(), Decimal('120'))
+
+        for grouped in (False, True):
+            movement = ProductMovement.objects.create(movement_type='TRANSFER', source_warehouse=self.warehouse,
+                                                      destination_warehouse=other, status=MovementStatus.APPROVED)
+            MovementSegment.objects.create(movement=movement, product=self.product, quantity=2, unit='pcs',
+                                           from_warehouse=self.warehouse, to_warehouse=other)
+            MovementProcessor.process(movement, grouped=grouped)
+
+        self.assertEqual(ValuationEngine.inventory_value(warehouse=other), Decimal('70'))
+        self.assertEqual(ValuationEngine.inventory_value(), Decimal('120'))
+        ValuationEngine.rebuild()
+        self.assertEqual(ValuationEngine.inventory_value(warehouse=other), Decimal('70'))
+
+
+class StockOnHandReportTests(StockTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = Warehouse.objects.create(name='Other')
+        supplies = Category.objects.create(name='Supplies')
+        cls.saw = Product.objects.create(name='Saw', category=cls.product.category, brand=cls.product.brand,
+                                         base_unit='pcs', price=5)
+        cls.glue = Product.objects.create(name='Glue', category=supplies, brand=cls.product.brand,
+                                          base_unit='pcs', price=2)
+
+    def setUp(self):
+        for key, product, warehouse, quantity in [('d-main', self.product, self.warehouse, 3),
+                                                  ('d-other', self.product, self.other, 2),
+                                                  ('s-other', self.saw, self.other, 4),
+                                                  ('g-main', self.glue, self.warehouse, 5)]:
+            InventoryTransaction.objects.record(key, transaction_type='IN', product=product, quantity=quantity,
+                                               unit='pcs', destination_warehouse=warehouse)
+        InventoryTransaction.objects.record('g-out', transaction_type='OUT', product=self.glue, quantity=5,
+                                           unit='pcs', source_warehouse=self.warehouse)
+
+    def test_pivot_rows_subtotals_and_total(self):
+        rows = [(kind, key[2] if kind == 'product' else key, [int(q) for q in quantities], int(total))
+                for kind, key, quantities, total in StockOnHandReport(subtotals='category').rows()]
+        self.assertEqual(rows, [
+            ('product', 'Glue', [0, 0], 0),
+            ('subtotal', 'Supplies', [0, 0], 0),
+            ('product', 'Drill', [3, 2], 5),
+            ('product', 'Saw', [0, 4], 4),
+            ('subtotal', 'Tools', [3, 6], 9),
+            ('total', None, [3, 6], 9),
+        ])
+
+    def test_skip_zero_and_warehouse_filter(self):
+        rows = list(StockOnHandReport(warehouses=[self.other], skip_zero=True).rows())
+        self.assertEqual([(kind, key and key[2]) for kind, key, _, _ in rows],
+                         [('product', 'Drill'), ('product', 'Saw'), ('total', None)])
+        self.assertEqual((rows[-1][2], rows[-1][3]), ([Decimal('6')], Decimal('6')))
+
+    def test_csv_has_one_column_per_warehouse(self):
+        out = io.StringIO()
+        count = StockOnHandReport(subtotals='brand', skip_zero=True).write(out)
+        lines = list(csv.reader(io.StringIO(out.getvalue())))
+        self.assertEqual(count, 2)
+        self.assertEqual(lines[0], ['product_id', 'sku', 'product', 'category', 'brand', 'Main', 'Other', 'total'])
+        self.assertEqual(lines[-2][2], 'Subtotal: Acme')
+        self.assertEqual([Decimal(q) for q in lines[-2][5:]], [3, 6, 9])
+        self.assertEqual(lines[-1][2], 'Total')
+        with self.assertRaises(ValueError):
+            StockOnHandReport(subtotals='warehouse')
+
+
+class InventoryAnalyticsTests(StockTestCase):
+    def test_abc_boundaries_are_per_warehouse(self):
+        warehouses = np.array([1, 1, 1, 2, 2, 2])
+        value = np.array([80.0, 15.0, 5.0, 0.0, 10.0, 10.0])
+        self.assertEqual(list(InventoryAnalytics._abc(warehouses, value)), ['A', 'B', 'C', 'C', 'A', 'A'])
+        with self.settings(INVENTORY_ABC_THRESHOLDS=(0.5, 0.9)):
+            self.assertEqual(list(InventoryAnalytics._abc(warehouses, value)), ['A', 'B', 'C', 'C', 'A', 'B'])
+
+    def test_turnover_days_of_supply_and_dead_stock(self):
+        saw = Product.objects.create(name='Saw', category=self.product.category, brand=self.product.brand,
+                                     base_unit='pcs', price=5)
+        glue = Product.objects.create(name='Glue', category=self.product.category, brand=self.product.brand,
+                                      base_unit='pcs', price=2)
+        empty = Product.objects.create(name='Tape', category=self.product.category, brand=self.product.brand,
+                                       base_unit='pcs', price=1)
+        self.record('drill-in', quantity=10, unit_cost=10)
+        self.record('drill-out', 'OUT', quantity=4)
+        for key, product, transaction_type, quantity in [('saw-in', saw, 'IN', 5), ('glue-in', glue, 'IN', 2),
+                                                         ('glue-out', glue, 'OUT', 2), ('tape-in', empty, 'IN', 1),
+                                                         ('tape-out', empty, 'OUT', 1)]:
+            side = 'destination_warehouse' if transaction_type == 'IN' else 'source_warehouse'
+            InventoryTransaction.objects.record(key, transaction_type=transaction_type, product=product,
+                                               quantity=quantity, unit='pcs', **{side: self.warehouse})
+        # Tape moved before the window: no issues and nothing on hand in it
+        ValuationEntry.objects.filter(product=empty).update(created_at=timezone.now() - timedelta(days=200))
+
+        self.assertEqual(InventoryAnalytics.refresh(window_days=90), 4)
+        rows = {row.product_id: row for row in StockAnalytics.objects.all()}
+
+        drill = rows[self.product.pk]
+        self.assertEqual((drill.issued_quantity, drill.consumption_value, drill.average_on_hand),
+                         (Decimal('4'), Decimal('40'), Decimal('3')))
+        self.assertEqual((drill.turnover, drill.days_of_supply), (Decimal('1.3333'), Decimal('135')))
+        self.assertEqual((drill.abc_class, drill.dead_stock), ('A', False))
+
+        self.assertEqual((rows[saw.pk].turnover, rows[saw.pk].days_of_supply), (Decimal('0'), None))
+        self.assertEqual((rows[saw.pk].abc_class, rows[saw.pk].dead_stock), ('C', True))
+        # sold out: no average stock to turn over, nothing left to supply
+        self.assertEqual((rows[glue.pk].turnover, rows[glue.pk].days_of_supply), (None, Decimal('0')))
+        self.assertEqual((rows[glue.pk].abc_class, rows[glue.pk].dead_stock), ('B', False))
+        self.assertEqual((rows[empty.pk].turnover, rows[empty.pk].days_of_supply), (None, None))
+        self.assertEqual((rows[empty.pk].abc_class, rows[empty.pk].dead_stock), ('C', False))
+
+
+class DemandForecasterTests(StockTestCase):
+    def test_ses_and_moving_average_on_a_known_series(self):
+        level, sigma = DemandForecaster._ses(np.array([[4.0, 0.0, 2.0]]), alpha=0.5)
+        self.assertAlmostEqual(level[0], 1.75)
+        self.assertAlmostEqual(sigma[0], (13.25 / 3) ** 0.5)
+
+        average, sigma = DemandForecaster._moving_average(np.array([[1.0, 2.0, 3.0, 4.0, 5.0]]), window=2)
+        self.assertAlmostEqual(average[0], 4.5)
+        self.assertAlmostEqual(sigma[0], 1.5)
+
+    def test_run_stores_safety_stock_and_reorder_point_and_drops_stale_forecasts(self):
+        other = Warehouse.objects.create(name='Other')
+        stale = DemandForecast.objects.create(
+            product=self.product, warehouse=other, method=ForecastMethod.SES, history_days=5, horizon_days=1,
+            daily_demand=1, forecast_quantity=1, demand_std=0, safety_stock=0, reorder_point=1,
+            computed_at=timezone.now() - timedelta(days=1))
+        self.record('in', quantity=100)
+        today = timezone.localtime().date()
+        for day, quantity in enumerate([1, 2, 3, 4, 5]):
+            tx = self.record(f'out-{day}', 'OUT', quantity=quantity)
+            InventoryTransaction.objects.filter(pk=tx.pk).update(created_at=timezone.make_aware(
+                datetime.combine(today - timedelta(days=4 - day), time(12))))
+
+        params = ForecastParams(method=ForecastMethod.MA, history_days=5, horizon_days=7, window=2,
+                                lead_time_days=4, service_level=0.95)
+        self.assertEqual(DemandForecaster.run(params), 1)
+
+        forecast = DemandForecast.objects.get()
+        safety = Decimal(repr(1.6448536269514722 * 1.5 * 2)).quantize(Decimal('0.0001'))
+        self.assertEqual((forecast.warehouse_id, forecast.daily_demand, forecast.forecast_quantity),
+                         (self.warehouse.pk, Decimal('4.5'), Decimal('31.5')))
+        self.assertEqual((forecast.demand_std, forecast.safety_stock), (Decimal('1.5'), safety))
+        self.assertEqual(forecast.reorder_point, Decimal('18') + safety)
+        self.assertFalse(DemandForecast.objects.filter(pk=stale.pk).exists())
+
+        with self.assertRaises(ValueError):
+            DemandForecaster.run(ForecastParams(alpha=0))
+
+
+class StockAlertTests(StockTestCase):
+    def open_alerts(self):
+        return sorted(StockAlert.objects.filter(resolved_at__isnull=True).values_list('kind', 'level'))
+
+    def test_alerts_fire_while_breached_and_resolve_when_back(self):
+        threshold = StockThreshold.objects.create(product=self.product, warehouse=self.warehouse, min_quantity=2,
+                                                  reorder_point=3, max_quantity=10)
+        # nothing on hand yet: breached as soon as the threshold exists
+        self.assertEqual(self.open_alerts(), [(AlertKind.LOW, 2), (AlertKind.REORDER, 3)])
+
+        self.record('in-1', quantity=5)
+        self.assertEqual(self.open_alerts(), [])
+        self.record('out-1', 'OUT', quantity=4)
+        self.assertEqual(self.open_alerts(), [(AlertKind.LOW, 2), (AlertKind.REORDER, 3)])
+        self.record('out-2', 'OUT', quantity=1)
+        self.assertEqual(StockAlert.objects.count(), 4)
+        self.record('in-2', quantity=20)
+        self.assertEqual(self.open_alerts(), [(AlertKind.OVERSTOCK, 10)])
+        self.assertEqual(StockAlert.objects.get(resolved_at__isnull=True).threshold, threshold)
+
+    def test_changing_deactivating_and_deleting_a_threshold(self):
+        self.record('in-1', quantity=5)
+        threshold = StockThreshold.objects.create(product=self.product, warehouse=self.warehouse, min_quantity=2)
+        self.assertEqual(self.open_alerts(), [])
+
+        threshold.min_quantity = 6
+        threshold.save()
+        self.assertEqual(self.open_alerts(), [(AlertKind.LOW, 6)])
+        threshold.min_quantity = 8
+        threshold.save()
+        self.assertEqual(self.open_alerts(), [(AlertKind.LOW, 8)])
+
+        threshold.is_active = False
+        threshold.save()
+        self.record('out-1', 'OUT', quantity=4)
+        self.assertEqual(self.open_alerts(), [])
+        threshold.is_active = True
+        threshold.save()
+        self.assertEqual(self.open_alerts(), [(AlertKind.LOW, 8)])
+
+        threshold.delete()
+        self.assertEqual(self.open_alerts(), [])
+        self.assertEqual(StockAlert.objects.count(), 3)
+        self.assertFalse(StockAlert.objects.filter(threshold__isnull=False).exists())
+
+    def test_fire_and_recover_within_one_batch(self):
+        self.record('in-1', quantity=5)
+        StockThreshold.objects.create(product=self.product, warehouse=self.warehouse, min_quantity=2)
+        fields = {'product': self.product, 'unit': 'pcs', 'quantity': 4}
+        batch = [InventoryTransaction.objects.create(transaction_type='OUT', source_warehouse=self.warehouse, **fields),
+                 InventoryTransaction.objects.create(transaction_type='IN', destination_warehouse=self.warehouse,
+                                                     **fields),
+                 InventoryTransaction.objects.create(transaction_type='OUT', source_warehouse=self.warehouse,
+                                                     **fields)]
+
+        StockUpdater.apply_many(batch)
+
+        alerts = list(StockAlert.objects.order_by('pk').values_list('quantity', 'resolved_at'))
+        self.assertEqual([quantity for quantity, _ in alerts], [1, 1])
+        self.assertIsNotNone(alerts[0][1])
+        self.assertIsNone(alerts[1][1])
+
+
+class StockListEtagTests(StockTestCase):
+    def test_etag_follows_the_change_feed(self):
+        user = User.objects.create(username='keeper')
+        self.client.force_login(user)
+        self.record('in-1', quantity=2)
+        url = reverse('stock:list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.record('in-2', quantity=3)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['quantity'], '5.0000')
@@ -0,0 +1,15 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'stock'
+
+urlpatterns = [
+    path('', views.stock_list, name='list'),
+    path('lookup/', views.stock_lookup, name='lookup'),
+    path('lookup/sync/', views.stock_lookup_sync, name='lookup-sync'),
+    path('changes/', views.stock_changes, name='changes'),
+    path('live/', views.stock_live, name='live'),
+    path('balances/', views.balance_series, name='balances'),
+    path('alerts/', views.stock_alerts, name='alerts'),
+]
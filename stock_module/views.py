@@ -1,3 +1,273 @@
-from django.shortcuts import render
+import asyncio
 
-# Create your views here.
+from django.http import JsonResponse
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_GET
+
+from InventoryProject.api import json_response, not_modified, page
+from .models import Stock
+from .services.alerts import StockAlertEngine
+from .services.live import LedgerWatcher, read_changes
+from .services.outbox import StockChangeFeed
+from .services.timeseries import StockBalanceSeries
+
+LOOKUP_LIMIT = 200
+LIVE_DEFAULT_WAIT = 25
+LIVE_MAX_WAIT = 60
+
+
+def _parse_day(value, name):
+    day = parse_date(value or '')
+    if day is None:
+        raise ValueError(f"{name} must be a date (YYYY-MM-DD).")
+    return day
+
+
+def ledger_version():
+    """
+    Change feed position: every stock quantity change writes a change event, and positions are
+    handed out in commit order, so a change committed after this read always moves it (the last
+    ledger id does not: a lower id can commit after a higher one was seen).
+    """
+    return StockChangeFeed.sequence()
+
+
+@require_GET
+def stock_list(request):
+    """
+    GET ?product=&sku=&warehouse=&location=<path>&after=<id>&limit=
+    Stock balances by id; conditional on the change feed position (If-None-Match -> 304).
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    cached, etag = not_modified(request, ledger_version())
+    if cached is not None:
+        return cached
+    params = request.GET
+    qs = Stock.objects.all()
+    try:
+        if params.get('product'):
+            qs = qs.filter(product_id=int(params['product']))
+        if params.get('sku'):
+            qs = qs.filter(product__sku=params['sku'])
+        if params.get('warehouse'):
+            qs = qs.filter(warehouse_id=int(params['warehouse']))
+        if params.get('location'):
+            qs = qs.under(params['location'])
+        rows, cursor = page(qs.values('pk', 'product_id', 'warehouse_id', 'section_id', 'shelf_id', 'quantity',
+                                      'unit'), params)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return json_response(request, {
+        'results': [{
+            'id': row['pk'],
+            'product': row['product_id'],
+            'warehouse': row['warehouse_id'],
+            'section': row['section_id'],
+            'shelf': row['shelf_id'],
+            'quantity': str(row['quantity']),
+            'unit': row['unit'],
+        } for row in rows],
+        'next': cursor,
+    }, etag=etag)
+
+
+def _lookup_query(params):
+    """Stock rows of one SKU (optionally one warehouse), for the scanner lookups."""
+    sku = params.get('sku')
+    if not sku:
+        raise ValueError("sku is required.")
+    qs = Stock.objects.filter(product__sku=sku)
+    if params.get('warehouse'):
+        qs = qs.filter(warehouse_id=int(params['warehouse']))
+    return qs.order_by('warehouse_id', 'pk').values(
+        'product_id', 'warehouse_id', 'section_id', 'shelf_id', 'quantity', 'unit')[:LOOKUP_LIMIT]
+
+
+def _lookup_payload(sku, rows):
+    return {
+        'sku': sku,
+        'product': rows[0]['product_id'] if rows else None,
+        'results': [{
+            'warehouse': row['warehouse_id'],
+            'section': row['section_id'],
+            'shelf': row['shelf_id'],
+            'quantity': str(row['quantity']),
+            'unit': row['unit'],
+        } for row in rows],
+    }
+
+
+@require_GET
+async def stock_lookup(request):
+    """
+    GET ?sku=&warehouse= — on-hand rows of a SKU, for the scanner fleet. Async view: under ASGI
+    a waiting lookup holds no worker thread (see the benchmark_lookups command).
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    try:
+        qs = _lookup_query(request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    rows = [row async for row in qs]
+    return JsonResponse(_lookup_payload(request.GET['sku'], rows))
+
+
+@require_GET
+def stock_lookup_sync(request):
+    """stock_lookup for WSGI deployments (an async view under WSGI costs an event loop per request)."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    try:
+        rows = list(_lookup_query(request.GET))
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(_lookup_payload(request.GET['sku'], rows))
+
+
+@require_GET
+def stock_changes(request):
+    """
+    GET ?after=<cursor>&limit=&warehouse=&product=
+    Stock change events after the cursor, oldest first; pass the returned cursor back as `after`.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    params = request.GET
+    try:
+        batch = StockChangeFeed.read(
+            after=params.get('after') or 0,
+            limit=params.get('limit') or 1000,
+            warehouse=params.get('warehouse') or None,
+            product=params.get('product') or None,
+        )
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse({
+        'events': [event.as_dict() for event in batch.events],
+        'cursor': batch.cursor,
+        'has_more': batch.has_more,
+    })
+
+
+def _live_params(params):
+    def optional_int(name):
+        return int(params[name]) if params.get(name) else None
+    try:
+        return {
+            'after': optional_int('after'),
+            'warehouse': optional_int('warehouse'),
+            'product': optional_int('product'),
+            'limit': optional_int('limit') or 1000,
+            'wait': max(0.0, min(float(params.get('wait') or LIVE_DEFAULT_WAIT), LIVE_MAX_WAIT)),
+        }
+    except ValueError:
+        raise ValueError("after, warehouse, product and limit must be integers, wait a number of seconds.")
+
+
+@require_GET
+async def stock_live(request):
+    """
+    GET ?after=<feed position>&warehouse=&product=&wait=<seconds>&limit=
+    Long poll: returns the stock changes after the cursor as soon as there are any, or an empty
+    list when `wait` runs out; pass the returned cursor back as `after`. Without `after` it
+    returns the current cursor at once. Cursors are change-feed positions (commit order, see
+    services.outbox). Serve it through ASGI: a waiting client is a suspended coroutine, not a
+    worker thread (services.live.LedgerWatcher).
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    try:
+        params = _live_params(request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    watcher = LedgerWatcher.current()
+    horizon = await watcher.horizon()
+    after = params['after']
+    if after is None:
+        return JsonResponse({'changes': [], 'cursor': horizon, 'has_more': False})
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + params['wait']
+    while True:
+        if horizon > after:
+            batch = await read_changes(after, horizon, params['limit'], params['warehouse'], params['product'])
+            if batch.changes:
+                return JsonResponse({
+                    'changes': [{
+                        'position': row['position'],
+                        'ledger': row['ledger_id'],
+                        'stock': row['stock_id'],
+                        'product': row['product_id'],
+                        'warehouse': row['warehouse_id'],
+                        'section': row['section_id'],
+                        'shelf': row['shelf_id'],
+                        'change': row['change'],
+                        'quantity': row['new_quantity'],
+                        'transaction': row['transaction_id'],
+                        'created_at': row['created_at'],
+                    } for row in batch.changes],
+                    'cursor': batch.cursor,
+                    'has_more': batch.has_more,
+                })
+            after = batch.cursor   # changes elsewhere: nothing for this filter up to the horizon
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        woken, horizon = await watcher.wait_past(after, remaining, params['warehouse'], params['product'])
+        if not woken:
+            after = horizon   # the watcher checked up to here: nothing for this filter
+            break
+    return JsonResponse({'changes': [], 'cursor': after, 'has_more': False})
+
+
+@require_GET
+def balance_series(request):
+    """
+    GET ?since=YYYY-MM-DD&until=YYYY-MM-DD&period=day|hour&stock=<id>(repeatable)&product=&warehouse=
+    End-of-period balances as columnar arrays (one row per stock, one column per period).
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    params = request.GET
+    try:
+        series = StockBalanceSeries.build(
+            start=_parse_day(params.get('since'), 'since'),
+            end=_parse_day(params.get('until'), 'until'),
+            stocks=params.getlist('stock') or None,
+            product=params.get('product') or None,
+            warehouse=params.get('warehouse') or None,
+            period=params.get('period') or 'day',
+        )
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(series.as_dict())
+
+
+@require_GET
+def stock_alerts(request):
+    """
+    GET ?after=<cursor>&limit=&warehouse=&product=&open=1
+    Threshold alerts after the cursor, oldest first; pass the returned cursor back as `after`.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    params = request.GET
+    try:
+        batch = StockAlertEngine.read(
+            after=params.get('after') or 0,
+            limit=params.get('limit') or 100,
+            warehouse=params.get('warehouse') or None,
+            product=params.get('product') or None,
+            open_only=(params.get('open') or '').lower() in ('1', 'true', 'yes'),
+        )
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse({
+        'alerts': [alert.as_dict() for alert in batch.alerts],
+        'cursor': batch.cursor,
+        'has_more': batch.has_more,
+    })